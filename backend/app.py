@@ -1,27 +1,48 @@
 from flask import Flask, jsonify, send_from_directory, request
 from flask_cors import CORS
-from detector import Detector
+from detector_pool import get_detector_pool, DETECTOR_PRELOAD
+from inference_batcher import get_inference_batcher
+from inference_profiles import INFERENCE_PROFILES, resolve_profile, resolve_mode
+from image_decode import decode_image, upload_extension
+from inspection_writer import InspectionWriter
+from inspection_recorder import InspectionRecorder, parse_durable
+from inspection_store import InspectionStore
+import db
+import inspection_backup
+import inspection_db
+import inspection_stats
+from face_encodings import check_schema, decode_encodings, encoding_to_blob, encoding_version
+from face_index import FACE_INDEX_PATH, FACE_RECOGNITION_TOLERANCE, create_face_index, load_face_index
+from face_pipeline import detect_faces, encode_faces, largest_face
+from face_snapshot import FACE_SNAPSHOT_DIR, MappedFaceIndex, SnapshotBuilder
+from ppe_association import format_persons
+from result_cache import get_result_cache, make_cache_key
+from model_export import model_version
 from PIL import Image
 import numpy as np
 import sqlite3
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
+import atexit
+import shutil
+import tempfile
 try:
     import face_recognition
     FACE_RECOGNITION_AVAILABLE = True
 except ImportError:
     FACE_RECOGNITION_AVAILABLE = False
     print("⚠️ Face recognition modülü bulunamadı. Kullanıcı kayıt/giriş özellikleri devre dışı.")
-import json
 
 app = Flask(__name__)
-CORS(app)
+# Sayfalama cursor'ı başlıkta döner, tarayıcı başka origin'den de okuyabilsin
+CORS(app, expose_headers=['X-Next-Cursor'])
 
 # Veritabanı
 DATABASE = 'ppe_inspections.db'
 
 def init_db():
-    conn = sqlite3.connect(DATABASE)
+    # WAL kipi dosyada kalıcıdır; ilk açılışta burada etkinleşir
+    conn = db.open_connection(DATABASE)
     cursor = conn.cursor()
     cursor.execute('''
         CREATE TABLE IF NOT EXISTS inspections (
@@ -32,7 +53,8 @@ def init_db():
             gozluk INTEGER NOT NULL,
             uygunluk INTEGER NOT NULL,
             image_filename TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            sicil_no TEXT
         )
     ''')
     
@@ -42,28 +64,96 @@ def init_db():
             name TEXT NOT NULL,
             surname TEXT NOT NULL,
             sicil_no TEXT UNIQUE NOT NULL,
-            face_encoding TEXT NOT NULL,
+            face_encoding BLOB NOT NULL,
             photo_filename TEXT,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     ''')
     conn.commit()
+    # Mobil uygulama (app_simple.py) ile aynı veritabanı - kontrol kayıtları şeması ortak
+    inspection_db.ensure_schema(conn)
+    # /api/stats sayaçları ve günlük/saatlik toplamlar (tetikleyicilerle güncellenir)
+    inspection_stats.ensure_schema(conn)
+    check_schema(conn)
     conn.close()
     print("✅ Veritabanı hazır")
 
+def refresh_face_index():
+    """Son okunandan sonra kaydolan kullanıcıların yüzlerini indekse ekle"""
+    if face_snapshots:
+        # Başka worker yeni anlık görüntü yayınladıysa ona geç
+        face_index.reload()
+    with db.connection(DATABASE) as conn:
+        rows = db.faces_after(conn, 'users', face_index.last_row_id)
+    if rows:
+        face_index.add_batch([row[1] for row in rows], decode_encodings([row[2] for row in rows]), rows[-1][0])
+    return len(rows)
+
+def save_face_index():
+    """Yüz indeksini diske yaz - sonraki açılışta eğitim/kurulum tekrarlanmaz"""
+    if face_snapshots or not FACE_INDEX_PATH:
+        return
+    try:
+        face_index.save(FACE_INDEX_PATH)
+    except Exception as e:
+        print(f"⚠️ Yüz indeksi kaydedilemedi: {e}")
+
 init_db()
-detector = Detector()
+with db.connection(DATABASE) as conn:
+    max_user_id = db.max_user_id(conn, 'users')
+    # Güncellenen/silinen yüzler last_row_id ile görünmez, değişiklik sayacıyla yakalanır
+    face_db_version = encoding_version(conn, 'users')
+# FACE_SNAPSHOT_DIR ayarlıysa yüzler tüm worker'ların paylaştığı salt okunur mmap'ten aranır
+face_snapshots = SnapshotBuilder(DATABASE, 'users') if FACE_SNAPSHOT_DIR else None
+if face_snapshots:
+    face_index = MappedFaceIndex(face_snapshots.directory)
+    if (face_index.snapshot_version is None or face_index.last_row_id > max_user_id
+            or face_index.db_version != face_db_version):
+        face_snapshots.build()
+        face_index.reload()
+else:
+    # Kayıtlı yüzlerin indeksi (FACE_INDEX_BACKEND: tam matris araması ya da ANN)
+    face_index = load_face_index(db_version=face_db_version)
+    if face_index.last_row_id > max_user_id:
+        # Anlık görüntü başka/sıfırlanmış bir veritabanına ait
+        print("⚠️ Yüz indeksi veritabanıyla uyuşmuyor, yeniden kuruluyor")
+        face_index = create_face_index()
+    face_index.db_version = face_db_version
+if refresh_face_index():
+    if face_snapshots:
+        face_snapshots.schedule()
+    else:
+        save_face_index()
+atexit.register(save_face_index)
+print(f"✅ {len(face_index)} kullanıcı yüzü indekslendi ({face_index.backend})")
+# Model süreç başına bir kez yüklenir, istekler havuzdan ödünç alır (thread-safe).
+# DETECTOR_PRELOAD=false ise ilk istekte; server.py ile gunicorn master'ında fork'tan önce yüklenir
+detector_pool = get_detector_pool()
+if DETECTOR_PRELOAD:
+    try:
+        detector_pool.warm_up()
+    except Exception as e:
+        print(f"⚠️ Detector ön yüklemesi başarısız, ilk istekte tekrar denenecek: {e}")
+# INFERENCE_BATCHING=true ise eşzamanlı istekler tek forward pass'te toplanır
+inference_batcher = get_inference_batcher(detector_pool)
+# Aynı yüklemenin tekrarı için sonuç cache'i
+result_cache = get_result_cache()
+# Kontrol görüntüleri tarih klasörlerinde, istek thread'i dışında yazılır
+inspection_store = InspectionStore()
+inspection_writer = InspectionWriter(inspection_store)
+# Kontrol kayıtları gruplar halinde commit edilir (?durable=true ile commit beklenir)
+inspection_recorder = InspectionRecorder(DATABASE)
 
 @app.route('/')
 def dashboard():
     """Admin Dashboard"""
     return send_from_directory('.', 'dashboard.html')
 
-@app.route('/inspections/<filename>')
+@app.route('/inspections/<path:filename>')
 def get_inspection_image(filename):
-    """Kontrol görüntüsünü getir"""
+    """Kontrol görüntüsünü getir (YYYY/MM/DD/... veya eski düz isim)"""
     try:
-        return send_from_directory('inspections', filename)
+        return send_from_directory(inspection_store.root, inspection_store.resolve(filename))
     except:
         return '', 404
 
@@ -73,40 +163,45 @@ def validate_image():
     try:
         if 'image' not in request.files:
             return jsonify({'error': 'No image provided'}), 400
-        
-        file = request.files['image']
-        image_pil = Image.open(file.stream)
-        
-        # iPhone EXIF orientation düzeltmesi
+
+        # Çıkarım profili (?profile=fast|balanced|accurate) ve mod (?mode=image|person), boşsa deployment varsayılanı
         try:
-            from PIL import ImageOps
-            image_pil = ImageOps.exif_transpose(image_pil)
-            print("📱 EXIF orientation düzeltildi")
-        except Exception as e:
-            print(f"⚠️ EXIF düzeltme hatası (normal): {e}")
+            profile = resolve_profile(request.args.get('profile'))
+            mode = resolve_mode(request.args.get('mode'))
+            durable = parse_durable(request.args.get('durable'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        per_person = mode == 'person'
         
-        image_pil = image_pil.convert('RGB')
-        image_rgb = np.array(image_pil)
+        file = request.files['image']
+        data = file.read()
         
-        height, width = image_rgb.shape[:2]
-        print(f"📸 Image received: {width}x{height}")
+        # Model girişine yakın boyutta decode, iPhone EXIF orientation metadata'dan uygulanır
+        image_rgb, (width, height) = decode_image(data, INFERENCE_PROFILES[profile]['imgsz'])
+        print(f"📸 Image received: {width}x{height} (decode: {image_rgb.shape[1]}x{image_rgb.shape[0]})")
         
         # Görüntü çok küçükse uyar
         if width < 640 or height < 640:
             print(f"⚠️ UYARI: Görüntü çok küçük! Tespit kalitesi düşük olabilir.")
         
-        results = detector.validate_ppe(image_rgb)
-        
-        # Görüntüyü kaydet (timestamp ile)
-        import cv2
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        image_filename = f'inspection_{timestamp}.jpg'
-        image_path = os.path.join('backend', 'inspections', image_filename)
-        
-        # inspections klasörünü oluştur
-        os.makedirs(os.path.join('backend', 'inspections'), exist_ok=True)
-        cv2.imwrite(image_path, cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR))
-        print(f"💾 Görüntü kaydedildi: {image_path}")
+        # Aynı dosya tekrar gönderildiyse (timeout sonrası retry) çıkarım atlanır
+        cache_key = make_cache_key(data, model_version(), profile, mode)
+        results = result_cache.get(cache_key)
+        if results is not None:
+            print("♻️ Sonuç cache'ten döndürülüyor")
+        else:
+            if inference_batcher is not None:
+                results = inference_batcher.validate_ppe(image_rgb, profile, per_person)
+            else:
+                with detector_pool.borrow() as detector:
+                    results = detector.validate_ppe(image_rgb, profile, per_person)
+            result_cache.put(cache_key, results)
+        
+        # Yüklenen dosya olduğu gibi saklanır (küçük decode değil, yeniden encode yok) - yazma arka planda
+        image_filename = inspection_store.new_filename(upload_extension(data))
+        if not inspection_writer.submit(data, image_filename):
+            # Kuyruk dolu, görüntü düşürüldü - kayıt var olmayan dosyaya bağlanmasın
+            image_filename = None
         
         # Flutter için response'u düzenle - Sadece Kask ve Yelek
         detected_items = {
@@ -126,25 +221,15 @@ def validate_image():
             'success': success,
             'detected_items': detected_items,
             'missing_items': missing_items,
-            'message': '✅ Ekipman Tam' if success else f'⚠️ Eksik: {", ".join(missing_items)}'
+            'message': '✅ Ekipman Tam' if success else f'⚠️ Eksik: {", ".join(missing_items)}',
+            'profile': profile
         }
+        if 'persons' in results:
+            response['persons'] = format_persons(results['persons'])
         
-        # Veritabanına kaydet
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            datetime.now().isoformat(),
-            1 if detected_items['Kask'] else 0,
-            1 if detected_items['Yelek'] else 0,
-            0,  # gozluk - artık kullanılmıyor
-            1 if success else 0,
-            image_filename
-        ))
-        conn.commit()
-        conn.close()
+        # Veritabanına kaydet - grup commit kuyruğu üzerinden
+        inspection_recorder.record(datetime.now().isoformat(), detected_items['Kask'], detected_items['Yelek'],
+                                   success, image_filename, durable=durable)
         
         print(f"✅ Response: {response}")
         return jsonify(response), 200
@@ -155,60 +240,89 @@ def validate_image():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/writer/stats', methods=['GET'])
+def writer_stats():
+    """Arka plan görüntü yazıcısı kuyruk ve backpressure bilgisi"""
+    return jsonify(inspection_writer.stats()), 200
+
+@app.route('/api/recorder/stats', methods=['GET'])
+def recorder_stats():
+    """Kontrol kaydı grup commit kuyruğu bilgisi"""
+    return jsonify(inspection_recorder.stats()), 200
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Sonuç cache'i hit/miss sayaçları"""
+    return jsonify(result_cache.stats()), 200
+
+@app.route('/api/detector/health', methods=['GET'])
+def detector_health():
+    """Detector havuzu sağlık ve doluluk bilgisi"""
+    stats = detector_pool.stats()
+    if inference_batcher is not None:
+        stats['batching'] = inference_batcher.stats()
+    return jsonify(stats), 503 if stats['status'] == 'error' else 200
+
 @app.route('/api/inspections', methods=['GET'])
 def get_inspections():
-    """Tüm kayıtları getir"""
+    """
+    Kontrol kayıtları, yeniden eskiye - varsayılan 100 kayıt.
+    Filtreler ve sayfalama için inspection_db'ye bakın; sonraki sayfanın cursor'ı X-Next-Cursor başlığında.
+    """
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT timestamp, kask, yelek, gozluk, uygunluk, image_filename
-            FROM inspections
-            ORDER BY timestamp DESC
-            LIMIT 100
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        inspections = []
-        for row in rows:
-            inspections.append({
-                'timestamp': row[0],
-                'kask': row[1],
-                'yelek': row[2],
-                'gozluk': row[3],
-                'uygunluk': row[4],
-                'image_filename': row[5]
-            })
-        
-        return jsonify(inspections), 200
+        try:
+            query = inspection_db.parse_query(request.args, default_limit=100)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        with db.connection(DATABASE) as conn:
+            page = inspection_db.fetch_page(conn, *query)
+        
+        # Gövde eskisi gibi liste - mevcut istemciler değişmeden çalışır
+        response = jsonify(page['inspections'])
+        if page['next_cursor']:
+            response.headers['X-Next-Cursor'] = page['next_cursor']
+        return response, 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    """İstatistikler"""
+    """İstatistikler - tetikleyicilerle tutulan özet satırından, tablo taranmaz"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM inspections')
-        total = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM inspections WHERE uygunluk = 1')
-        compliant = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        non_compliant = total - compliant
-        compliance_rate = (compliant / total * 100) if total > 0 else 0
-        
-        return jsonify({
-            'total': total,
-            'compliant': compliant,
-            'non_compliant': non_compliant,
-            'compliance_rate': round(compliance_rate, 1)
-        }), 200
+        with db.connection(DATABASE) as conn:
+            stats = inspection_stats.summary(conn)
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stats/daily', methods=['GET'])
+def get_daily_stats():
+    """Günlük toplamlar (?from=&to=, YYYY-MM-DD) - varsayılan son 7 gün"""
+    try:
+        today = datetime.now().date()
+        try:
+            end = inspection_stats.parse_day(request.args.get('to'), today)
+            start = inspection_stats.parse_day(request.args.get('from'), today - timedelta(days=6))
+            with db.connection(DATABASE) as conn:
+                days = inspection_stats.daily(conn, start, end)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'from': start, 'to': end, 'days': days}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stats/hourly', methods=['GET'])
+def get_hourly_stats():
+    """Bir günün saatlik toplamları (?date=YYYY-MM-DD) - varsayılan bugün"""
+    try:
+        try:
+            day = inspection_stats.parse_day(request.args.get('date'), datetime.now().date())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        with db.connection(DATABASE) as conn:
+            hours = inspection_stats.hourly(conn, day)
+        return jsonify({'date': day, 'hours': hours}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -216,11 +330,8 @@ def get_stats():
 def delete_inspection(id):
     """Tek bir kaydı sil"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM inspections WHERE id = ?', (id,))
-        conn.commit()
-        conn.close()
+        with db.transaction(DATABASE) as conn:
+            db.delete_inspection(conn, id)
         return jsonify({'success': True, 'message': 'Kayıt silindi'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
@@ -229,43 +340,17 @@ def delete_inspection(id):
 def clear_all():
     """Tüm kayıtları sil"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('DELETE FROM inspections')
-        conn.commit()
-        conn.close()
+        # İstatistik tabloları da aynı işlemde sıfırlanır (işlemi kendisi açar)
+        with db.connection(DATABASE) as conn:
+            inspection_stats.clear_inspections(conn)
         return jsonify({'success': True, 'message': 'Tüm kayıtlar silindi'}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/inspections_with_id', methods=['GET'])
 def get_inspections_with_id():
-    """ID'li kayıtları getir - Tarih/saat'e göre azalan sıralı"""
-    try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, timestamp, kask, yelek, gozluk, uygunluk
-            FROM inspections
-            ORDER BY timestamp DESC
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        inspections = []
-        for row in rows:
-            inspections.append({
-                'id': row[0],
-                'timestamp': row[1],
-                'kask': row[2],
-                'yelek': row[3],
-                'gozluk': row[4],
-                'uygunluk': row[5]
-            })
-        
-        return jsonify(inspections), 200
-    except Exception as e:
-        return jsonify({'error': str(e)}), 500
+    """ID'li kayıtlar (ayarlar sayfası) - /api/inspections ile aynı filtre ve sayfalama, varsayılan 100 kayıt"""
+    return get_inspections()
 
 @app.route('/api/add_inspection', methods=['POST'])
 def add_inspection():
@@ -273,21 +358,9 @@ def add_inspection():
     try:
         data = request.get_json()
         
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            data['timestamp'],
-            data['kask'],
-            data['yelek'],
-            0,  # gozluk
-            data['uygunluk'],
-            'manual_entry.jpg'
-        ))
-        conn.commit()
-        conn.close()
+        with db.transaction(DATABASE) as conn:
+            db.insert_inspection(conn, data['timestamp'], data['kask'], data['yelek'], data['uygunluk'],
+                                 'manual_entry.jpg')
         
         return jsonify({'success': True, 'message': 'Kayıt eklendi'}), 200
     except Exception as e:
@@ -299,21 +372,8 @@ def update_inspection(id):
     try:
         data = request.get_json()
         
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            UPDATE inspections 
-            SET timestamp = ?, kask = ?, yelek = ?, uygunluk = ?
-            WHERE id = ?
-        ''', (
-            data['timestamp'],
-            data['kask'],
-            data['yelek'],
-            data['uygunluk'],
-            id
-        ))
-        conn.commit()
-        conn.close()
+        with db.transaction(DATABASE) as conn:
+            db.update_inspection(conn, id, data['timestamp'], data['kask'], data['yelek'], data['uygunluk'])
         
         return jsonify({'success': True, 'message': 'Kayıt güncellendi'}), 200
     except Exception as e:
@@ -326,30 +386,18 @@ def add_test_data():
         import random
         from datetime import timedelta
         
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        # 10 adet test verisi ekle
-        for i in range(10):
-            # Rastgele tarih (son 30 gün)
-            random_date = datetime.now() - timedelta(days=random.randint(0, 30), hours=random.randint(0, 23))
-            
-            # Rastgele ekipman durumu
-            kask = random.choice([0, 1])
-            yelek = random.choice([0, 1])
-            uygunluk = 1 if (kask and yelek) else 0
-            
-            cursor.execute('''
-                INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                random_date.isoformat(),
-                kask, yelek, 0, uygunluk,
-                f'test_image_{i+1}.jpg'
-            ))
-        
-        conn.commit()
-        conn.close()
+        # 10 adet test verisi ekle - tek işlemde
+        with db.transaction(DATABASE) as conn:
+            for i in range(10):
+                # Rastgele tarih (son 30 gün)
+                random_date = datetime.now() - timedelta(days=random.randint(0, 30), hours=random.randint(0, 23))
+                
+                # Rastgele ekipman durumu
+                kask = random.choice([0, 1])
+                yelek = random.choice([0, 1])
+                uygunluk = 1 if (kask and yelek) else 0
+                
+                db.insert_inspection(conn, random_date.isoformat(), kask, yelek, uygunluk, f'test_image_{i+1}.jpg')
         
         return jsonify({'success': True, 'message': '10 test verisi eklendi'}), 200
     except Exception as e:
@@ -357,44 +405,58 @@ def add_test_data():
 
 @app.route('/api/backup', methods=['GET'])
 def backup_database():
-    """Veritabanını JSON olarak yedekle"""
+    """
+    Veritabanı yedeği - satırlar okundukça gönderilir, tablo belleğe alınmaz.
+    ?format=json|ndjson|csv|parquet (varsayılan json), ?gzip=true
+    """
     try:
-        import json
         from flask import Response
         
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('SELECT * FROM inspections ORDER BY timestamp DESC')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        # Kolon isimleri
-        columns = ['id', 'timestamp', 'kask', 'yelek', 'gozluk', 'uygunluk', 'image_filename', 'created_at']
-        
-        # JSON formatına çevir
-        backup_data = []
-        for row in rows:
-            record = {}
-            for i, col in enumerate(columns):
-                if i < len(row):
-                    record[col] = row[i]
-            backup_data.append(record)
-        
-        backup = {
-            'export_date': datetime.now().isoformat(),
-            'total_records': len(backup_data),
-            'data': backup_data
-        }
-        
-        response = Response(
-            json.dumps(backup, indent=2, ensure_ascii=False),
-            mimetype='application/json',
-            headers={
-                'Content-Disposition': f'attachment; filename=ppe_backup_{datetime.now().strftime("%Y%m%d_%H%M%S")}.json'
-            }
+        try:
+            fmt = inspection_backup.parse_format(request.args.get('format'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        compress = request.args.get('gzip', '').lower() in ('1', 'true', 'yes')
+        
+        now = datetime.now()
+        mimetype = 'application/gzip' if compress else inspection_backup.BACKUP_FORMATS[fmt][0]
+        filename = inspection_backup.backup_filename(fmt, now.strftime("%Y%m%d_%H%M%S"), compress)
+        return Response(
+            inspection_backup.export(DATABASE, fmt, now.isoformat(), compress),
+            mimetype=mimetype,
+            headers={'Content-Disposition': f'attachment; filename={filename}'}
         )
-        
-        return response
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/restore', methods=['POST'])
+def restore_database():
+    """
+    Yedeği geri yükle - /api/backup çıktısı (gzip'li de olabilir) istek gövdesinde.
+    ?format= (boşsa Content-Type'tan), ?mode=append|replace (replace: mevcut kayıtlar silinir)
+    """
+    try:
+        try:
+            fmt = inspection_backup.parse_format(request.args.get('format'),
+                                                 inspection_backup.format_from_content_type(request.content_type))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        mode = request.args.get('mode', 'append')
+        if mode not in inspection_backup.RESTORE_MODES:
+            return jsonify({'error': f"Geçersiz mode: {mode} (seçenekler: {', '.join(inspection_backup.RESTORE_MODES)})"}), 400
+        
+        # Gövde önce geçici dosyaya akar; yavaş yükleme sırasında yazma kilidi tutulmaz
+        with tempfile.TemporaryFile() as upload:
+            shutil.copyfileobj(request.stream, upload, 1024 * 1024)
+            upload.seek(0)
+            try:
+                with db.transaction(DATABASE) as conn:
+                    restored = inspection_backup.restore(conn, inspection_backup.open_upload(upload), fmt, mode)
+            except (ValueError, sqlite3.IntegrityError, OSError, EOFError) as e:
+                return jsonify({'error': f'Yedek yüklenemedi: {e}'}), 400
+        
+        print(f"♻️ Yedekten {restored} kayıt yüklendi ({fmt}, {mode})")
+        return jsonify({'success': True, 'restored': restored, 'mode': mode}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -427,15 +489,15 @@ def register_user():
         image_pil = image_pil.convert('RGB')
         image_np = np.array(image_pil)
         
-        # Yüz tespiti ve encoding
-        face_locations = face_recognition.face_locations(image_np)
+        # Yüz tespiti (küçültülmüş kopyada) ve encoding (orijinal çözünürlükteki yüz kesitinden)
+        face_locations = detect_faces(image_np)
         if not face_locations:
             return jsonify({'error': 'Yüz bulunamadı'}), 400
             
         if len(face_locations) > 1:
             return jsonify({'error': 'Birden fazla yüz tespit edildi'}), 400
             
-        face_encodings = face_recognition.face_encodings(image_np, face_locations)
+        face_encodings = encode_faces(image_np, face_locations)
         if not face_encodings:
             return jsonify({'error': 'Yüz kodlanamadı'}), 400
             
@@ -452,18 +514,15 @@ def register_user():
         image_pil.save(os.path.join('backend', 'users', photo_filename))
         
         # Veritabanına kaydet
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
         try:
-            cursor.execute('''
-                INSERT INTO users (name, surname, sicil_no, face_encoding, photo_filename)
-                VALUES (?, ?, ?, ?, ?)
-            ''', (name, surname, sicil_no, json.dumps(face_encoding), photo_filename))
-            conn.commit()
+            with db.transaction(DATABASE) as conn:
+                db.insert_user(conn, 'users', name, surname, sicil_no, encoding_to_blob(face_encoding), photo_filename)
         except sqlite3.IntegrityError:
             return jsonify({'error': 'Sicil no çakışması, tekrar deneyin'}), 500
-        finally:
-            conn.close()
+        # Satır id'si verilmez: araya giren başka worker kayıtları sonraki yenilemede atlanmasın
+        face_index.add(sicil_no, face_encoding)
+        if face_snapshots:
+            face_snapshots.schedule()
             
         return jsonify({
             'success': True,
@@ -501,37 +560,29 @@ def login_user():
         image_pil = image_pil.convert('RGB')
         image_np = np.array(image_pil)
         
-        # Gelen görüntüdeki yüzü bul
-        face_locations = face_recognition.face_locations(image_np)
+        # Gelen görüntüdeki yüzü bul (küçültülmüş kopyada)
+        face_locations = detect_faces(image_np)
         if not face_locations:
             return jsonify({'error': 'Yüz bulunamadı'}), 400
             
-        unknown_face_encoding = face_recognition.face_encodings(image_np, face_locations)[0]
-        
-        # Veritabanındaki kullanıcıları çek
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('SELECT id, name, surname, sicil_no, face_encoding FROM users')
-        users = cursor.fetchall()
-        conn.close()
-        
-        for user in users:
-            user_id, name, surname, sicil_no, encoding_json = user
-            known_face_encoding = np.array(json.loads(encoding_json))
-            
-            # Karşılaştır
-            results = face_recognition.compare_faces([known_face_encoding], unknown_face_encoding, tolerance=0.6)
-            
-            if results[0]:
-                return jsonify({
-                    'success': True,
-                    'message': 'Giriş başarılı',
-                    'user': {
-                        'name': name,
-                        'surname': surname,
-                        'sicil_no': sicil_no
-                    }
-                }), 200
+        # Birden fazla yüz varsa kameraya en yakın (en büyük) olan
+        unknown_face_encodings = encode_faces(image_np, [largest_face(face_locations)])
+        if not unknown_face_encodings:
+            return jsonify({'error': 'Yüz kodlanamadı'}), 400
+        unknown_face_encoding = unknown_face_encodings[0]
+        
+        # Başka worker'larda kayıt olanları al, sonra tüm yüzlerle tek seferde karşılaştır
+        refresh_face_index()
+        sicil_no, distance = face_index.search(unknown_face_encoding, FACE_RECOGNITION_TOLERANCE)
+        
+        if sicil_no is not None:
+            with db.connection(DATABASE) as conn:
+                user = db.find_user(conn, 'users', sicil_no)
+            return jsonify({
+                'success': True,
+                'message': 'Giriş başarılı',
+                'user': user
+            }), 200
                 
         return jsonify({'success': False, 'message': 'Kullanıcı tanınamadı'}), 401
         
@@ -543,6 +594,7 @@ if __name__ == '__main__':
     print("🚀 KKE Detection API başlatılıyor...")
     print("📡 URL: http://0.0.0.0:5001")
     print("📊 Dashboard: http://0.0.0.0:5001")
+    print("🏭 Production için: python server.py app (gunicorn, model worker'lar arasında paylaşılır)")
     # Production için debug=False
     import os
     debug_mode = os.getenv('FLASK_ENV') != 'production'
@@ -1,23 +1,50 @@
 from flask import Flask, jsonify, request, send_from_directory
 from flask_cors import CORS
 import random
-from datetime import datetime
+from datetime import datetime, timedelta
 import sqlite3
 import os
 import pytz
+import atexit
+import cv2
+from concurrent.futures import ThreadPoolExecutor
+from detector_pool import get_detector_pool, DETECTOR_PRELOAD
+from face_encodings import check_schema, decode_encodings, encoding_to_blob, encoding_version
+from face_index import FACE_INDEX_PATH, FACE_RECOGNITION_TOLERANCE, create_face_index, load_face_index
+from face_pipeline import detect_faces, detection_scale, encode_faces, largest_face
+from face_snapshot import FACE_SNAPSHOT_DIR, MappedFaceIndex, SnapshotBuilder
+from inference_batcher import get_inference_batcher
+from inference_profiles import INFERENCE_PROFILES, resolve_profile, resolve_mode
+from image_decode import decode_image
+import db
+import external_ingest
+from external_ingest import BulkIngestError
+import inspection_db
+from inspection_recorder import InspectionRecorder, parse_durable
+import inspection_stats
+from ppe_association import format_persons
+from result_cache import get_result_cache, make_cache_key
+from model_export import model_version
 
 app = Flask(__name__)
-CORS(app)
+# Sayfalama cursor'ı başlıkta döner, tarayıcı başka origin'den de okuyabilsin
+CORS(app, expose_headers=['X-Next-Cursor'])
 
 # Veritabanı
 DATABASE = 'ppe_inspections.db'
 
-# Basit kullanıcı listesi (memory'de)
-users = {}
+# Kayıtlı yüzlerin indeksi (FACE_INDEX_BACKEND: tam matris araması ya da ANN)
+face_index = create_face_index()
+# FACE_SNAPSHOT_DIR ayarlıysa yüzler tüm worker'ların paylaştığı salt okunur mmap'ten aranır
+face_snapshots = SnapshotBuilder(DATABASE, 'users_db') if FACE_SNAPSHOT_DIR else None
+# /api/check_in: yüz tanıma bu havuzda, PPE tespiti istek thread'inde eşzamanlı çalışır
+CHECK_IN_THREADS = int(os.environ.get('CHECK_IN_THREADS', '4'))
+check_in_executor = ThreadPoolExecutor(max_workers=CHECK_IN_THREADS, thread_name_prefix='check-in')
 
 def init_db():
     """Veritabanını başlat"""
-    conn = sqlite3.connect(DATABASE)
+    # WAL kipi dosyada kalıcıdır; ilk açılışta burada etkinleşir
+    conn = db.open_connection(DATABASE)
     cursor = conn.cursor()
     
     # Kontrol kayıtları tablosu
@@ -30,7 +57,8 @@ def init_db():
             gozluk INTEGER NOT NULL,
             uygunluk INTEGER NOT NULL,
             image_filename TEXT,
-            created_at TEXT DEFAULT CURRENT_TIMESTAMP
+            created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+            sicil_no TEXT
         )
     ''')
     
@@ -43,7 +71,7 @@ def init_db():
             sicil_no TEXT UNIQUE NOT NULL,
             departman TEXT DEFAULT 'Belirtilmemiş',
             photo_filename TEXT,
-            face_encoding TEXT,
+            face_encoding BLOB,
             created_at TEXT DEFAULT CURRENT_TIMESTAMP
         )
     ''')
@@ -56,51 +84,93 @@ def init_db():
         # Sütun zaten varsa hata vermez
         pass
     
+    # /api/veri-al kullanıcıyı ad-soyad ile bulur
+    cursor.execute('CREATE INDEX IF NOT EXISTS idx_users_db_name ON users_db (name, surname)')
+    
     conn.commit()
+    # Kontrolü yapan çalışan (sicil_no) sütunu ve indeksleri
+    inspection_db.ensure_schema(conn)
+    # /api/stats sayaçları ve günlük/saatlik toplamlar (tetikleyicilerle güncellenir)
+    inspection_stats.ensure_schema(conn)
+    check_schema(conn)
     conn.close()
     print("✅ Veritabanı hazır")
 
-def load_users_from_db():
-    """Veritabanından kullanıcıları yükle"""
-    global users
+def refresh_face_index():
+    """Son okunandan sonra kaydolan yüzleri indekse ekle (başka worker'ların kayıtları dahil)"""
+    if face_snapshots:
+        # Başka worker yeni anlık görüntü yayınladıysa ona geç
+        face_index.reload()
+    with db.connection(DATABASE) as conn:
+        rows = db.faces_after(conn, 'users_db', face_index.last_row_id)
+    
+    # Face encoding (float32 BLOB) doğrudan yüz indeksine
+    if rows:
+        face_index.add_batch([row[1] for row in rows], decode_encodings([row[2] for row in rows]), rows[-1][0])
+    return len(rows)
+
+def save_face_index():
+    """Yüz indeksini diske yaz - sonraki açılışta eğitim/kurulum tekrarlanmaz"""
+    if face_snapshots or not FACE_INDEX_PATH:
+        return
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT sicil_no, name, surname, departman, photo_filename, face_encoding
-            FROM users_db
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        users = {}
-        for row in rows:
-            sicil_no, name, surname, departman, photo_filename, face_encoding_str = row
-            user_data = {
-                'name': name,
-                'surname': surname,
-                'sicil_no': sicil_no,
-                'departman': departman or 'Belirtilmemiş',
-                'photo_filename': photo_filename
-            }
-            
-            # Face encoding'i JSON'dan listeye çevir
-            if face_encoding_str:
-                import json
-                user_data['face_encoding'] = json.loads(face_encoding_str)
-            
-            users[sicil_no] = user_data
-        
-        print(f"✅ {len(users)} kullanıcı veritabanından yüklendi")
-        if len(users) > 0:
-            print(f"📋 Kayıtlı kullanıcılar: {', '.join([f'{u['name']} {u['surname']}' for u in users.values()])}")
+        face_index.save(FACE_INDEX_PATH)
+    except Exception as e:
+        print(f"⚠️ Yüz indeksi kaydedilemedi: {e}")
+
+def load_face_index_from_db():
+    """Yüz indeksini anlık görüntüden aç, sonrasında kaydolanları veritabanından ekle"""
+    global face_index
+    try:
+        with db.connection(DATABASE) as conn:
+            max_row_id = db.max_user_id(conn, 'users_db')
+            # Güncellenen/silinen yüzler last_row_id ile görünmez, değişiklik sayacıyla yakalanır
+            db_version = encoding_version(conn, 'users_db')
+        if face_snapshots:
+            face_index = MappedFaceIndex(face_snapshots.directory)
+            if (face_index.snapshot_version is None or face_index.last_row_id > max_row_id
+                    or face_index.db_version != db_version):
+                face_snapshots.build()
+                face_index.reload()
+        else:
+            face_index = load_face_index(db_version=db_version)
+            if face_index.last_row_id > max_row_id:
+                # Anlık görüntü başka/sıfırlanmış bir veritabanına ait
+                print("⚠️ Yüz indeksi veritabanıyla uyuşmuyor, yeniden kuruluyor")
+                face_index = create_face_index()
+            face_index.db_version = db_version
+        if refresh_face_index():
+            if face_snapshots:
+                face_snapshots.schedule()
+            else:
+                save_face_index()
+        
+        print(f"✅ {len(face_index)} kayıtlı yüz yüklendi ({face_index.backend})")
     except Exception as e:
-        print(f"⚠️ Kullanıcılar yüklenirken hata: {e}")
-        users = {}
+        print(f"⚠️ Yüz indeksi yüklenirken hata: {e}")
+        face_index = create_face_index()
 
-# Veritabanını başlat ve kullanıcıları yükle
+# Veritabanını başlat ve yüz indeksini yükle
 init_db()
-load_users_from_db()
+load_face_index_from_db()
+atexit.register(save_face_index)
+
+# Kontrol kayıtları gruplar halinde commit edilir (?durable=true ile commit beklenir)
+inspection_recorder = InspectionRecorder(DATABASE)
+
+# Detector havuzu - model her istekte değil, süreç başına bir kez yüklenir
+detector_pool = get_detector_pool()
+if DETECTOR_PRELOAD:
+    try:
+        detector_pool.warm_up()
+    except Exception as e:
+        print(f"⚠️ Detector ön yüklemesi başarısız, ilk istekte tekrar denenecek: {e}")
+
+# INFERENCE_BATCHING=true ise eşzamanlı istekler tek forward pass'te toplanır
+inference_batcher = get_inference_batcher(detector_pool)
+
+# Aynı yüklemenin tekrarı için sonuç cache'i
+result_cache = get_result_cache()
 
 @app.route('/dashboard')
 @app.route('/dashboard.html')
@@ -144,16 +214,16 @@ def register_user():
         try:
             import face_recognition
             
-            # Yüz tespiti
-            face_locations = face_recognition.face_locations(image_np)
+            # Yüz tespiti (küçültülmüş kopyada, kutular orijinal koordinatlarda)
+            face_locations = detect_faces(image_np)
             if not face_locations:
                 return jsonify({'error': 'Yüz bulunamadı. Lütfen yüzünüzü net gösterin.'}), 400
             
             if len(face_locations) > 1:
                 return jsonify({'error': 'Birden fazla yüz tespit edildi. Lütfen tek kişi olun.'}), 400
             
-            # Yüz encoding
-            face_encodings = face_recognition.face_encodings(image_np, face_locations)
+            # Yüz encoding (orijinal çözünürlükteki yüz kesitinden)
+            face_encodings = encode_faces(image_np, face_locations)
             if face_encodings:
                 face_encoding = face_encodings[0].tolist()
                 print("✅ Yüz encoding oluşturuldu")
@@ -174,42 +244,26 @@ def register_user():
         image_pil.save(os.path.join('users', photo_filename))
         print(f"📸 Fotoğraf kaydedildi: {photo_filename}")
         
-        # Face encoding'i JSON string'e çevir
-        face_encoding_str = None
+        # Face encoding'i 512 byte float32 BLOB'a çevir
+        face_encoding_blob = None
         if face_encoding:
-            import json
-            face_encoding_str = json.dumps(face_encoding)
+            face_encoding_blob = encoding_to_blob(face_encoding)
         
         # Veritabanına kaydet
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
         try:
-            cursor.execute('''
-                INSERT INTO users_db (name, surname, sicil_no, departman, photo_filename, face_encoding)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (name, surname, sicil_no, 'Mobil Kayıt', photo_filename, face_encoding_str))
-            conn.commit()
+            with db.transaction(DATABASE) as conn:
+                db.insert_user(conn, 'users_db', name, surname, sicil_no, face_encoding_blob, photo_filename,
+                               departman='Mobil Kayıt')
             print(f"💾 Kullanıcı veritabanına kaydedildi (Face encoding: {'✅' if face_encoding else '❌'})")
         except sqlite3.IntegrityError:
             print("⚠️ Sicil no çakışması")
-            conn.close()
             return jsonify({'error': 'Bu sicil numarası zaten kullanılıyor'}), 400
-        finally:
-            conn.close()
-        
-        # Memory'ye de kaydet
-        user_data = {
-            'name': name,
-            'surname': surname,
-            'sicil_no': sicil_no,
-            'departman': 'Mobil Kayıt',
-            'photo_filename': photo_filename
-        }
         
         if face_encoding:
-            user_data['face_encoding'] = face_encoding
-        
-        users[sicil_no] = user_data
+            # Satır id'si verilmez: araya giren başka worker kayıtları sonraki yenilemede atlanmasın
+            face_index.add(sicil_no, face_encoding)
+            if face_snapshots:
+                face_snapshots.schedule()
         
         print(f"✅ Yeni kullanıcı kaydedildi: {name} {surname} - {sicil_no}")
         
@@ -229,6 +283,32 @@ def register_user():
         traceback.print_exc()
         return jsonify({'error': str(e)}), 500
 
+def identify_face(image_np):
+    """
+    Görüntüdeki en büyük yüzü kayıtlı yüzlerde ara: (sicil_no, mesafe, hata mesajı).
+    face_recognition kurulu değilse ImportError fırlatır.
+    """
+    import face_recognition  # noqa: F401
+    
+    # Gelen görüntüdeki yüzü bul (küçültülmüş kopyada)
+    face_locations = detect_faces(image_np)
+    if not face_locations:
+        return None, None, 'Yüz bulunamadı. Lütfen yüzünüzü kameraya gösterin.'
+    
+    # Birden fazla yüz varsa kameraya en yakın (en büyük) olan
+    unknown_face_encodings = encode_faces(image_np, [largest_face(face_locations)])
+    if not unknown_face_encodings:
+        return None, None, 'Yüz kodlanamadı. Lütfen tekrar deneyin.'
+    
+    # Kayıtlı tüm yüzlerle tek seferde karşılaştır, tolerans içindeki en yakını al
+    sicil_no, distance = face_index.search(unknown_face_encodings[0], FACE_RECOGNITION_TOLERANCE)
+    return sicil_no, distance, None
+
+def lookup_user(sicil_no):
+    """users_db'deki çalışan; yoksa None"""
+    with db.connection(DATABASE) as conn:
+        return db.find_user(conn, 'users_db', sicil_no)
+
 @app.route('/api/login_user', methods=['POST'])
 def login_user():
     """Yüz ile Giriş - Gerçek Yüz Tanıma"""
@@ -236,7 +316,10 @@ def login_user():
         if 'image' not in request.files:
             return jsonify({'error': 'No image provided'}), 400
         
-        if not users:
+        # Başka worker'larda kayıt olan kullanıcıları al (sadece yeni satırlar okunur)
+        refresh_face_index()
+        
+        if not len(face_index):
             return jsonify({
                 'success': False,
                 'message': 'Kayıtlı kullanıcı yok. Lütfen önce kayıt olun.'
@@ -262,44 +345,21 @@ def login_user():
         
         # Yüz tanıma dene
         try:
-            import face_recognition
-            
-            # Gelen görüntüdeki yüzü bul
-            face_locations = face_recognition.face_locations(image_np)
-            if not face_locations:
+            sicil_no, distance, face_error = identify_face(image_np)
+            if face_error:
                 return jsonify({
                     'success': False,
-                    'message': 'Yüz bulunamadı. Lütfen yüzünüzü kameraya gösterin.'
+                    'message': face_error
                 }), 400
             
-            unknown_face_encodings = face_recognition.face_encodings(image_np, face_locations)
-            if not unknown_face_encodings:
+            if sicil_no is not None:
+                user = lookup_user(sicil_no)
+                print(f"✅ Giriş başarılı: {user['name']} {user['surname']} (mesafe: {distance:.3f})")
                 return jsonify({
-                    'success': False,
-                    'message': 'Yüz kodlanamadı. Lütfen tekrar deneyin.'
-                }), 400
-            
-            unknown_face_encoding = unknown_face_encodings[0]
-            
-            # Kayıtlı kullanıcılarla karşılaştır
-            for sicil_no, user_data in users.items():
-                if 'face_encoding' in user_data:
-                    known_face_encoding = np.array(user_data['face_encoding'])
-                    
-                    # Karşılaştır
-                    results = face_recognition.compare_faces([known_face_encoding], unknown_face_encoding, tolerance=0.6)
-                    
-                    if results[0]:
-                        print(f"✅ Giriş başarılı: {user_data['name']} {user_data['surname']}")
-                        return jsonify({
-                            'success': True,
-                            'message': 'Giriş başarılı',
-                            'user': {
-                                'name': user_data['name'],
-                                'surname': user_data['surname'],
-                                'sicil_no': sicil_no
-                            }
-                        }), 200
+                    'success': True,
+                    'message': 'Giriş başarılı',
+                    'user': user
+                }), 200
             
             # Hiçbir kullanıcı eşleşmedi
             print("❌ Yüz tanınamadı")
@@ -325,27 +385,8 @@ def login_user():
 def get_users():
     """Tüm kullanıcıları listele - Veritabanından"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT id, name, surname, departman, sicil_no, photo_filename, created_at
-            FROM users_db
-            ORDER BY created_at DESC
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        users_list = []
-        for row in rows:
-            users_list.append({
-                'id': row[0],
-                'name': row[1],
-                'surname': row[2],
-                'departman': row[3] or 'Belirtilmemiş',
-                'sicil_no': row[4],
-                'photo_filename': row[5],
-                'created_at': row[6]
-            })
+        with db.connection(DATABASE) as conn:
+            users_list = db.list_users(conn)
         
         return jsonify({
             'users': users_list,
@@ -354,6 +395,31 @@ def get_users():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/users/<sicil_no>/inspections', methods=['GET'])
+def get_user_inspections(sicil_no):
+    """
+    Çalışanın kontrol geçmişi, yeniden eskiye.
+    Sonraki sayfa için yanıttaki next_cursor ?before= ile gönderilir (?limit= varsayılan 50, en çok 500).
+    """
+    try:
+        try:
+            before = inspection_db.decode_cursor(request.args.get('before'))
+            limit = inspection_db.page_limit(request.args.get('limit'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        user = lookup_user(sicil_no)
+        if user is None:
+            return jsonify({'error': 'Kullanıcı bulunamadı'}), 404
+        
+        with db.connection(DATABASE) as conn:
+            page = inspection_db.user_inspections(conn, sicil_no, before, limit)
+        
+        page['user'] = user
+        return jsonify(page), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/users/<filename>')
 def get_user_photo(filename):
     """Kullanıcı fotoğrafını getir"""
@@ -362,80 +428,90 @@ def get_user_photo(filename):
     except:
         return '', 404
 
+def infer_ppe(image_np, profile, per_person):
+    """Batcher açıksa eşzamanlı isteklerle birlikte, değilse havuzdan ödünç alınan Detector ile"""
+    if inference_batcher is not None:
+        return inference_batcher.validate_ppe(image_np, profile, per_person)
+    with detector_pool.borrow() as detector:
+        return detector.validate_ppe(image_np, profile, per_person)
+
+def summarize_ppe(results):
+    """Detector sonucu -> Flutter alanları: (detected_items, missing_items, success)"""
+    detected_items = {
+        'Kask': results['detected_items']['helmet'],
+        'Yelek': results['detected_items']['vest']
+    }
+    
+    missing_items = []
+    if not detected_items['Kask']:
+        missing_items.append('Kask')
+    if not detected_items['Yelek']:
+        missing_items.append('Yelek')
+    
+    return detected_items, missing_items, len(missing_items) == 0
+
+def record_inspection(detected_items, success, sicil_no=None, durable=None):
+    """Kontrol kaydı - Türkiye saat diliminde, grup commit kuyruğu üzerinden"""
+    turkey_tz = pytz.timezone('Europe/Istanbul')
+    now_turkey = datetime.now(turkey_tz)
+    
+    inspection_recorder.record(now_turkey.isoformat(), detected_items['Kask'], detected_items['Yelek'], success,
+                               'mobile_check.jpg', sicil_no, durable=durable)
+
 @app.route('/validate_image', methods=['POST'])
 def validate_image():
     """PPE Validation - Gerçek Tespit"""
     try:
         if 'image' not in request.files:
             return jsonify({'error': 'No image provided'}), 400
+
+        # Çıkarım profili (?profile=fast|balanced|accurate) ve mod (?mode=image|person), boşsa deployment varsayılanı
+        try:
+            profile = resolve_profile(request.args.get('profile'))
+            mode = resolve_mode(request.args.get('mode'))
+            durable = parse_durable(request.args.get('durable'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        per_person = mode == 'person'
         
         file = request.files['image']
+        data = file.read()
         
-        # Görüntüyü oku
-        from PIL import Image
-        import numpy as np
-        
-        image_pil = Image.open(file.stream)
-        
-        # EXIF orientation düzeltmesi
-        try:
-            from PIL import ImageOps
-            image_pil = ImageOps.exif_transpose(image_pil)
-        except:
-            pass
+        # Aynı dosya tekrar gönderildiyse (timeout sonrası retry) decode ve çıkarım atlanır
+        cache_key = make_cache_key(data, model_version(), profile, mode)
+        results = result_cache.get(cache_key)
         
-        image_pil = image_pil.convert('RGB')
-        image_np = np.array(image_pil)
+        if results is None:
+            # Model girişine yakın boyutta decode, EXIF orientation metadata'dan uygulanır
+            image_np, _ = decode_image(data, INFERENCE_PROFILES[profile]['imgsz'])
+        else:
+            print("♻️ Sonuç cache'ten döndürülüyor")
         
-        # Detector'ı import et ve kullan
+        # Havuzdan hazır Detector ödünç al
         try:
-            from detector import Detector
-            detector = Detector()
-            results = detector.validate_ppe(image_np)
+            if results is None:
+                results = infer_ppe(image_np, profile, per_person)
+                result_cache.put(cache_key, results)
             
             # Flutter için response'u düzenle
-            detected_items = {
-                'Kask': results['detected_items']['helmet'],
-                'Yelek': results['detected_items']['vest']
-            }
-            
-            missing_items = []
-            if not detected_items['Kask']:
-                missing_items.append('Kask')
-            if not detected_items['Yelek']:
-                missing_items.append('Yelek')
-            
-            success = len(missing_items) == 0
+            detected_items, missing_items, success = summarize_ppe(results)
             
             print(f"🔍 PPE Kontrolü: Kask={detected_items['Kask']}, Yelek={detected_items['Yelek']}")
             
-            # Veritabanına kaydet - Türkiye saat diliminde
-            turkey_tz = pytz.timezone('Europe/Istanbul')
-            now_turkey = datetime.now(turkey_tz)
-            
-            conn = sqlite3.connect(DATABASE)
-            cursor = conn.cursor()
-            cursor.execute('''
-                INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                now_turkey.isoformat(),
-                1 if detected_items['Kask'] else 0,
-                1 if detected_items['Yelek'] else 0,
-                0,  # gozluk
-                1 if success else 0,
-                'mobile_check.jpg'
-            ))
-            conn.commit()
-            conn.close()
+            record_inspection(detected_items, success, durable=durable)
             print("💾 Kontrol veritabanına kaydedildi")
             
-            return jsonify({
+            response = {
                 'success': success,
                 'detected_items': detected_items,
                 'missing_items': missing_items,
-                'message': '✅ Tüm ekipmanlar mevcut' if success else f'⚠️ Eksik: {", ".join(missing_items)}'
-            }), 200
+                'message': '✅ Tüm ekipmanlar mevcut' if success else f'⚠️ Eksik: {", ".join(missing_items)}',
+                'profile': profile
+            }
+            if 'persons' in results:
+                response['persons'] = format_persons(results['persons'])
+            
+            return jsonify(response), 200
             
         except Exception as detector_error:
             print(f"⚠️ Detector hatası, rastgele sonuç döndürülüyor: {detector_error}")
@@ -467,6 +543,109 @@ def validate_image():
         print(f"❌ Validate Error: {e}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/check_in', methods=['POST'])
+def check_in():
+    """
+    Tek yüklemede yüz ile giriş + PPE kontrolü.
+    Görüntü bir kez tam çözünürlükte decode edilir; yüz tanıma bunun üzerinde havuzda, PPE tespiti
+    INTER_AREA ile imgsz'e küçültülmüş kopyasında bu thread'de eşzamanlı çalışır.
+    Kontrol kaydı tanınan çalışanın sicil_no'su ile tutulur.
+    """
+    try:
+        if 'image' not in request.files:
+            return jsonify({'error': 'No image provided'}), 400
+        
+        try:
+            profile = resolve_profile(request.args.get('profile'))
+            mode = resolve_mode(request.args.get('mode'))
+            durable = parse_durable(request.args.get('durable'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        per_person = mode == 'person'
+        
+        data = request.files['image'].read()
+        # Yüz kesiti için tam çözünürlük gerekli
+        image_np, _ = decode_image(data)
+        
+        refresh_face_index()
+        face_future = check_in_executor.submit(identify_face, image_np)
+        
+        # PPE girdisi /validate_image'ın küçük decode'undan farklı (tam decode + INTER_AREA), cache ayrı tutulur
+        cache_key = make_cache_key(data, model_version(), profile, f'{mode}:check_in')
+        results = result_cache.get(cache_key)
+        try:
+            if results is None:
+                ppe_image = image_np
+                scale = detection_scale(image_np.shape, INFERENCE_PROFILES[profile]['imgsz'])
+                if scale != 1.0:
+                    height, width = image_np.shape[:2]
+                    ppe_image = cv2.resize(image_np, (round(width * scale), round(height * scale)),
+                                           interpolation=cv2.INTER_AREA)
+                results = infer_ppe(ppe_image, profile, per_person)
+                result_cache.put(cache_key, results)
+        except Exception as detector_error:
+            # Kayıt bir çalışana bağlanacağı için rastgele sonuca düşülmez
+            print(f"❌ Check-in PPE hatası: {detector_error}")
+            face_future.cancel()
+            return jsonify({'error': 'PPE tespiti yapılamadı, lütfen tekrar deneyin'}), 503
+        
+        user = None
+        face_message = None
+        try:
+            sicil_no, distance, face_message = face_future.result()
+            if sicil_no is not None:
+                user = lookup_user(sicil_no)
+                print(f"✅ Check-in: {user['name']} {user['surname']} (mesafe: {distance:.3f})")
+            elif face_message is None:
+                face_message = 'Yüzünüz tanınamadı. Lütfen kayıt olun.'
+        except ImportError:
+            face_message = 'Yüz tanıma sistemi aktif değil.'
+        
+        detected_items, missing_items, success = summarize_ppe(results)
+        print(f"🔍 PPE Kontrolü: Kask={detected_items['Kask']}, Yelek={detected_items['Yelek']}")
+        
+        # Tanınmayan çalışanın kontrolü de kaydedilir (sicil_no boş)
+        record_inspection(detected_items, success, user['sicil_no'] if user else None, durable=durable)
+        print("💾 Kontrol veritabanına kaydedildi")
+        
+        response = {
+            'success': success,
+            'identified': user is not None,
+            'user': user,
+            'detected_items': detected_items,
+            'missing_items': missing_items,
+            'message': '✅ Tüm ekipmanlar mevcut' if success else f'⚠️ Eksik: {", ".join(missing_items)}',
+            'profile': profile
+        }
+        if face_message:
+            response['face_message'] = face_message
+        if 'persons' in results:
+            response['persons'] = format_persons(results['persons'])
+        
+        return jsonify(response), 200
+        
+    except Exception as e:
+        print(f"❌ Check-in Error: {e}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/recorder/stats', methods=['GET'])
+def recorder_stats():
+    """Kontrol kaydı grup commit kuyruğu bilgisi"""
+    return jsonify(inspection_recorder.stats()), 200
+
+@app.route('/api/cache/stats', methods=['GET'])
+def cache_stats():
+    """Sonuç cache'i hit/miss sayaçları"""
+    return jsonify(result_cache.stats()), 200
+
+@app.route('/api/detector/health', methods=['GET'])
+def detector_health():
+    """Detector havuzu sağlık ve doluluk bilgisi"""
+    stats = detector_pool.stats()
+    if inference_batcher is not None:
+        stats['batching'] = inference_batcher.stats()
+    return jsonify(stats), 503 if stats['status'] == 'error' else 200
+
 @app.route('/')
 def home():
     """Ana sayfa - Dashboard'a yönlendir"""
@@ -482,67 +661,80 @@ def api_info():
             '/api/register_user',
             '/api/login_user',
             '/api/users',
+            '/api/users/<sicil_no>/inspections',
             '/validate_image',
+            '/api/check_in',
             '/dashboard',
             '/api/inspections',
-            '/api/stats'
+            '/api/stats',
+            '/api/stats/daily',
+            '/api/stats/hourly',
+            '/api/detector/health',
+            '/api/cache/stats',
+            '/api/recorder/stats'
         ]
     })
 
 @app.route('/api/inspections', methods=['GET'])
 def get_inspections():
-    """Tüm kontrol kayıtlarını getir"""
+    """
+    Kontrol kayıtları, yeniden eskiye - varsayılan 100 kayıt.
+    Filtreler ve sayfalama için inspection_db'ye bakın; sonraki sayfanın cursor'ı X-Next-Cursor başlığında.
+    """
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        cursor.execute('''
-            SELECT timestamp, kask, yelek, gozluk, uygunluk, image_filename
-            FROM inspections
-            ORDER BY timestamp DESC
-            LIMIT 100
-        ''')
-        rows = cursor.fetchall()
-        conn.close()
-        
-        inspections = []
-        for row in rows:
-            inspections.append({
-                'timestamp': row[0],
-                'kask': row[1],
-                'yelek': row[2],
-                'gozluk': row[3],
-                'uygunluk': row[4],
-                'image_filename': row[5]
-            })
-        
-        return jsonify(inspections), 200
+        try:
+            query = inspection_db.parse_query(request.args, default_limit=100)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        with db.connection(DATABASE) as conn:
+            page = inspection_db.fetch_page(conn, *query)
+        
+        # Gövde eskisi gibi liste - mevcut istemciler değişmeden çalışır
+        response = jsonify(page['inspections'])
+        if page['next_cursor']:
+            response.headers['X-Next-Cursor'] = page['next_cursor']
+        return response, 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
 @app.route('/api/stats', methods=['GET'])
 def get_stats():
-    """İstatistikler"""
+    """İstatistikler - tetikleyicilerle tutulan özet satırından, tablo taranmaz"""
     try:
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        cursor.execute('SELECT COUNT(*) FROM inspections')
-        total = cursor.fetchone()[0]
-        
-        cursor.execute('SELECT COUNT(*) FROM inspections WHERE uygunluk = 1')
-        compliant = cursor.fetchone()[0]
-        
-        conn.close()
-        
-        non_compliant = total - compliant
-        compliance_rate = (compliant / total * 100) if total > 0 else 0
-        
-        return jsonify({
-            'total': total,
-            'compliant': compliant,
-            'non_compliant': non_compliant,
-            'compliance_rate': round(compliance_rate, 1)
-        }), 200
+        with db.connection(DATABASE) as conn:
+            stats = inspection_stats.summary(conn)
+        return jsonify(stats), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stats/daily', methods=['GET'])
+def get_daily_stats():
+    """Günlük toplamlar (?from=&to=, YYYY-MM-DD) - varsayılan son 7 gün"""
+    try:
+        today = datetime.now(pytz.timezone('Europe/Istanbul')).date()
+        try:
+            end = inspection_stats.parse_day(request.args.get('to'), today)
+            start = inspection_stats.parse_day(request.args.get('from'), today - timedelta(days=6))
+            with db.connection(DATABASE) as conn:
+                days = inspection_stats.daily(conn, start, end)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        return jsonify({'from': start, 'to': end, 'days': days}), 200
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/stats/hourly', methods=['GET'])
+def get_hourly_stats():
+    """Bir günün saatlik toplamları (?date=YYYY-MM-DD) - varsayılan bugün"""
+    try:
+        try:
+            day = inspection_stats.parse_day(request.args.get('date'), datetime.now(pytz.timezone('Europe/Istanbul')).date())
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        with db.connection(DATABASE) as conn:
+            hours = inspection_stats.hourly(conn, day)
+        return jsonify({'date': day, 'hours': hours}), 200
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
@@ -556,80 +748,46 @@ def receive_external_data():
         if not data:
             return jsonify({'error': 'JSON verisi bulunamadı'}), 400
         
+        try:
+            durable = parse_durable(request.args.get('durable'))
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Gerekli alanları kontrol et
-        required_fields = ['isim', 'soyisim', 'departman', 'durum', 'tarih', 'saat']
-        for field in required_fields:
+        for field in external_ingest.REQUIRED_FIELDS:
             if field not in data:
                 return jsonify({'error': f'Eksik alan: {field}'}), 400
         
-        conn = sqlite3.connect(DATABASE)
-        cursor = conn.cursor()
-        
-        # 1. Kullanıcıyı users_db tablosuna ekle (eğer yoksa)
-        sicil_no = f"EXT{random.randint(1000, 9999)}"  # Dış sistemden gelenlere EXT prefix
-        
-        # Kullanıcı zaten var mı kontrol et
-        cursor.execute('''
-            SELECT sicil_no FROM users_db WHERE name = ? AND surname = ?
-        ''', (data['isim'], data['soyisim']))
-        
-        existing_user = cursor.fetchone()
-        if existing_user:
-            sicil_no = existing_user[0]
-            print(f"👤 Mevcut kullanıcı bulundu: {data['isim']} {data['soyisim']} - {sicil_no}")
-        else:
-            # Yeni kullanıcı ekle
-            cursor.execute('''
-                INSERT INTO users_db (name, surname, sicil_no, departman, photo_filename, face_encoding)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (data['isim'], data['soyisim'], sicil_no, data['departman'], None, None))
-            
-            # Memory'ye de ekle
-            users[sicil_no] = {
-                'name': data['isim'],
-                'surname': data['soyisim'],
-                'sicil_no': sicil_no,
-                'departman': data['departman'],
-                'photo_filename': None
-            }
-            print(f"👤 Yeni kullanıcı eklendi: {data['isim']} {data['soyisim']} - {sicil_no}")
-        
-        # 2. Kontrol kaydı ekle (durum -> kask/yelek mapping)
-        # "Gecti" = Kask:Var, Yelek:Var, Uygun
-        # "Kaldi" = Kask:Yok, Yelek:Yok, Uygun Değil
-        kask = 1 if data['durum'] == 'Gecti' else 0
-        yelek = 1 if data['durum'] == 'Gecti' else 0
-        uygunluk = 1 if data['durum'] == 'Gecti' else 0
+        # Kontrol sonucu (durum -> kask/yelek mapping)
+        kask, yelek, uygunluk = external_ingest.control_result(data['durum'])
         
         # Tarih/saat formatını ISO formatına çevir - Türkiye saat diliminde
         try:
-            # "24.05.2024 14:30:05" formatından datetime'a çevir
-            datetime_str = f"{data['tarih']} {data['saat']}"
-            dt = datetime.strptime(datetime_str, "%d.%m.%Y %H:%M:%S")
-            
-            # Türkiye saat dilimini ekle
-            turkey_tz = pytz.timezone('Europe/Istanbul')
-            dt_turkey = turkey_tz.localize(dt)
-            timestamp = dt_turkey.isoformat()
-        except:
+            # "24.05.2024 14:30:05" formatından
+            timestamp = external_ingest.parse_timestamp(data['tarih'], data['saat'])
+        except (TypeError, ValueError):
             # Hatalı format durumunda şu anki Türkiye zamanını kullan
-            turkey_tz = pytz.timezone('Europe/Istanbul')
-            timestamp = datetime.now(turkey_tz).isoformat()
-        
-        cursor.execute('''
-            INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename)
-            VALUES (?, ?, ?, ?, ?, ?)
-        ''', (
-            timestamp,
-            kask,
-            yelek,
-            0,  # gözlük
-            uygunluk,
-            f'external_{data["isim"]}_{data["soyisim"]}.jpg'
-        ))
-        
-        conn.commit()
-        conn.close()
+            timestamp = datetime.now(external_ingest.TURKEY_TZ).isoformat()
+        
+        # 1. Kullanıcıyı users_db tablosuna ekle (eğer yoksa) - mevcut kullanıcı için yazma işlemi açılmaz
+        with db.connection(DATABASE) as conn:
+            sicil_no = db.find_sicil_no_by_name(conn, data['isim'], data['soyisim'])
+        if sicil_no:
+            print(f"👤 Mevcut kullanıcı bulundu: {data['isim']} {data['soyisim']} - {sicil_no}")
+        else:
+            with db.transaction(DATABASE) as conn:
+                # Aynı kişi için eşzamanlı ilk istek kullanıcıyı az önce eklemiş olabilir
+                sicil_no = db.find_sicil_no_by_name(conn, data['isim'], data['soyisim'])
+                if sicil_no is None:
+                    sicil_no = f"EXT{random.randint(1000, 9999)}"  # Dış sistemden gelenlere EXT prefix
+                    db.insert_user(conn, 'users_db', data['isim'], data['soyisim'], sicil_no, None, None,
+                                   departman=data['departman'])
+                    print(f"👤 Yeni kullanıcı eklendi: {data['isim']} {data['soyisim']} - {sicil_no}")
+        
+        # 2. Kontrol kaydı ekle - grup commit kuyruğu üzerinden
+        inspection_recorder.record(timestamp, kask, yelek, uygunluk,
+                                   external_ingest.external_filename(data['isim'], data['soyisim']), sicil_no,
+                                   durable=durable)
         
         print(f"📥 Arkadaş sisteminden veri alındı: {data['isim']} {data['soyisim']} - {data['durum']}")
         print(f"👤 Kullanıcı: {sicil_no}")
@@ -653,6 +811,32 @@ def receive_external_data():
         return jsonify({'error': str(e)}), 500
 
 
+@app.route('/api/veri-al/bulk', methods=['POST'])
+def receive_external_bulk():
+    """
+    Toplu dış sistem kaydı - NDJSON (application/x-ndjson) ya da JSON dizisi.
+    Kayıtlar akış halinde doğrulanır, geçerli olanlar tek işlemde yazılır; yanıtta kayıt başına sonuç.
+    """
+    try:
+        try:
+            parsed = external_ingest.parse_records(external_ingest.iter_records(request.stream, request.content_type))
+        except BulkIngestError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        with db.transaction(DATABASE) as conn:
+            result = external_ingest.ingest(conn, parsed)
+        
+        print(f"📥 Toplu veri alındı: {result['inserted']}/{result['received']} kayıt, "
+              f"{result['users_created']} yeni kullanıcı")
+        return jsonify(result), 200
+        
+    except Exception as e:
+        print(f"❌ Toplu veri alma hatası: {e}")
+        import traceback
+        traceback.print_exc()
+        return jsonify({'error': str(e)}), 500
+
+
 
 if __name__ == '__main__':
     import os
@@ -664,6 +848,7 @@ if __name__ == '__main__':
     print(f"📡 URL: http://0.0.0.0:5002")
     print(f"🔧 Mod: {'Production' if is_production else 'Development'}")
     print(f"💾 Veritabanı: {DATABASE}")
+    print("🏭 Production için: python server.py app_simple (gunicorn, model worker'lar arasında paylaşılır)")
     
     # Production'da debug=False
     app.run(
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Batch'li ve batch'siz PPE çıkarım throughput karşılaştırması (images/sec)
+
+Kullanım:
+    python benchmark_batching.py --images 64 --concurrency 16 --max-batch-size 8 --max-wait-ms 25
+"""
+import argparse
+import glob
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from PIL import Image
+
+from detector_pool import DetectorPool
+from inference_batcher import InferenceBatcher
+
+INSPECTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'inspections')
+
+
+def load_images(limit):
+    paths = sorted(glob.glob(os.path.join(INSPECTIONS_DIR, '**', '*.jpg'), recursive=True))[:limit]
+    if not paths:
+        raise SystemExit(f"❌ Görüntü bulunamadı: {INSPECTIONS_DIR}")
+    return [np.array(Image.open(path).convert('RGB')) for path in paths]
+
+
+def run(images, concurrency, validate):
+    """Tüm görüntüleri eşzamanlı gönder, images/sec döndür"""
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        list(executor.map(validate, images))
+    elapsed = time.perf_counter() - start
+    return len(images) / elapsed, elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--images', type=int, default=64)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--pool-size', type=int, default=1)
+    parser.add_argument('--max-batch-size', type=int, default=8)
+    parser.add_argument('--max-wait-ms', type=float, default=25)
+    args = parser.parse_args()
+
+    images = load_images(args.images)
+    print(f"📂 {len(images)} görüntü yüklendi, eşzamanlılık: {args.concurrency}")
+
+    pool = DetectorPool(size=args.pool_size).warm_up()
+
+    # Isınma - ilk çağrılar ölçüme dahil edilmez
+    with pool.borrow() as detector:
+        detector.validate_ppe(images[0])
+
+    def unbatched(image):
+        with pool.borrow() as detector:
+            return detector.validate_ppe(image)
+
+    batcher = InferenceBatcher(pool, max_batch_size=args.max_batch_size, max_wait_ms=args.max_wait_ms).start()
+
+    unbatched_ips, unbatched_s = run(images, args.concurrency, unbatched)
+    batched_ips, batched_s = run(images, args.concurrency, batcher.validate_ppe)
+
+    print("=" * 60)
+    print(f"Batch'siz : {unbatched_ips:6.2f} images/sec ({unbatched_s:.1f}s)")
+    print(f"Batch'li  : {batched_ips:6.2f} images/sec ({batched_s:.1f}s)")
+    print(f"Hızlanma  : {batched_ips / unbatched_ips:.2f}x")
+    print(f"Batcher   : {batcher.stats()}")
+    print("=" * 60)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+"""
+Dış sistem kayıt yükleme karşılaştırması: kayıt başına /api/veri-al ve toplu /api/veri-al/bulk
+
+tek tek -> her kayıt için ad-soyad sorgusu, gerekirse kullanıcı ekleme ve ayrı commit
+toplu    -> NDJSON gövde akış halinde ayrıştırılır, tek işlemde executemany
+
+Kayıtlar --people kişiye dağıtılır (kesinti sonrası geri gönderilen birikmiş kayıtlar gibi).
+
+Kullanım:
+    python benchmark_bulk_ingest.py --records 100000 --people 2000 --single 5000
+"""
+import argparse
+import io
+import json
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+import db
+import external_ingest
+import inspection_db
+import inspection_stats
+from benchmark_db import SCHEMA
+
+
+def create_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.execute('CREATE INDEX IF NOT EXISTS idx_users_db_name ON users_db (name, surname)')
+    conn.commit()
+    inspection_db.ensure_schema(conn)
+    inspection_stats.ensure_schema(conn)
+    conn.close()
+
+
+def make_records(count, people):
+    start = datetime(2024, 1, 1)
+    records = []
+    for _ in range(count):
+        person = random.randrange(people)
+        moment = start + timedelta(seconds=random.randint(0, 180 * 86400))
+        records.append({
+            'isim': f'Isim{person}',
+            'soyisim': f'Soyisim{person}',
+            'departman': f'Departman{person % 12}',
+            'durum': 'Gecti' if random.random() < 0.8 else 'Kaldi',
+            'tarih': moment.strftime('%d.%m.%Y'),
+            'saat': moment.strftime('%H:%M:%S')
+        })
+    return records
+
+
+def ingest_single(path, record):
+    """/api/veri-al ile aynı adımlar (grup commit'siz, kayıt başına commit)"""
+    isim, soyisim, departman, timestamp, kask, yelek, uygunluk = external_ingest.validate_record(record)
+    with db.connection(path) as conn:
+        sicil_no = db.find_sicil_no_by_name(conn, isim, soyisim)
+    with db.transaction(path) as conn:
+        if sicil_no is None:
+            sicil_no = f"EXT{random.randint(1000, 99999999)}"
+            db.insert_user(conn, 'users_db', isim, soyisim, sicil_no, None, None, departman=departman)
+        db.insert_inspection(conn, timestamp, kask, yelek, uygunluk,
+                             external_ingest.external_filename(isim, soyisim), sicil_no)
+
+
+def verify_stats(path):
+    """Toplu yazma sonrası sayaçlar kayıtlardan yeniden hesaplananla aynı mı"""
+    with db.connection(path) as conn:
+        before = (inspection_stats.summary(conn),
+                  conn.execute('SELECT * FROM inspection_stats_hourly ORDER BY hour').fetchall())
+        inspection_stats.rebuild(conn)
+        after = (inspection_stats.summary(conn),
+                 conn.execute('SELECT * FROM inspection_stats_hourly ORDER BY hour').fetchall())
+    return before == after
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--records', type=int, default=100000)
+    parser.add_argument('--people', type=int, default=2000)
+    parser.add_argument('--single', type=int, default=5000, help='tek tek yazılacak kayıt sayısı (0 = atla)')
+    parser.add_argument('--dir', default=None, help='geçici veritabanlarının klasörü (varsayılan: sistem temp)')
+    args = parser.parse_args()
+
+    records = make_records(args.records, args.people)
+    body = '\n'.join(json.dumps(record, ensure_ascii=False) for record in records).encode()
+    print(f"📦 {args.records} kayıt, {args.people} kişi, NDJSON gövde {len(body) / 1024 / 1024:.1f} MB")
+
+    workdir = tempfile.mkdtemp(prefix='benchmark_bulk_ingest_', dir=args.dir)
+    try:
+        if args.single:
+            path = os.path.join(workdir, 'single.db')
+            create_database(path)
+            count = min(args.single, len(records))
+            start = time.perf_counter()
+            for record in records[:count]:
+                ingest_single(path, record)
+            elapsed = time.perf_counter() - start
+            print(f"🐢 Tek tek: {count} kayıt {elapsed:.2f}s -> {count / elapsed:,.0f} kayıt/sn "
+                  f"({args.records} kayıt için ~{args.records / count * elapsed:.0f}s)")
+
+        path = os.path.join(workdir, 'bulk.db')
+        create_database(path)
+        start = time.perf_counter()
+        parsed = external_ingest.parse_records(external_ingest.iter_ndjson(io.BytesIO(body)))
+        parsed_at = time.perf_counter()
+        with db.transaction(path) as conn:
+            result = external_ingest.ingest(conn, parsed)
+        elapsed = time.perf_counter() - start
+        print(f"🚀 Toplu: {result['inserted']} kayıt {elapsed:.2f}s -> {result['inserted'] / elapsed:,.0f} kayıt/sn "
+              f"(ayrıştırma+doğrulama {parsed_at - start:.2f}s, yazma {elapsed - parsed_at + start:.2f}s, "
+              f"{result['users_created']} yeni kullanıcı)")
+        print(f"📊 İstatistik sayaçları tutarlı: {'✅' if verify_stats(path) else '❌'}")
+    finally:
+        db.close_pools()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
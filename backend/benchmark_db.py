@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+"""
+Eşzamanlı yazma + okuma altında veritabanı erişimi karşılaştırması
+
+eski -> her işlemde sqlite3.connect/close, rollback journal (eski route'lardaki gibi)
+yeni -> db.py: WAL, havuzlanmış bağlantılar, BEGIN IMMEDIATE
+
+Yazıcı thread'ler kontrol kaydı ekler, okuyucu thread'ler liste sayfası ve /api/stats özetini okur.
+Her iki kip için işlem/sn, p50/p95 gecikme ve "database is locked" hata sayısı yazdırılır.
+
+Kullanım:
+    python benchmark_db.py --writers 8 --readers 8 --seconds 10 --rows 100000
+"""
+import argparse
+import os
+import random
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime, timedelta
+
+import numpy as np
+
+import db
+import inspection_db
+import inspection_stats
+
+SCHEMA = ('''
+    CREATE TABLE inspections (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp TEXT NOT NULL,
+        kask INTEGER NOT NULL,
+        yelek INTEGER NOT NULL,
+        gozluk INTEGER NOT NULL,
+        uygunluk INTEGER NOT NULL,
+        image_filename TEXT,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+        sicil_no TEXT
+    )
+''', '''
+    CREATE TABLE users_db (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        name TEXT NOT NULL,
+        surname TEXT NOT NULL,
+        sicil_no TEXT UNIQUE NOT NULL,
+        departman TEXT DEFAULT 'Belirtilmemiş',
+        photo_filename TEXT,
+        face_encoding BLOB,
+        created_at TEXT DEFAULT CURRENT_TIMESTAMP
+    )
+''')
+
+
+def random_row(now):
+    kask = random.random() < 0.8
+    yelek = random.random() < 0.8
+    timestamp = (now - timedelta(seconds=random.randint(0, 90 * 86400))).isoformat()
+    return timestamp, int(kask), int(yelek), int(kask and yelek), 'benchmark.jpg', f'S{random.randint(1, 500)}'
+
+
+def create_database(path, rows, wal):
+    """Şema + indeksler + istatistik tetikleyicileri + başlangıç kayıtları"""
+    conn = sqlite3.connect(path)
+    conn.execute(f"PRAGMA journal_mode = {'WAL' if wal else 'DELETE'}")
+    for statement in SCHEMA:
+        conn.execute(statement)
+    now = datetime.now()
+    conn.executemany('''
+        INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename, sicil_no)
+        VALUES (?, ?, ?, 0, ?, ?, ?)
+    ''', (random_row(now) for _ in range(rows)))
+    conn.commit()
+    inspection_db.ensure_schema(conn)
+    inspection_stats.ensure_schema(conn)
+    conn.close()
+
+
+# --- Eski erişim: işlem başına bağlantı ---
+
+def legacy_insert(path, row):
+    conn = sqlite3.connect(path)
+    try:
+        conn.execute('''
+            INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename, sicil_no)
+            VALUES (?, ?, ?, 0, ?, ?, ?)
+        ''', row)
+        conn.commit()
+    finally:
+        conn.close()
+
+
+def legacy_read(path):
+    conn = sqlite3.connect(path)
+    try:
+        inspection_db.fetch_page(conn, [], [], None, 50)
+        inspection_stats.summary(conn)
+    finally:
+        conn.close()
+
+
+# --- Yeni erişim: db.py ---
+
+def pooled_insert(path, row):
+    with db.transaction(path) as conn:
+        db.insert_inspection(conn, *row)
+
+
+def pooled_read(path):
+    with db.connection(path) as conn:
+        inspection_db.fetch_page(conn, [], [], None, 50)
+        inspection_stats.summary(conn)
+
+
+def run(path, insert, read, writers, readers, seconds):
+    """Süre boyunca thread'leri çalıştır; tür başına (gecikmeler, kilit hataları)"""
+    deadline = time.perf_counter() + seconds
+    results = {'write': ([], [0]), 'read': ([], [0])}
+    lock = threading.Lock()
+    now = datetime.now()
+
+    def worker(kind):
+        latencies = []
+        locked = 0
+        while time.perf_counter() < deadline:
+            start = time.perf_counter()
+            try:
+                if kind == 'write':
+                    insert(path, random_row(now))
+                else:
+                    read(path)
+            except sqlite3.OperationalError as e:
+                if 'locked' not in str(e):
+                    raise
+                locked += 1
+                continue
+            latencies.append(time.perf_counter() - start)
+        with lock:
+            results[kind][0].extend(latencies)
+            results[kind][1][0] += locked
+
+    threads = ([threading.Thread(target=worker, args=('write',)) for _ in range(writers)]
+               + [threading.Thread(target=worker, args=('read',)) for _ in range(readers)])
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return {kind: (latencies, locked[0]) for kind, (latencies, locked) in results.items()}
+
+
+def report(name, results, seconds):
+    print(f"\n{name}")
+    for kind, (latencies, locked) in results.items():
+        if latencies:
+            ms = np.array(latencies) * 1000
+            print(f"  {kind:5s}: {len(ms) / seconds:8.0f} işlem/sn | p50 {np.percentile(ms, 50):7.2f} ms | "
+                  f"p95 {np.percentile(ms, 95):7.2f} ms | kilit hatası: {locked}")
+        else:
+            print(f"  {kind:5s}: hiç tamamlanmadı | kilit hatası: {locked}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--writers', type=int, default=8)
+    parser.add_argument('--readers', type=int, default=8)
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--rows', type=int, default=100000, help='başlangıç kayıt sayısı')
+    parser.add_argument('--dir', default=None, help='geçici veritabanlarının klasörü (varsayılan: sistem temp)')
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix='benchmark_db_', dir=args.dir)
+    try:
+        legacy_path = os.path.join(workdir, 'legacy.db')
+        pooled_path = os.path.join(workdir, 'pooled.db')
+        print(f"🗄️ {args.rows} kayıtlı veritabanları hazırlanıyor...")
+        create_database(legacy_path, args.rows, wal=False)
+        create_database(pooled_path, args.rows, wal=True)
+        print(f"⚙️ {args.writers} yazıcı + {args.readers} okuyucu thread, {args.seconds:g} saniye")
+
+        report("📉 Eski (connect/close, rollback journal)",
+               run(legacy_path, legacy_insert, legacy_read, args.writers, args.readers, args.seconds), args.seconds)
+        report("📈 Yeni (db.py: WAL + havuz + BEGIN IMMEDIATE)",
+               run(pooled_path, pooled_insert, pooled_read, args.writers, args.readers, args.seconds), args.seconds)
+        print(f"\n🔌 Havuz: {db.get_pool(pooled_path).stats()}")
+    finally:
+        db.close_pools()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
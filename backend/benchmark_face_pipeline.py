@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Küçültülmüş yüz tespiti karşılaştırması - kayıtlı fotoğraflarda gecikme ve eşleşme doğruluğu
+
+Referans: eski yol (tam çözünürlükte face_locations + face_encodings). Her --max-side için
+encoding'lerin referansa uzaklığı ve kendi kaydına doğru eşleşme oranı (galeri = referans encoding'ler).
+
+Kullanım:
+    python benchmark_face_pipeline.py --photos-dir users --max-side 0,960,640,480 --limit 200
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+from PIL import Image, ImageOps
+
+from face_index import FACE_RECOGNITION_TOLERANCE, FaceIndex
+from face_pipeline import FACE_DETECTION_MODEL, detect_faces, encode_faces, largest_face
+
+
+def load_photos(photos_dir, limit):
+    paths = sorted(glob.glob(os.path.join(photos_dir, '*.jpg')) + glob.glob(os.path.join(photos_dir, '*.png')))
+    if limit:
+        paths = paths[:limit]
+    if not paths:
+        raise SystemExit(f"❌ Fotoğraf bulunamadı: {photos_dir}")
+    return paths, [np.array(ImageOps.exif_transpose(Image.open(path)).convert('RGB')) for path in paths]
+
+
+def reference_encodings(images, model):
+    """Eski yol: tam çözünürlükte tespit ve encoding"""
+    import face_recognition
+
+    encodings = []
+    latencies = []
+    for image in images:
+        start = time.perf_counter()
+        locations = face_recognition.face_locations(image, model=model)
+        encoding = face_recognition.face_encodings(image, [largest_face(locations)])[0] if locations else None
+        latencies.append((time.perf_counter() - start) * 1000)
+        encodings.append(encoding)
+    return encodings, np.array(latencies)
+
+
+def pipeline_encodings(images, max_side, model):
+    encodings = []
+    latencies = []
+    for image in images:
+        start = time.perf_counter()
+        locations = detect_faces(image, max_side=max_side, model=model)
+        encoding = encode_faces(image, [largest_face(locations)])[0] if locations else None
+        latencies.append((time.perf_counter() - start) * 1000)
+        encodings.append(encoding)
+    return encodings, np.array(latencies)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--photos-dir', default='users')
+    parser.add_argument('--limit', type=int, default=0, help='0 = tüm fotoğraflar')
+    parser.add_argument('--max-side', default='0,960,640,480', help='Virgülle ayrılmış uzun kenar değerleri')
+    parser.add_argument('--model', choices=['hog', 'cnn'], default=FACE_DETECTION_MODEL)
+    args = parser.parse_args()
+
+    paths, images = load_photos(args.photos_dir, args.limit)
+    sizes = np.array([max(image.shape[:2]) for image in images])
+    print(f"📂 {len(images)} fotoğraf (medyan uzun kenar {int(np.median(sizes))}px)")
+
+    reference, reference_ms = reference_encodings(images, args.model)
+    gallery = FaceIndex()
+    for path, encoding in zip(paths, reference):
+        if encoding is not None:
+            gallery.add(path, encoding)
+    print(f"👥 Referansta yüz bulunan: {len(gallery)}/{len(images)}")
+
+    print("=" * 86)
+    print(f"{'Yol':<16} {'ort ms':>8} {'p95 ms':>8} {'hızlanma':>9} {'tespit':>8} "
+          f"{'ort mesafe':>11} {'max mesafe':>11} {'doğru eşleşme':>14}")
+    print("-" * 86)
+    print(f"{'referans':<16} {reference_ms.mean():8.1f} {np.percentile(reference_ms, 95):8.1f} {1:8.2f}x "
+          f"{len(gallery) / len(images) * 100:7.1f}% {0:11.4f} {0:11.4f} {100:13.1f}%")
+
+    for max_side in [int(value) for value in args.max_side.split(',')]:
+        encodings, latencies = pipeline_encodings(images, max_side, args.model)
+        distances = []
+        correct = 0
+        for path, encoding, reference_encoding in zip(paths, encodings, reference):
+            if reference_encoding is None:
+                continue
+            if encoding is not None:
+                distances.append(float(np.linalg.norm(encoding - reference_encoding)))
+                match, _ = gallery.search(encoding, FACE_RECOGNITION_TOLERANCE)
+                correct += match == path
+        detected = sum(encoding is not None for encoding in encodings)
+        distances = np.array(distances) if distances else np.zeros(1)
+        label = f"max_side={max_side or 'tam'}"
+        print(f"{label:<16} {latencies.mean():8.1f} {np.percentile(latencies, 95):8.1f} "
+              f"{reference_ms.mean() / latencies.mean():8.2f}x {detected / len(images) * 100:7.1f}% "
+              f"{distances.mean():11.4f} {distances.max():11.4f} {correct / max(len(gallery), 1) * 100:13.1f}%")
+    print("=" * 86)
+    print(f"Eşleşme toleransı: {FACE_RECOGNITION_TOLERANCE}")
+
+
+if __name__ == '__main__':
+    main()
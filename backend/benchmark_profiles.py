@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Çıkarım profilleri karşılaştırması - gecikme ve 'accurate' profile göre uyum oranı
+
+Kullanım:
+    python benchmark_profiles.py --limit 165
+"""
+import argparse
+import glob
+import os
+import time
+
+import numpy as np
+from PIL import Image
+
+from detector import Detector
+from inference_profiles import INFERENCE_PROFILES
+
+INSPECTIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend', 'inspections')
+REFERENCE_PROFILE = 'accurate'
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--limit', type=int, default=0, help='0 = tüm görüntüler')
+    parser.add_argument('--dir', default=INSPECTIONS_DIR)
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(args.dir, '**', '*.jpg'), recursive=True))
+    if args.limit:
+        paths = paths[:args.limit]
+    if not paths:
+        raise SystemExit(f"❌ Görüntü bulunamadı: {args.dir}")
+
+    images = [np.array(Image.open(path).convert('RGB')) for path in paths]
+    print(f"📂 {len(images)} görüntü yüklendi")
+
+    detector = Detector()
+    # Isınma
+    detector.validate_ppe(images[0], REFERENCE_PROFILE)
+
+    latencies = {}
+    decisions = {}
+    for profile in INFERENCE_PROFILES:
+        latencies[profile] = []
+        decisions[profile] = []
+        for image in images:
+            start = time.perf_counter()
+            result = detector.validate_ppe(image, profile)
+            latencies[profile].append((time.perf_counter() - start) * 1000)
+            items = result['detected_items']
+            decisions[profile].append((items['helmet'], items['vest']))
+
+    reference = decisions[REFERENCE_PROFILE]
+    print("=" * 78)
+    print(f"{'Profil':<10} {'ort ms':>8} {'p50 ms':>8} {'p95 ms':>8} {'kask uyum':>10} {'yelek uyum':>11} {'sonuç uyum':>11}")
+    print("-" * 78)
+    for profile in INFERENCE_PROFILES:
+        ms = np.array(latencies[profile])
+        pairs = list(zip(decisions[profile], reference))
+        helmet = np.mean([d[0] == r[0] for d, r in pairs]) * 100
+        vest = np.mean([d[1] == r[1] for d, r in pairs]) * 100
+        overall = np.mean([all(d) == all(r) for d, r in pairs]) * 100
+        print(f"{profile:<10} {ms.mean():8.1f} {np.percentile(ms, 50):8.1f} {np.percentile(ms, 95):8.1f} "
+              f"{helmet:9.1f}% {vest:10.1f}% {overall:10.1f}%")
+    print("=" * 78)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Kontrol kaydı yazma karşılaştırması: kayıt başına commit ve grup commit (InspectionRecorder)
+
+direct           -> her kayıt kendi işleminde (eski /validate_image, /api/veri-al)
+recorder         -> kuyruğa al, N kayıtta / T ms'de bir commit (istek beklemez)
+recorder-durable -> kuyruğa al, grubun synchronous=FULL commit'ini bekle
+
+Her kip için kayıt/sn, istek tarafı p50/p95 gecikme, commit sayısı ve (Linux'ta) diske yazılan bayt
+yazdırılır. SD kart gibi yavaş disklerde --dir ile o diskteki bir klasör verilmeli.
+
+Kullanım:
+    python benchmark_recorder.py --rows 5000 --concurrency 8 --synchronous FULL --dir /mnt/sdcard
+"""
+import argparse
+import os
+import shutil
+import sqlite3
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import numpy as np
+
+import db
+import inspection_db
+import inspection_stats
+from benchmark_db import SCHEMA, random_row
+from inspection_recorder import InspectionRecorder
+
+
+def create_database(path):
+    conn = sqlite3.connect(path)
+    conn.execute('PRAGMA journal_mode = WAL')
+    for statement in SCHEMA:
+        conn.execute(statement)
+    conn.commit()
+    inspection_db.ensure_schema(conn)
+    inspection_stats.ensure_schema(conn)
+    conn.close()
+
+
+def write_bytes():
+    """Bu sürecin diske yazdığı bayt (/proc/self/io yoksa None)"""
+    try:
+        with open('/proc/self/io') as f:
+            for line in f:
+                if line.startswith('write_bytes:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def run(record, rows, concurrency):
+    """rows kaydı concurrency thread'e bölüp yaz; (istek gecikmeleri, süre)"""
+    now = datetime.now()
+    latencies = []
+    lock = threading.Lock()
+
+    def worker(count):
+        local = []
+        for _ in range(count):
+            start = time.perf_counter()
+            record(random_row(now))
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    counts = [rows // concurrency + (1 if i < rows % concurrency else 0) for i in range(concurrency)]
+    threads = [threading.Thread(target=worker, args=(count,)) for count in counts]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--synchronous', default=db.DB_SYNCHRONOUS, choices=['NORMAL', 'FULL'],
+                        help='kayıt başına commit ve grup commit için synchronous (durable her zaman FULL)')
+    parser.add_argument('--max-batch', type=int, default=64)
+    parser.add_argument('--max-wait-ms', type=float, default=50)
+    parser.add_argument('--dir', default=None, help='geçici veritabanlarının klasörü (varsayılan: sistem temp)')
+    args = parser.parse_args()
+    db.DB_SYNCHRONOUS = args.synchronous
+
+    workdir = tempfile.mkdtemp(prefix='benchmark_recorder_', dir=args.dir)
+    print(f"⚙️ {args.rows} kayıt, {args.concurrency} thread, synchronous={args.synchronous}, "
+          f"grup: {args.max_batch} kayıt / {args.max_wait_ms:g} ms")
+    try:
+        for mode in ('direct', 'recorder', 'recorder-durable'):
+            path = os.path.join(workdir, f'{mode}.db')
+            create_database(path)
+
+            recorder = None
+            if mode == 'direct':
+                def record(row):
+                    with db.transaction(path) as conn:
+                        db.insert_inspection(conn, *row)
+            else:
+                recorder = InspectionRecorder(path, max_batch=args.max_batch, max_wait_ms=args.max_wait_ms)
+                durable = mode == 'recorder-durable'
+
+                def record(row):
+                    recorder.record(*row, durable=durable)
+
+            written = write_bytes()
+            latencies, start = run(record, args.rows, args.concurrency)
+            if recorder is not None:
+                recorder.flush()
+            elapsed = time.perf_counter() - start
+            written = write_bytes() - written if written is not None else None
+
+            with db.connection(path) as conn:
+                stored = conn.execute('SELECT COUNT(*) FROM inspections').fetchone()[0]
+            commits = recorder.stats()['batches'] if recorder is not None else stored
+            if recorder is not None:
+                recorder.close()
+
+            ms = np.array(latencies) * 1000
+            line = (f"{mode:17s}: {stored / elapsed:8.0f} kayıt/sn | p50 {np.percentile(ms, 50):7.2f} ms | "
+                    f"p95 {np.percentile(ms, 95):7.2f} ms | commit: {commits}")
+            if written is not None:
+                line += f" | yazılan: {written / stored / 1024:.1f} KB/kayıt"
+            print(line)
+            if stored != args.rows:
+                print(f"❌ {args.rows} kayıttan {stored} tanesi yazıldı")
+    finally:
+        db.close_pools()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+
+if __name__ == '__main__':
+    main()
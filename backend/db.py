@@ -0,0 +1,345 @@
+"""
+Ortak veritabanı erişim katmanı - app.py ve app_simple.py aynı SQLite dosyasını bununla kullanır
+
+- Bağlantılar süreç başına havuzda tutulur; her istek thread'i bir bağlantıyı ödünç alır, iş bitince
+  geri koyar. Python her bağlantıda derlenmiş ifadeleri önbellekler (cached_statements), havuzlanan
+  bağlantılarda aynı SQL tekrar derlenmez.
+- WAL: okuyucular yazıcıyı, yazıcı okuyucuları beklemez; synchronous=NORMAL ile her commit'te
+  fsync yapılmaz (WAL'da güç kesintisinde veritabanı bozulmaz, en fazla son commit'ler kaybolur).
+- Yazmalar BEGIN IMMEDIATE ile başlar: kilit işlem başında alınır, sonradan yükseltme olmadığı için
+  "database is locked" yerine busy timeout kadar sırada beklenir.
+
+Kullanım:
+    with db.transaction(DATABASE) as conn:
+        db.insert_inspection(conn, ...)
+    with db.connection(DATABASE) as conn:
+        user = db.find_user(conn, 'users_db', sicil_no)
+"""
+import os
+import sqlite3
+import threading
+from collections import deque
+from contextlib import contextmanager
+
+# Süreç başına en fazla açık bağlantı (istek thread'i sayısından az ise istekler sırada bekler)
+DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', '8'))
+# Kilit ve havuzda boş bağlantı için en fazla bekleme (saniye)
+DB_BUSY_TIMEOUT = float(os.environ.get('DB_BUSY_TIMEOUT', '10'))
+DB_SYNCHRONOUS = os.environ.get('DB_SYNCHRONOUS', 'NORMAL')
+# Bağlantı başına sayfa önbelleği ve bellek eşlemeli okuma boyutu (MB)
+DB_CACHE_SIZE_MB = int(os.environ.get('DB_CACHE_SIZE_MB', '32'))
+DB_MMAP_SIZE_MB = int(os.environ.get('DB_MMAP_SIZE_MB', '256'))
+# Bağlantı başına önbelleklenen derlenmiş ifade sayısı
+DB_CACHED_STATEMENTS = 256
+
+# face_encoding sütunu olan kullanıcı tabloları (app.py: users, app_simple.py: users_db)
+USER_TABLES = ('users_db', 'users')
+
+
+def open_connection(database, timeout=DB_BUSY_TIMEOUT):
+    """
+    Ayarlı yeni bağlantı. isolation_level=None: işlemler transaction() ile açıkça yönetilir,
+    tek başına okumalar işlem açmaz (WAL'da checkpoint'i tutan uzun okuma işlemi kalmaz).
+    """
+    conn = sqlite3.connect(database, timeout=timeout, isolation_level=None, check_same_thread=False,
+                           cached_statements=DB_CACHED_STATEMENTS)
+    # journal_mode dosyada kalıcıdır; diğer ayarlar bağlantı başınadır
+    conn.execute('PRAGMA journal_mode = WAL')
+    conn.execute(f'PRAGMA synchronous = {DB_SYNCHRONOUS}')
+    conn.execute(f'PRAGMA busy_timeout = {int(timeout * 1000)}')
+    conn.execute(f'PRAGMA cache_size = {-DB_CACHE_SIZE_MB * 1024}')
+    conn.execute(f'PRAGMA mmap_size = {DB_MMAP_SIZE_MB * 1024 * 1024}')
+    conn.execute('PRAGMA temp_store = MEMORY')
+    return conn
+
+
+class ConnectionPool:
+    """
+    Sabit boyutlu, tembel açılan bağlantı havuzu (DetectorPool ile aynı ödünç alma düzeni).
+    Boş bağlantı yoksa istekler sıraya girer; geri verilen bağlantı doğrudan sıradaki en eski
+    isteğe geçer, hızlı dönen yazıcılar okuyucuları aç bırakmaz.
+    """
+
+    def __init__(self, database, size=DB_POOL_SIZE, timeout=DB_BUSY_TIMEOUT):
+        self.database = database
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self._lock = threading.Lock()
+        self._inherited = []
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = []
+        self._waiters = deque()
+        self._created = 0
+        self._in_use = 0
+        self._borrows = 0
+        self._waits = 0
+
+    def _check_fork(self):
+        # fork öncesi (gunicorn --preload) açılmış bağlantılar çocuk süreçte kullanılmaz ve kapatılmaz;
+        # aynı dosya tanıtıcısını ana süreç de tutar
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._inherited.append(self._idle)
+                    self._reset()
+
+    def _acquire(self):
+        self._check_fork()
+        waiter = None
+        with self._lock:
+            self._borrows += 1
+            if self._idle and not self._waiters:
+                self._in_use += 1
+                return self._idle.pop()
+            create = self._created < self.size
+            if create:
+                self._created += 1
+                self._in_use += 1
+            else:
+                # [bağlantı, olay] - _release bağlantıyı yazıp olayı tetikler
+                waiter = [None, threading.Event()]
+                self._waiters.append(waiter)
+                self._waits += 1
+
+        if create:
+            try:
+                return open_connection(self.database, self.timeout)
+            except Exception:
+                with self._lock:
+                    self._created -= 1
+                    self._in_use -= 1
+                raise
+        if not waiter[1].wait(self.timeout):
+            with self._lock:
+                if waiter[0] is None:
+                    self._waiters.remove(waiter)
+                    raise TimeoutError(f"{self.timeout} saniye içinde boş veritabanı bağlantısı bulunamadı")
+        return waiter[0]
+
+    def _release(self, conn):
+        with self._lock:
+            if self._pid != os.getpid():
+                return
+            if self._waiters:
+                waiter = self._waiters.popleft()
+                waiter[0] = conn
+                waiter[1].set()
+                return
+            self._in_use -= 1
+            self._idle.append(conn)
+
+    @contextmanager
+    def borrow(self):
+        """Havuzdan bir bağlantı ödünç al, iş bitince geri koy"""
+        conn = self._acquire()
+        try:
+            yield conn
+        finally:
+            # Yarım kalmış işlem sonraki kullanıcıya taşınmaz
+            if conn.in_transaction:
+                conn.rollback()
+            self._release(conn)
+
+    def close(self):
+        """Boştaki bağlantıları kapat (süreç kapanırken / fork öncesi)"""
+        with self._lock:
+            idle, self._idle = self._idle, []
+            self._created -= len(idle)
+        for conn in idle:
+            conn.close()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'size': self.size,
+                'open': self._created,
+                'in_use': self._in_use,
+                'available': len(self._idle),
+                'waiting': len(self._waiters),
+                'borrows': self._borrows,
+                'waits': self._waits
+            }
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(database):
+    """Veritabanı dosyası başına tek havuz"""
+    pool = _pools.get(database)
+    if pool is None:
+        with _pools_lock:
+            pool = _pools.get(database)
+            if pool is None:
+                pool = _pools[database] = ConnectionPool(database)
+    return pool
+
+
+def close_pools():
+    for pool in list(_pools.values()):
+        pool.close()
+
+
+@contextmanager
+def connection(database):
+    """Okuma için bağlantı - her ifade kendi başına (autocommit) çalışır"""
+    with get_pool(database).borrow() as conn:
+        yield conn
+
+
+@contextmanager
+def transaction(database):
+    """Yazma işlemi: BEGIN IMMEDIATE ... COMMIT, hata olursa ROLLBACK"""
+    with get_pool(database).borrow() as conn:
+        conn.execute('BEGIN IMMEDIATE')
+        try:
+            yield conn
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+# --- Kontrol kayıtları ---
+
+def insert_inspection(conn, timestamp, kask, yelek, uygunluk, image_filename, sicil_no=None):
+    """Yeni kontrol kaydı; id döndürür (gozluk artık kullanılmıyor, 0 yazılır)"""
+    cursor = conn.execute('''
+        INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename, sicil_no)
+        VALUES (?, ?, ?, 0, ?, ?, ?)
+    ''', (timestamp, int(bool(kask)), int(bool(yelek)), int(bool(uygunluk)), image_filename, sicil_no))
+    return cursor.lastrowid
+
+
+def update_inspection(conn, inspection_id, timestamp, kask, yelek, uygunluk):
+    """Kaydı güncelle; kayıt yoksa False"""
+    cursor = conn.execute('''
+        UPDATE inspections SET timestamp = ?, kask = ?, yelek = ?, uygunluk = ?
+        WHERE id = ?
+    ''', (timestamp, int(bool(kask)), int(bool(yelek)), int(bool(uygunluk)), inspection_id))
+    return cursor.rowcount > 0
+
+
+def delete_inspection(conn, inspection_id):
+    """Kaydı sil; kayıt yoksa False"""
+    return conn.execute('DELETE FROM inspections WHERE id = ?', (inspection_id,)).rowcount > 0
+
+
+def insert_inspections(conn, rows):
+    """Toplu kayıt: rows = [(timestamp, kask, yelek, uygunluk, image_filename, sicil_no), ...]"""
+    conn.executemany('''
+        INSERT INTO inspections (timestamp, kask, yelek, gozluk, uygunluk, image_filename, sicil_no)
+        VALUES (?, ?, ?, 0, ?, ?, ?)
+    ''', rows)
+
+
+# Yedekte ve geri yüklemede sütun sırası
+INSPECTION_COLUMNS = ('id', 'timestamp', 'kask', 'yelek', 'gozluk', 'uygunluk', 'image_filename', 'created_at',
+                      'sicil_no')
+
+
+def iter_inspections(conn, batch_size):
+    """Tüm kayıtlar yeniden eskiye, batch_size'lık satır listeleri halinde (INSPECTION_COLUMNS sırasıyla)"""
+    cursor = conn.execute(f'SELECT {", ".join(INSPECTION_COLUMNS)} FROM inspections '
+                          'ORDER BY timestamp DESC, id DESC')
+    return iter(lambda: cursor.fetchmany(batch_size), [])
+
+
+def restore_inspections(conn, rows, keep_ids):
+    """
+    Yedekten toplu kayıt. keep_ids ise rows INSPECTION_COLUMNS sırasında (id dahil), değilse id'siz;
+    created_at boşsa kayıt anı yazılır
+    """
+    columns = INSPECTION_COLUMNS if keep_ids else INSPECTION_COLUMNS[1:]
+    values = ['COALESCE(?, CURRENT_TIMESTAMP)' if column == 'created_at' else '?' for column in columns]
+    conn.executemany(f'INSERT INTO inspections ({", ".join(columns)}) VALUES ({", ".join(values)})', rows)
+
+
+# --- Kullanıcılar ---
+
+def _user_table(table):
+    # Tablo adı SQL'e parametre olarak verilemez, sadece bilinen adlar kabul edilir
+    if table not in USER_TABLES:
+        raise ValueError(f"Bilinmeyen kullanıcı tablosu: {table}")
+    return table
+
+
+def max_user_id(conn, table):
+    return conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {_user_table(table)}').fetchone()[0]
+
+
+def faces_after(conn, table, last_row_id):
+    """id'si last_row_id'den büyük, yüzü olan kullanıcılar: [(id, sicil_no, face_encoding), ...]"""
+    return conn.execute(f'''
+        SELECT id, sicil_no, face_encoding FROM {_user_table(table)}
+        WHERE id > ? AND face_encoding IS NOT NULL
+        ORDER BY id
+    ''', (last_row_id,)).fetchall()
+
+
+def find_user(conn, table, sicil_no):
+    """{'name', 'surname', 'sicil_no'}; yoksa None"""
+    row = conn.execute(f'SELECT name, surname FROM {_user_table(table)} WHERE sicil_no = ?', (sicil_no,)).fetchone()
+    if row is None:
+        return None
+    return {
+        'name': row[0],
+        'surname': row[1],
+        'sicil_no': sicil_no
+    }
+
+
+def find_sicil_no_by_name(conn, name, surname):
+    """Dış sistem kayıtları (/api/veri-al) ad-soyad ile eşleşir"""
+    row = conn.execute('SELECT sicil_no FROM users_db WHERE name = ? AND surname = ?', (name, surname)).fetchone()
+    return row[0] if row else None
+
+
+def user_names(conn):
+    """users_db'deki tüm (name, surname, sicil_no), eskiden yeniye"""
+    return conn.execute('SELECT name, surname, sicil_no FROM users_db ORDER BY id').fetchall()
+
+
+def insert_user(conn, table, name, surname, sicil_no, face_encoding, photo_filename, departman=None):
+    """Yeni kullanıcı; sicil_no çakışırsa sqlite3.IntegrityError (departman sadece users_db'de var)"""
+    if _user_table(table) == 'users_db':
+        cursor = conn.execute('''
+            INSERT INTO users_db (name, surname, sicil_no, departman, photo_filename, face_encoding)
+            VALUES (?, ?, ?, ?, ?, ?)
+        ''', (name, surname, sicil_no, departman, photo_filename, face_encoding))
+    else:
+        cursor = conn.execute('''
+            INSERT INTO users (name, surname, sicil_no, face_encoding, photo_filename)
+            VALUES (?, ?, ?, ?, ?)
+        ''', (name, surname, sicil_no, face_encoding, photo_filename))
+    return cursor.lastrowid
+
+
+def insert_users(conn, rows):
+    """Toplu users_db kaydı (yüzsüz dış sistem kullanıcıları): rows = [(name, surname, sicil_no, departman), ...]"""
+    conn.executemany('''
+        INSERT INTO users_db (name, surname, sicil_no, departman)
+        VALUES (?, ?, ?, ?)
+    ''', rows)
+
+
+def list_users(conn):
+    """users_db, en yeni kayıt üstte"""
+    rows = conn.execute('''
+        SELECT id, name, surname, departman, sicil_no, photo_filename, created_at
+        FROM users_db
+        ORDER BY created_at DESC
+    ''').fetchall()
+    return [{
+        'id': row[0],
+        'name': row[1],
+        'surname': row[2],
+        'departman': row[3] or 'Belirtilmemiş',
+        'sicil_no': row[4],
+        'photo_filename': row[5],
+        'created_at': row[6]
+    } for row in rows]
@@ -2,26 +2,92 @@ from ultralytics import YOLO
 import cv2
 import numpy as np
 import os
+from inference_profiles import INFERENCE_PROFILES, resolve_profile
+from inference_backends import from_ultralytics
+from model_export import DETECTOR_BACKEND, DETECTOR_BACKENDS, export_model
+from ppe_association import assign_to_persons
+
+# PPE rolleri - normalize edilmiş sınıf adından rol koduna
+ROLE_NONE, ROLE_HELMET, ROLE_NO_HELMET, ROLE_VEST, ROLE_NO_VEST, ROLE_PERSON = range(6)
+ROLE_COUNT = 6
+CLASS_ROLES = {
+    'hardhat': ROLE_HELMET,
+    'no-hardhat': ROLE_NO_HELMET,
+    'safetyvest': ROLE_VEST,
+    'no-safetyvest': ROLE_NO_VEST,
+    'person': ROLE_PERSON
+}
+ROLE_LABELS = {
+    ROLE_HELMET: 'KASK VAR',
+    ROLE_NO_HELMET: 'KASK YOK',
+    ROLE_VEST: 'YELEK VAR',
+    ROLE_NO_VEST: 'YELEK YOK',
+    ROLE_PERSON: 'KİŞİ'
+}
+
+# Yelek için daha düşük threshold (yelek tespiti daha zor)
+MIN_CONFIDENCE_HELMET = 0.35  # Kask için minimum confidence
+MIN_CONFIDENCE_VEST = 0.25    # Yelek için daha düşük minimum confidence
+MIN_CONFIDENCE_PERSON = 0.40  # Kişi modunda kişi sayılması için minimum confidence
+
+# Netlik/parlaklık bu uzun kenar boyutunda ölçülür; görüntü tam boyutta ya da küçük decode edilmiş
+# (image_decode) gelse de kalite kararı ve iyileştirme aynı olur
+QUALITY_REFERENCE_SIZE = 640
+
+def build_role_table(names):
+    """Sınıf id -> PPE rol kodu tablosu (model yüklenirken bir kez oluşturulur)"""
+    if not isinstance(names, dict):
+        names = dict(enumerate(names))
+    table = np.full(max(names) + 1, ROLE_NONE, dtype=np.intp)
+    for class_id, class_name in names.items():
+        table[int(class_id)] = CLASS_ROLES.get(class_name.lower().replace(' ', ''), ROLE_NONE)
+    return table
 
 class Detector:
-    def __init__(self):
+    def __init__(self, profile=None, backend=None):
+        self.profile = resolve_profile(profile)
+        self.backend = (backend or DETECTOR_BACKEND).lower()
+        if self.backend not in DETECTOR_BACKENDS:
+            raise ValueError(f"Geçersiz backend: {self.backend} (seçenekler: {', '.join(DETECTOR_BACKENDS)})")
+
         model_path = os.path.join(os.path.dirname(__file__), "models", "ppe.pt")
         if not os.path.exists(model_path):
             raise FileNotFoundError(f"Model file not found at: {model_path}")
             
-        print("📦 Model yükleniyor...")
-        # Optimize model for faster inference
-        import torch
-        torch.hub.set_dir(os.path.join(os.path.dirname(__file__), '.cache'))
-        self.model = YOLO(model_path)
-        print("🔧 Model optimize ediliyor...")
-        self.model.fuse()  # Fuse layers for faster inference
+        print(f"📦 Model yükleniyor ({self.backend})...")
+        if self.backend == 'torch':
+            # Optimize model for faster inference
+            import torch
+            torch.hub.set_dir(os.path.join(os.path.dirname(__file__), '.cache'))
+            self.model = YOLO(model_path)
+            print("🔧 Model optimize ediliyor...")
+            self.model.fuse()  # Fuse layers for faster inference
+            self.names = self.model.names
+        else:
+            # İlk açılışta dışa aktarılır, sonraki açılışlarda modelin yanındaki cache kullanılır
+            from inference_backends import OnnxRuntimeModel, OpenVinoModel
+            exported = export_model(self.backend, model_path)
+            runtime = OnnxRuntimeModel if self.backend == 'onnx' else OpenVinoModel
+            self.model = runtime(exported)
+            self.names = self.model.names
+        self.role_table = build_role_table(self.names)
         print("✅ Model hazır!")
-    
+
+    def warm_up(self, profile=None):
+        """Boş bir görüntüyle tek forward pass; predictor kurulumu ve ilk çağrı maliyeti istekten önce ödenir"""
+        profile = resolve_profile(profile or self.profile)
+        size = INFERENCE_PROFILES[profile]['imgsz']
+        self._predict([np.zeros((size, size, 3), dtype=np.uint8)], profile)
+
     def check_image_quality(self, image):
         """Görüntü kalitesini kontrol et (bulanıklık tespiti)"""
         # Laplacian variance ile bulanıklık tespiti
         gray = cv2.cvtColor(image, cv2.COLOR_RGB2GRAY)
+        height, width = gray.shape
+        if max(height, width) > QUALITY_REFERENCE_SIZE:
+            scale = QUALITY_REFERENCE_SIZE / max(height, width)
+            gray = cv2.resize(gray, (max(1, round(width * scale)), max(1, round(height * scale))),
+                              interpolation=cv2.INTER_AREA)
         laplacian_var = cv2.Laplacian(gray, cv2.CV_64F).var()
         
         # Parlaklık kontrolü
@@ -73,7 +139,8 @@ class Detector:
         
         return result
         
-    def validate_ppe(self, image):
+    def prepare_image(self, image):
+        """Kalite kontrolü yap, gerekirse görüntüyü iyileştir"""
         # Görüntü kalitesini kontrol et
         quality = self.check_image_quality(image)
         
@@ -86,48 +153,95 @@ class Detector:
             print("✨ Görüntü iyileştirildi!")
         else:
             print("✅ Görüntü kalitesi iyi!")
-        
-        # Çok düşük confidence threshold ile tüm tespitleri al
-        # Yelek tespiti için daha büyük görüntü boyutu ve daha hassas ayarlar
-        results = self.model(image, conf=0.005, imgsz=832, verbose=False, 
-                           augment=True,  # Test-time augmentation
-                           agnostic_nms=True)  # Class-agnostic NMS
-        
-        # Track best confidence for each item
-        helmet_detections = []  # (has_helmet, confidence)
-        vest_detections = []    # (has_vest, confidence)
-        
-        print("\n🔍 Tespit edilen tüm nesneler:")
-        for r in results:
-            boxes = r.boxes
-            if not boxes:
-                print("  ❌ Hiç nesne tespit edilmedi")
-                continue
-
-            for box in boxes:
-                c = box.cls[0]
-                conf = float(box.conf[0])
-                try:
-                    class_name = r.names[int(c)]
-                except (KeyError, IndexError):
-                    continue
-
-                normalized_class_name = class_name.lower().replace(' ', '')
-                print(f"  📦 {class_name} (confidence: {conf:.2f})")
-                
-                # Collect all detections with confidence
-                if normalized_class_name == 'hardhat':
-                    helmet_detections.append((True, conf))
-                    print(f"    ✅ KASK VAR!")
-                elif normalized_class_name == 'no-hardhat':
-                    helmet_detections.append((False, conf))
-                    print(f"    ❌ KASK YOK!")
-                elif normalized_class_name == 'safetyvest':
-                    vest_detections.append((True, conf))
-                    print(f"    ✅ YELEK VAR!")
-                elif normalized_class_name == 'no-safetyvest':
-                    vest_detections.append((False, conf))
-                    print(f"    ❌ YELEK YOK!")
+
+        return image, quality
+
+    def _predict(self, images, profile, per_person=False):
+        """Tek bir model çağrısı ile görüntü listesinde tespit yap, görüntü başına Detections döndür"""
+        settings = INFERENCE_PROFILES[profile]
+        # Kişi modunda sınıf bazlı NMS: kişi kutusu içindeki yelek kutusu bastırılmasın
+        agnostic = not per_person
+        if self.backend != 'torch':
+            # Dışa aktarılmış modellerde TTA yok, profilin diğer ayarları geçerli
+            return self.model.predict(images, settings['imgsz'], settings['conf'], settings['max_det'], agnostic)
+
+        results = self.model(images, conf=settings['conf'], imgsz=settings['imgsz'], verbose=False,
+                             augment=settings['augment'],  # Test-time augmentation
+                             max_det=settings['max_det'],
+                             agnostic_nms=agnostic)  # Class-agnostic NMS
+        return [from_ultralytics(r) for r in results]
+
+    def validate_ppe(self, image, profile=None, per_person=False):
+        profile = resolve_profile(profile or self.profile)
+        image, quality = self.prepare_image(image)
+        detections = self._predict([image], profile, per_person)[0]
+        return self._summarize(detections, quality, profile, per_person)
+
+    def validate_ppe_batch(self, images, profile=None, per_person=False):
+        """Birden fazla görüntüyü tek bir batch forward pass ile kontrol et"""
+        profile = resolve_profile(profile or self.profile)
+        prepared = [self.prepare_image(image) for image in images]
+        detections = self._predict([image for image, _ in prepared], profile, per_person)
+        return [self._summarize(d, quality, profile, per_person) for d, (_, quality) in zip(detections, prepared)]
+
+    def assess_persons(self, detections):
+        """Kask/yelek kutularını kişilere ata, kişi başına uygunluk döndür"""
+        roles = np.full(len(detections.cls), ROLE_NONE, dtype=np.intp)
+        known = (detections.cls >= 0) & (detections.cls < len(self.role_table))
+        roles[known] = self.role_table[detections.cls[known]]
+
+        is_person = (roles == ROLE_PERSON) & (detections.conf >= MIN_CONFIDENCE_PERSON)
+        is_item = (roles != ROLE_NONE) & (roles != ROLE_PERSON)
+        person_boxes = detections.xyxy[is_person]
+        if len(person_boxes) == 0:
+            return []
+
+        owner = assign_to_persons(person_boxes, detections.xyxy[is_item])
+        assigned = owner >= 0
+        # Kişi x rol en yüksek confidence matrisi (-1 = tespit yok)
+        best = np.full((len(person_boxes), ROLE_COUNT), -1.0, dtype=np.float32)
+        np.maximum.at(best, (owner[assigned], roles[is_item][assigned]), detections.conf[is_item][assigned])
+
+        # validate_ppe ile aynı kurallar, tüm kişiler için tek seferde
+        helmet = best[:, ROLE_HELMET] >= MIN_CONFIDENCE_HELMET
+        vest_positive, vest_negative = best[:, ROLE_VEST], best[:, ROLE_NO_VEST]
+        vest = (vest_positive >= MIN_CONFIDENCE_VEST) | (
+            (vest_positive >= 0) & (vest_negative >= 0) & (vest_positive > vest_negative * 0.8))
+
+        persons = []
+        for i, box in enumerate(person_boxes.tolist()):
+            detected_items = {"helmet": bool(helmet[i]), "vest": bool(vest[i])}
+            persons.append({
+                "box": [round(v, 1) for v in box],
+                "confidence": round(float(detections.conf[is_person][i]), 3),
+                "detected_items": detected_items,
+                "missing_items": [item for item, detected in detected_items.items() if not detected]
+            })
+        return persons
+
+    def _summarize(self, detections, quality, profile, per_person=False):
+        """Model çıktısını kask/yelek kararına çevir"""
+        # Tüm kutular tek seferde: sınıf id -> PPE rolü, rol başına en yüksek confidence
+        cls = detections.cls
+        known = (cls >= 0) & (cls < len(self.role_table))
+        roles = self.role_table[cls[known]]
+        best = np.full(ROLE_COUNT, -1.0, dtype=np.float32)
+        np.maximum.at(best, roles, detections.conf[known])
+        counts = np.bincount(roles, minlength=ROLE_COUNT)
+
+        print(f"\n🔍 {len(cls)} nesne tespit edildi")
+        if len(cls) == 0:
+            print("  ❌ Hiç nesne tespit edilmedi")
+        for role, label in ROLE_LABELS.items():
+            if counts[role]:
+                print(f"  📦 {label}: {counts[role]} kutu (en yüksek confidence: {best[role]:.2f})")
+
+        # Rol için tespit yoksa None, varsa en yüksek confidence
+        def best_conf(role):
+            return float(best[role]) if counts[role] else None
+
+        helmet_positive, helmet_negative = best_conf(ROLE_HELMET), best_conf(ROLE_NO_HELMET)
+        vest_positive, vest_negative = best_conf(ROLE_VEST), best_conf(ROLE_NO_VEST)
         
         # Use smart logic: require minimum confidence for positive detections
         detected_items = {
@@ -135,60 +249,59 @@ class Detector:
             "vest": False
         }
         
-        # Yelek için daha düşük threshold (yelek tespiti daha zor)
-        MIN_CONFIDENCE_HELMET = 0.35  # Kask için minimum confidence
-        MIN_CONFIDENCE_VEST = 0.25    # Yelek için daha düşük minimum confidence
-        
-        if helmet_detections:
-            # Sort by confidence
-            positive = sorted([d for d in helmet_detections if d[0] == True], key=lambda x: x[1], reverse=True)
-            negative = sorted([d for d in helmet_detections if d[0] == False], key=lambda x: x[1], reverse=True)
-            
-            if positive and positive[0][1] >= MIN_CONFIDENCE_HELMET:
+        if helmet_positive is not None or helmet_negative is not None:
+            if helmet_positive is not None and helmet_positive >= MIN_CONFIDENCE_HELMET:
                 detected_items['helmet'] = True
-                print(f"  🎯 KASK Sonuç: VAR (conf: {positive[0][1]:.2f}) ✓")
+                print(f"  🎯 KASK Sonuç: VAR (conf: {helmet_positive:.2f}) ✓")
             else:
                 detected_items['helmet'] = False
-                if positive:
-                    print(f"  🎯 KASK Sonuç: YOK (pozitif tespit yetersiz: {positive[0][1]:.2f} < {MIN_CONFIDENCE_HELMET})")
-                elif negative:
-                    print(f"  🎯 KASK Sonuç: YOK (negatif tespit: {negative[0][1]:.2f})")
+                if helmet_positive is not None:
+                    print(f"  🎯 KASK Sonuç: YOK (pozitif tespit yetersiz: {helmet_positive:.2f} < {MIN_CONFIDENCE_HELMET})")
                 else:
-                    print(f"  🎯 KASK Sonuç: YOK (tespit yok)")
+                    print(f"  🎯 KASK Sonuç: YOK (negatif tespit: {helmet_negative:.2f})")
         
-        if vest_detections:
-            # Sort by confidence
-            positive = sorted([d for d in vest_detections if d[0] == True], key=lambda x: x[1], reverse=True)
-            negative = sorted([d for d in vest_detections if d[0] == False], key=lambda x: x[1], reverse=True)
-            
+        if vest_positive is not None or vest_negative is not None:
             # Yelek için daha esnek yaklaşım
-            if positive and positive[0][1] >= MIN_CONFIDENCE_VEST:
+            if vest_positive is not None and vest_positive >= MIN_CONFIDENCE_VEST:
                 detected_items['vest'] = True
-                print(f"  🎯 YELEK Sonuç: VAR (conf: {positive[0][1]:.2f}) ✓")
+                print(f"  🎯 YELEK Sonuç: VAR (conf: {vest_positive:.2f}) ✓")
             # Eğer pozitif tespit varsa ama düşük confidence'sa, negatif tespitle karşılaştır
-            elif positive and negative:
-                if positive[0][1] > negative[0][1] * 0.8:  # Pozitif, negatifin %80'inden fazlaysa
+            elif vest_positive is not None and vest_negative is not None:
+                if vest_positive > vest_negative * 0.8:  # Pozitif, negatifin %80'inden fazlaysa
                     detected_items['vest'] = True
-                    print(f"  🎯 YELEK Sonuç: VAR (pozitif {positive[0][1]:.2f} > negatif {negative[0][1]:.2f}) ✓")
+                    print(f"  🎯 YELEK Sonuç: VAR (pozitif {vest_positive:.2f} > negatif {vest_negative:.2f}) ✓")
                 else:
                     detected_items['vest'] = False
-                    print(f"  🎯 YELEK Sonuç: YOK (negatif daha güçlü: {negative[0][1]:.2f} vs {positive[0][1]:.2f})")
+                    print(f"  🎯 YELEK Sonuç: YOK (negatif daha güçlü: {vest_negative:.2f} vs {vest_positive:.2f})")
             else:
                 detected_items['vest'] = False
-                if positive:
-                    print(f"  🎯 YELEK Sonuç: YOK (pozitif tespit yetersiz: {positive[0][1]:.2f} < {MIN_CONFIDENCE_VEST})")
-                elif negative:
-                    print(f"  🎯 YELEK Sonuç: YOK (negatif tespit: {negative[0][1]:.2f})")
+                if vest_positive is not None:
+                    print(f"  🎯 YELEK Sonuç: YOK (pozitif tespit yetersiz: {vest_positive:.2f} < {MIN_CONFIDENCE_VEST})")
                 else:
-                    print(f"  🎯 YELEK Sonuç: YOK (tespit yok)")
+                    print(f"  🎯 YELEK Sonuç: YOK (negatif tespit: {vest_negative:.2f})")
         
+        persons = None
+        if per_person:
+            persons = self.assess_persons(detections)
+            print(f"👥 Kişi modu: {len(persons)} kişi, uygun: {sum(not p['missing_items'] for p in persons)}")
+            # Kişi bulunduysa görüntü sonucu, tüm kişilerin uygunluğudur (kişi yoksa görüntü bazlı sonuç)
+            if persons:
+                detected_items = {
+                    "helmet": all(p['detected_items']['helmet'] for p in persons),
+                    "vest": all(p['detected_items']['vest'] for p in persons)
+                }
+
         missing_items = [item for item, detected in detected_items.items() if not detected]
         
         print(f"✓ Final Sonuç: {detected_items}, Eksik: {missing_items}")
 
-        return {
+        result = {
             "success": len(missing_items) == 0,
             "detected_items": detected_items,
             "missing_items": missing_items,
-            "image_quality": quality
-        }
\ No newline at end of file
+            "image_quality": quality,
+            "profile": profile
+        }
+        if persons is not None:
+            result["persons"] = persons
+        return result
\ No newline at end of file
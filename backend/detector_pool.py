@@ -0,0 +1,164 @@
+"""
+Detector havuzu - YOLO modeli süreç başına bir kez yüklenir, istekler havuzdan ödünç alır
+"""
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+# Worker başına sıcak tutulacak Detector sayısı
+DETECTOR_POOL_SIZE = int(os.environ.get('DETECTOR_POOL_SIZE', '1'))
+# Boş Detector beklerken en fazla kaç saniye beklenecek
+DETECTOR_POOL_TIMEOUT = float(os.environ.get('DETECTOR_POOL_TIMEOUT', '30'))
+# true ise modeller ilk istekte değil, uygulama açılırken yüklenir
+DETECTOR_PRELOAD = os.environ.get('DETECTOR_PRELOAD', 'false').lower() == 'true'
+
+
+def _default_factory():
+    # ultralytics import'u pahalı, sadece ilk Detector oluşturulurken yapılır
+    from detector import Detector
+    return Detector()
+
+
+class DetectorPool:
+    """Sabit boyutlu, tembel (lazy) yüklenen Detector havuzu"""
+
+    def __init__(self, size=DETECTOR_POOL_SIZE, timeout=DETECTOR_POOL_TIMEOUT, factory=None):
+        self.size = max(1, int(size))
+        self.timeout = timeout
+        self._factory = factory or _default_factory
+        self._idle = queue.LifoQueue()
+        self._lock = threading.Lock()
+        self._created = 0
+        self._loading = 0
+        self._in_use = 0
+        self._borrows = 0
+        self._waits = 0
+        self._timeouts = 0
+        self._load_seconds = []
+        self._last_error = None
+
+    def _reserve_slot(self):
+        """Yeni bir Detector oluşturmak için yer ayır (havuz doluysa False)"""
+        with self._lock:
+            if self._created + self._loading >= self.size:
+                return False
+            self._loading += 1
+            return True
+
+    def _create(self):
+        """Ayrılmış slot için Detector oluştur (kilit dışında, yükleme saniyeler sürebilir)"""
+        start = time.perf_counter()
+        try:
+            detector = self._factory()
+        except Exception as e:
+            with self._lock:
+                self._loading -= 1
+                self._last_error = str(e)
+            raise
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            self._loading -= 1
+            self._created += 1
+            self._load_seconds.append(elapsed)
+            self._last_error = None
+            created = self._created
+        print(f"🧠 Detector havuza eklendi ({created}/{self.size}, {elapsed:.2f}s)")
+        return detector
+
+    def warm_up(self, forward=False):
+        """
+        Havuzu tamamen doldur (uygulama açılışında çağrılır). forward ise her Detector boş bir görüntüyle
+        bir kez çalıştırılır; gunicorn master'ında değil, fork sonrası worker'da kullanılır (server.py)
+        """
+        while self._reserve_slot():
+            self._idle.put(self._create())
+        if forward:
+            detectors = []
+            try:
+                while True:
+                    detectors.append(self._idle.get_nowait())
+            except queue.Empty:
+                pass
+            try:
+                start = time.perf_counter()
+                for detector in detectors:
+                    detector.warm_up()
+                print(f"🔥 {len(detectors)} Detector ısındı ({time.perf_counter() - start:.2f}s)")
+            finally:
+                for detector in detectors:
+                    self._idle.put(detector)
+        return self
+
+    def _acquire(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+
+        if self._reserve_slot():
+            return self._create()
+
+        with self._lock:
+            self._waits += 1
+        try:
+            return self._idle.get(timeout=timeout)
+        except queue.Empty:
+            with self._lock:
+                self._timeouts += 1
+            raise TimeoutError(f"{timeout} saniye içinde boş Detector bulunamadı")
+
+    @contextmanager
+    def borrow(self, timeout=None):
+        """Havuzdan bir Detector ödünç al, iş bitince geri koy"""
+        detector = self._acquire(self.timeout if timeout is None else timeout)
+        with self._lock:
+            self._in_use += 1
+            self._borrows += 1
+        try:
+            yield detector
+        finally:
+            with self._lock:
+                self._in_use -= 1
+            self._idle.put(detector)
+
+    def stats(self):
+        """Havuz doluluk ve sağlık bilgisi"""
+        with self._lock:
+            if self._created > 0:
+                status = 'ok'
+            elif self._last_error:
+                status = 'error'
+            elif self._loading > 0:
+                status = 'loading'
+            else:
+                status = 'idle'
+
+            return {
+                'status': status,
+                'size': self.size,
+                'loaded': self._created,
+                'loading': self._loading,
+                'in_use': self._in_use,
+                'available': self._idle.qsize(),
+                'borrows': self._borrows,
+                'waits': self._waits,
+                'timeouts': self._timeouts,
+                'avg_load_seconds': round(sum(self._load_seconds) / len(self._load_seconds), 3) if self._load_seconds else None,
+                'last_error': self._last_error
+            }
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_detector_pool():
+    """Süreç genelinde tek DetectorPool örneği"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = DetectorPool()
+    return _pool
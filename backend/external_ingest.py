@@ -0,0 +1,157 @@
+"""
+Dış sistem kayıtları - /api/veri-al (tek kayıt) ve /api/veri-al/bulk (toplu yükleme)
+
+Toplu yükleme, kesinti sonrası biriken kayıtların tek istekte gönderilmesi içindir:
+- Gövde NDJSON (her satırda bir kayıt, Content-Type: application/x-ndjson) ya da JSON dizisi olabilir;
+  gövde belleğe tek parça okunmaz, kayıtlar akış halinde ayrıştırılıp doğrulanır.
+- Kullanıcılar kayıt başına sorgu yerine bellekteki (isim, soyisim) -> sicil_no eşlemesinden bulunur.
+- Yeni kullanıcılar ve tüm kontrol kayıtları tek işlemde executemany ile yazılır.
+- Yanıtta her kayıt için sonuç döner; hatalı kayıtlar diğerlerinin yazılmasını engellemez.
+"""
+import os
+import random
+from datetime import datetime
+from functools import lru_cache
+
+import pytz
+
+import db
+import inspection_stats
+from json_stream import StreamFormatError, iter_json_array, iter_ndjson
+
+REQUIRED_FIELDS = ('isim', 'soyisim', 'departman', 'durum', 'tarih', 'saat')
+# "Gecti" = Kask:Var, Yelek:Var, Uygun / "Kaldi" = Kask:Yok, Yelek:Yok, Uygun Değil
+DURUM_VALUES = ('Gecti', 'Kaldi')
+TURKEY_TZ = pytz.timezone('Europe/Istanbul')
+
+# Tek toplu istekte en fazla kayıt sayısı
+BULK_INGEST_MAX_RECORDS = int(os.environ.get('BULK_INGEST_MAX_RECORDS', '200000'))
+
+
+class BulkIngestError(ValueError):
+    """Gövde bütünüyle okunamıyor (bozuk JSON dizisi, kayıt sınırı aşıldı)"""
+
+
+def control_result(durum):
+    """durum -> (kask, yelek, uygunluk)"""
+    passed = 1 if durum == 'Gecti' else 0
+    return passed, passed, passed
+
+
+@lru_cache(maxsize=8192)
+def _turkey_tzinfo(year, month, day, hour):
+    # pytz localize kayıt başına pahalı; yaz saati geçişleri saat başında olduğundan fark saat içinde değişmez
+    return TURKEY_TZ.localize(datetime(year, month, day, hour)).tzinfo
+
+
+def parse_timestamp(tarih, saat):
+    """'24.05.2024', '14:30:05' -> Türkiye saat dilimli ISO zaman; hatalıysa ValueError"""
+    dt = datetime.strptime(f"{tarih} {saat}", "%d.%m.%Y %H:%M:%S")
+    return dt.replace(tzinfo=_turkey_tzinfo(dt.year, dt.month, dt.day, dt.hour)).isoformat()
+
+
+def external_filename(isim, soyisim):
+    return f'external_{isim}_{soyisim}.jpg'
+
+
+def new_external_sicil_no(taken):
+    """Kullanılmayan EXT sicil numarası; 4 haneli aralık dolmaya başlarsa hane sayısı artar"""
+    low, high = 1000, 9999
+    while True:
+        for _ in range(20):
+            sicil_no = f"EXT{random.randint(low, high)}"
+            if sicil_no not in taken:
+                return sicil_no
+        low, high = low * 10, high * 10 + 9
+
+
+def validate_record(record):
+    """Toplu kayıt -> (isim, soyisim, departman, timestamp, kask, yelek, uygunluk); hatalıysa ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError("Kayıt bir JSON nesnesi olmalı")
+    for field in REQUIRED_FIELDS:
+        if field not in record:
+            raise ValueError(f"Eksik alan: {field}")
+    for field in ('isim', 'soyisim'):
+        if not isinstance(record[field], str) or not record[field].strip():
+            raise ValueError(f"Geçersiz {field}")
+    if record['durum'] not in DURUM_VALUES:
+        raise ValueError(f"Geçersiz durum: {record['durum']} (Gecti veya Kaldi)")
+    try:
+        timestamp = parse_timestamp(record['tarih'], record['saat'])
+    except (TypeError, ValueError):
+        raise ValueError(f"Geçersiz tarih/saat: {record['tarih']} {record['saat']} (GG.AA.YYYY SS:DD:ss)")
+    return (record['isim'], record['soyisim'], record['departman'], timestamp) + control_result(record['durum'])
+
+
+def iter_records(stream, content_type):
+    """Content-Type'a göre NDJSON ya da JSON dizisi ayrıştırıcısı"""
+    if content_type and 'ndjson' in content_type:
+        return iter_ndjson(stream)
+    return iter_json_array(stream)
+
+
+def parse_records(records, max_records=BULK_INGEST_MAX_RECORDS):
+    """
+    Ayrıştırılan kayıtları doğrula (veritabanına dokunmadan, işlem açılmadan önce):
+    [(sıra, doğrulanmış kayıt ya da None, hata ya da None), ...]
+    """
+    parsed = []
+    try:
+        for index, (record, error) in enumerate(records):
+            if index >= max_records:
+                raise BulkIngestError(f"Tek istekte en fazla {max_records} kayıt gönderilebilir")
+            if error is None:
+                try:
+                    record = validate_record(record)
+                except ValueError as e:
+                    record, error = None, str(e)
+            parsed.append((index, record, error))
+    except StreamFormatError as e:
+        raise BulkIngestError(str(e))
+    return parsed
+
+
+def ingest(conn, parsed):
+    """
+    Doğrulanmış kayıtları açık bir yazma işleminde yaz; yanıt gövdesini döndür.
+    Kullanıcı eşlemesi işlem içinde okunur, eşzamanlı /api/veri-al ile aynı kişi iki kez eklenmez.
+    """
+    by_name = {}
+    taken = set()
+    for name, surname, sicil_no in db.user_names(conn):
+        # find_sicil_no_by_name gibi aynı isimde ilk kayıt
+        by_name.setdefault((name, surname), sicil_no)
+        taken.add(sicil_no)
+
+    new_users = []
+    rows = []
+    results = []
+    for index, record, error in parsed:
+        if error is not None:
+            results.append({'index': index, 'success': False, 'error': error})
+            continue
+        isim, soyisim, departman, timestamp, kask, yelek, uygunluk = record
+        sicil_no = by_name.get((isim, soyisim))
+        if sicil_no is None:
+            sicil_no = new_external_sicil_no(taken)
+            taken.add(sicil_no)
+            by_name[(isim, soyisim)] = sicil_no
+            new_users.append((isim, soyisim, sicil_no, departman))
+        rows.append((timestamp, kask, yelek, uygunluk, external_filename(isim, soyisim), sicil_no))
+        results.append({'index': index, 'success': True, 'sicil_no': sicil_no})
+
+    if new_users:
+        db.insert_users(conn, new_users)
+    if rows:
+        with inspection_stats.bulk_insert(conn):
+            db.insert_inspections(conn, rows)
+
+    return {
+        'success': len(rows) == len(results),
+        'received': len(results),
+        'inserted': len(rows),
+        'failed': len(results) - len(rows),
+        'users_created': len(new_users),
+        'results': results
+    }
@@ -0,0 +1,449 @@
+"""
+Yaklaşık en yakın komşu (ANN) yüz indeksleri - 100k+ kayıtlı yüz için
+
+- IvfPqFaceIndex: saf NumPy IVF (kaba k-means kümeleri) + ürün kuantizasyonu (PQ),
+  aday listesi orijinal vektörlerle yeniden sıralanır
+- HnswFaceIndex: hnswlib kuruluysa HNSW grafiği
+
+Her ikisi de FaceIndex ile aynı arayüzü sunar: add / remove / search / save / load
+"""
+import os
+import threading
+
+import numpy as np
+
+from face_index import FACE_ENCODING_DIM, FACE_RECOGNITION_TOLERANCE, FaceIndex, save_npz, saved_db_version
+
+# 0 = otomatik (~4*sqrt(N) küme)
+FACE_IVF_NLIST = int(os.environ.get('FACE_IVF_NLIST', '0'))
+# Sorguda taranan küme sayısı - artırmak recall'u artırır, gecikmeyi uzatır
+FACE_IVF_NPROBE = int(os.environ.get('FACE_IVF_NPROBE', '16'))
+# PQ alt vektör sayısı (128 / M boyutlu parçalar, parça başına 1 byte kod)
+FACE_PQ_M = int(os.environ.get('FACE_PQ_M', '16'))
+# PQ mesafesine göre en iyi bu kadar aday gerçek mesafeyle yeniden sıralanır
+FACE_IVF_RERANK = int(os.environ.get('FACE_IVF_RERANK', '64'))
+# Bu kadar yüzden azken eğitim yapılmaz, tam arama kullanılır
+FACE_IVF_MIN_TRAIN = int(os.environ.get('FACE_IVF_MIN_TRAIN', '4096'))
+
+FACE_HNSW_M = int(os.environ.get('FACE_HNSW_M', '16'))
+FACE_HNSW_EF_CONSTRUCTION = int(os.environ.get('FACE_HNSW_EF_CONSTRUCTION', '200'))
+FACE_HNSW_EF = int(os.environ.get('FACE_HNSW_EF', '64'))
+
+PQ_CODES = 256
+# k-means eğitimi için küme başına / PQ için en fazla kullanılan örnek sayısı
+TRAIN_SAMPLES_PER_CLUSTER = 32
+PQ_TRAIN_SAMPLE_SIZE = 16384
+KMEANS_ITERATIONS = 10
+# Kayıt sayısı son eğitimdekinin bu katına ulaşınca kümeler yeniden eğitilir
+RETRAIN_GROWTH = 4
+# Kümeleme sırasında bellek kullanımını sınırlamak için parça boyu
+CHUNK_SIZE = 16384
+
+
+def hnswlib_available():
+    try:
+        import hnswlib  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def nearest_centers(vectors, centers):
+    """Her vektör için en yakın merkezin indeksi (parça parça, |c|^2 - 2vc)"""
+    center_norms = np.einsum('ij,ij->i', centers, centers)
+    labels = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), CHUNK_SIZE):
+        chunk = vectors[start:start + CHUNK_SIZE]
+        labels[start:start + CHUNK_SIZE] = np.argmin(center_norms - 2.0 * (chunk @ centers.T), axis=1)
+    return labels
+
+
+def kmeans(vectors, k, iterations=KMEANS_ITERATIONS, seed=0):
+    """Basit Lloyd k-means; boş kalan kümeler rastgele noktayla yeniden başlatılır"""
+    rng = np.random.default_rng(seed)
+    centers = vectors[rng.choice(len(vectors), k, replace=False)].copy()
+    for _ in range(iterations):
+        labels = nearest_centers(vectors, centers)
+        counts = np.bincount(labels, minlength=k)
+        order = np.argsort(labels, kind='stable')
+        filled = np.flatnonzero(counts)
+        sums = np.add.reduceat(vectors[order], np.concatenate(([0], np.cumsum(counts)[:-1]))[filled], axis=0)
+        centers[filled] = sums / counts[filled, None]
+        empty = np.flatnonzero(counts == 0)
+        if len(empty):
+            centers[empty] = vectors[rng.choice(len(vectors), len(empty), replace=False)]
+    return centers
+
+
+class IvfPqFaceIndex:
+    """
+    IVF-PQ: vektörler kaba kümelere dağıtılır, kümeye göre kalıntıları PQ ile 1 byte/parça kodlanır.
+    Sorguda en yakın nprobe kümesinin kodları tablo aramasıyla puanlanır, en iyi adaylar
+    saklanan float32 vektörlerle kesin mesafeye göre yeniden sıralanır (tolerans kararı kesin mesafeyle).
+    """
+
+    backend = 'ivfpq'
+
+    def __init__(self, dim=FACE_ENCODING_DIM, nlist=FACE_IVF_NLIST, nprobe=FACE_IVF_NPROBE, pq_m=FACE_PQ_M,
+                 rerank=FACE_IVF_RERANK, min_train=FACE_IVF_MIN_TRAIN, capacity=1024):
+        if dim % pq_m:
+            raise ValueError(f"Boyut ({dim}) PQ parça sayısına ({pq_m}) tam bölünmeli")
+        self.dim = dim
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.pq_m = pq_m
+        self.rerank = rerank
+        self.min_train = max(min_train, PQ_CODES)
+        # Tolerans kararı ve yeniden eğitim için orijinal vektörler de tutulur
+        self._exact = FaceIndex(dim, capacity)
+        self._codes = np.empty((capacity, pq_m), dtype=np.uint8)
+        self._assign = np.empty(capacity, dtype=np.int32)
+        self._centroids = None
+        self._codebooks = None
+        self._codebook_norms = None
+        self._table_offsets = np.arange(pq_m) * PQ_CODES
+        self._lists = []
+        self._list_arrays = []
+        self._trained_size = 0
+        self._lock = threading.RLock()
+
+    @property
+    def last_row_id(self):
+        return self._exact.last_row_id
+
+    @last_row_id.setter
+    def last_row_id(self, value):
+        self._exact.last_row_id = value
+
+    @property
+    def db_version(self):
+        return self._exact.db_version
+
+    @db_version.setter
+    def db_version(self, value):
+        self._exact.db_version = value
+
+    @property
+    def trained(self):
+        return self._centroids is not None
+
+    def __len__(self):
+        return len(self._exact)
+
+    def _ensure_capacity(self):
+        capacity = len(self._exact._matrix)
+        if len(self._codes) < capacity:
+            codes = np.empty((capacity, self.pq_m), dtype=np.uint8)
+            assign = np.empty(capacity, dtype=np.int32)
+            codes[:len(self._codes)] = self._codes
+            assign[:len(self._assign)] = self._assign
+            self._codes, self._assign = codes, assign
+
+    def _encode(self, vectors):
+        """Vektörler -> (küme, PQ kodları)"""
+        assign = nearest_centers(vectors, self._centroids)
+        residuals = (vectors - self._centroids[assign]).reshape(len(vectors), self.pq_m, -1)
+        codes = np.empty((len(vectors), self.pq_m), dtype=np.uint8)
+        for j in range(self.pq_m):
+            codes[:, j] = nearest_centers(residuals[:, j], self._codebooks[j])
+        return assign, codes
+
+    def train(self):
+        """Kümeleri ve PQ kod kitaplarını mevcut yüzlerden (yeniden) eğit, tüm yüzleri yeniden kodla"""
+        with self._lock:
+            count = len(self._exact)
+            vectors = self._exact._matrix[:count]
+            rng = np.random.default_rng(0)
+            nlist = min(self.nlist or int(np.clip(4 * np.sqrt(count), 16, 4096)), count)
+            sample = vectors[rng.choice(count, min(count, nlist * TRAIN_SAMPLES_PER_CLUSTER), replace=False)]
+            self._centroids = kmeans(sample, nlist)
+
+            sample = sample[:PQ_TRAIN_SAMPLE_SIZE]
+            residuals = (sample - self._centroids[nearest_centers(sample, self._centroids)])
+            residuals = residuals.reshape(len(sample), self.pq_m, -1)
+            self._codebooks = np.stack([kmeans(residuals[:, j], PQ_CODES) for j in range(self.pq_m)])
+            self._codebook_norms = np.einsum('mkd,mkd->mk', self._codebooks, self._codebooks)
+
+            self._ensure_capacity()
+            self._assign[:count], self._codes[:count] = self._encode(vectors)
+            self._rebuild_lists()
+            self._trained_size = count
+
+    def _rebuild_lists(self):
+        count = len(self._exact)
+        self._lists = [[] for _ in range(len(self._centroids))]
+        for position, cluster in enumerate(self._assign[:count].tolist()):
+            self._lists[cluster].append(position)
+        self._list_arrays = [None] * len(self._lists)
+
+    def _list_array(self, cluster):
+        array = self._list_arrays[cluster]
+        if array is None:
+            array = self._list_arrays[cluster] = np.array(self._lists[cluster], dtype=np.int64)
+        return array
+
+    def _unlist(self, position):
+        cluster = self._assign[position]
+        self._lists[cluster].remove(position)
+        self._list_arrays[cluster] = None
+
+    def add(self, sicil_no, encoding, row_id=None):
+        """Yüz ekle; eğitilmişse anında kodlanıp kümesine eklenir"""
+        with self._lock:
+            existing = self._exact._positions.get(sicil_no)
+            if existing is not None and self.trained:
+                self._unlist(existing)
+            self._exact.add(sicil_no, encoding, row_id)
+            count = len(self._exact)
+
+            if not self.trained:
+                if count >= self.min_train:
+                    self.train()
+                return
+            if count >= self._trained_size * RETRAIN_GROWTH:
+                # Veri kümesi büyüdükçe kümeler dengesizleşir - seyrek ama toplu yeniden eğitim
+                self.train()
+                return
+
+            position = self._exact._positions[sicil_no]
+            self._ensure_capacity()
+            assign, codes = self._encode(self._exact._matrix[position:position + 1])
+            self._assign[position], self._codes[position] = assign[0], codes[0]
+            self._lists[assign[0]].append(position)
+            self._list_arrays[assign[0]] = None
+
+    def add_batch(self, sicil_nos, encodings, last_row_id=None):
+        """Toplu ekleme - eğitim ve kodlama tek seferde yapılır"""
+        with self._lock:
+            if not self.trained:
+                self._exact.add_batch(sicil_nos, encodings, last_row_id)
+                if len(self._exact) >= self.min_train:
+                    self.train()
+                return
+            for sicil_no in set(sicil_nos):
+                existing = self._exact._positions.get(sicil_no)
+                if existing is not None:
+                    self._unlist(existing)
+            self._exact.add_batch(sicil_nos, encodings, last_row_id)
+            count = len(self._exact)
+            if count >= self._trained_size * RETRAIN_GROWTH:
+                self.train()
+                return
+
+            # Güncellenen eski satırlar + yeni eklenen satırlar yeniden kodlanır
+            positions = sorted({self._exact._positions[sicil_no] for sicil_no in sicil_nos})
+            self._ensure_capacity()
+            assign, codes = self._encode(self._exact._matrix[positions])
+            self._assign[positions], self._codes[positions] = assign, codes
+            for position, cluster in zip(positions, assign.tolist()):
+                self._lists[cluster].append(position)
+                self._list_arrays[cluster] = None
+
+    def remove(self, sicil_no):
+        with self._lock:
+            position = self._exact._positions.get(sicil_no)
+            if position is None:
+                return False
+            last = len(self._exact) - 1
+            if self.trained:
+                self._unlist(position)
+                if position != last:
+                    # FaceIndex son satırı boşalan yere taşır - kod ve küme bilgisi de taşınmalı
+                    cluster = self._assign[last]
+                    members = self._lists[cluster]
+                    members[members.index(last)] = position
+                    self._list_arrays[cluster] = None
+                    self._assign[position] = cluster
+                    self._codes[position] = self._codes[last]
+            return self._exact.remove(sicil_no)
+
+    def search(self, encoding, tolerance=FACE_RECOGNITION_TOLERANCE):
+        """En yakın yüz: (sicil_no, mesafe); tolerans dışındaysa sicil_no None"""
+        with self._lock:
+            if not self.trained:
+                return self._exact.search(encoding, tolerance)
+
+            query = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+            coarse = np.einsum('ij,ij->i', self._centroids, self._centroids) - 2.0 * (self._centroids @ query)
+            nprobe = min(self.nprobe, len(self._centroids))
+            probe = np.argpartition(coarse, nprobe - 1)[:nprobe]
+
+            arrays = [self._list_array(cluster) for cluster in probe]
+            candidates = np.concatenate(arrays)
+            if len(candidates) == 0:
+                return self._exact.search(encoding, tolerance)
+            candidate_probe = np.repeat(np.arange(nprobe), [len(a) for a in arrays])
+
+            # Asimetrik mesafe: sorgu kalıntısı ile her kod arasındaki mesafe tablosu (nprobe, M, 256);
+            # |r|^2 her aday için sabit olduğundan sıralamaya etkisi yok, atlanır
+            residuals = (query - self._centroids[probe]).reshape(nprobe, self.pq_m, -1)
+            tables = self._codebook_norms - 2.0 * np.einsum('pmd,mkd->pmk', residuals, self._codebooks)
+            offsets = (candidate_probe * self.pq_m)[:, None] * PQ_CODES + self._table_offsets
+            approximate = tables.ravel()[offsets + self._codes[candidates]].sum(axis=1)
+
+            if len(candidates) > self.rerank:
+                candidates = candidates[np.argpartition(approximate, self.rerank - 1)[:self.rerank]]
+            vectors = self._exact._matrix[candidates]
+            squared = self._exact._norms[candidates] - 2.0 * (vectors @ query) + query @ query
+            best = int(np.argmin(squared))
+            distance = float(np.sqrt(max(squared[best], 0.0)))
+            sicil_no = self._exact._ids[candidates[best]]
+
+        if distance > tolerance:
+            return None, distance
+        return sicil_no, distance
+
+    def save(self, path):
+        with self._lock:
+            count = len(self._exact)
+            arrays = {
+                'backend': self.backend,
+                'ids': np.array(self._exact._ids, dtype=str),
+                'vectors': self._exact._matrix[:count],
+                'last_row_id': self.last_row_id,
+                'db_version': self.db_version,
+                'params': np.array([self.nlist, self.nprobe, self.pq_m, self.rerank, self.min_train,
+                                    self._trained_size])
+            }
+            if self.trained:
+                arrays.update(centroids=self._centroids, codebooks=self._codebooks,
+                              assign=self._assign[:count], codes=self._codes[:count])
+            save_npz(path, **arrays)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            nlist, nprobe, pq_m, rerank, min_train, trained_size = data['params'].tolist()
+            vectors = data['vectors']
+            index = cls(vectors.shape[1], nlist, nprobe, pq_m, rerank, min_train, capacity=max(1024, len(vectors)))
+            # Çalışma zamanı ayarları (.env) kayıttakileri ezer
+            index.nprobe, index.rerank = FACE_IVF_NPROBE, FACE_IVF_RERANK
+            index._exact.extend(data['ids'].tolist(), vectors)
+            index.last_row_id = int(data['last_row_id'])
+            index.db_version = saved_db_version(data)
+            if 'centroids' in data:
+                index._centroids = data['centroids']
+                index._codebooks = data['codebooks']
+                index._codebook_norms = np.einsum('mkd,mkd->mk', index._codebooks, index._codebooks)
+                index._ensure_capacity()
+                index._assign[:len(vectors)] = data['assign']
+                index._codes[:len(vectors)] = data['codes']
+                index._trained_size = trained_size
+                index._rebuild_lists()
+        return index
+
+
+class HnswFaceIndex:
+    """hnswlib HNSW grafiği; etiketler sıralı tamsayı, sicil_no eşlemesi yanında tutulur"""
+
+    backend = 'hnsw'
+
+    def __init__(self, dim=FACE_ENCODING_DIM, m=FACE_HNSW_M, ef_construction=FACE_HNSW_EF_CONSTRUCTION,
+                 ef=FACE_HNSW_EF, capacity=1024, index=None):
+        import hnswlib
+
+        self.dim = dim
+        if index is None:
+            index = hnswlib.Index(space='l2', dim=dim)
+            index.init_index(max_elements=capacity, ef_construction=ef_construction, M=m)
+        index.set_ef(ef)
+        self._index = index
+        self._labels = {}
+        self._ids = {}
+        self._next_label = 0
+        self._lock = threading.RLock()
+        self.last_row_id = 0
+        self.db_version = -1
+
+    def __len__(self):
+        return len(self._labels)
+
+    def add(self, sicil_no, encoding, row_id=None):
+        """Yüz ekle; sicil_no zaten varsa aynı etiketin vektörü güncellenir"""
+        vector = np.asarray(encoding, dtype=np.float32).reshape(1, self.dim)
+        with self._lock:
+            label = self._labels.get(sicil_no)
+            if label is None:
+                label = self._next_label
+                self._next_label += 1
+                if self._next_label > self._index.get_max_elements():
+                    self._index.resize_index(self._index.get_max_elements() * 2)
+                self._labels[sicil_no] = label
+                self._ids[label] = sicil_no
+            self._index.add_items(vector, np.array([label]))
+            if row_id is not None:
+                self.last_row_id = max(self.last_row_id, row_id)
+
+    def add_batch(self, sicil_nos, encodings, last_row_id=None):
+        """Toplu ekleme - hnswlib tek add_items çağrısında çok thread'li ekler"""
+        vectors = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            labels = []
+            for sicil_no in sicil_nos:
+                label = self._labels.get(sicil_no)
+                if label is None:
+                    label = self._next_label
+                    self._next_label += 1
+                    self._labels[sicil_no] = label
+                    self._ids[label] = sicil_no
+                labels.append(label)
+            if self._next_label > self._index.get_max_elements():
+                self._index.resize_index(max(self._next_label, self._index.get_max_elements() * 2))
+            if labels:
+                self._index.add_items(vectors, np.array(labels))
+            if last_row_id is not None:
+                self.last_row_id = max(self.last_row_id, last_row_id)
+
+    def remove(self, sicil_no):
+        with self._lock:
+            label = self._labels.pop(sicil_no, None)
+            if label is None:
+                return False
+            del self._ids[label]
+            self._index.mark_deleted(label)
+            return True
+
+    def search(self, encoding, tolerance=FACE_RECOGNITION_TOLERANCE):
+        """En yakın yüz: (sicil_no, mesafe); tolerans dışındaysa sicil_no None"""
+        query = np.asarray(encoding, dtype=np.float32).reshape(1, self.dim)
+        with self._lock:
+            if not self._labels:
+                return None, None
+            labels, squared = self._index.knn_query(query, k=1)
+            # hnswlib 'l2' kare mesafe döndürür
+            distance = float(np.sqrt(max(squared[0][0], 0.0)))
+            sicil_no = self._ids[int(labels[0][0])]
+
+        if distance > tolerance:
+            return None, distance
+        return sicil_no, distance
+
+    def save(self, path):
+        with self._lock:
+            graph_path = f'{path}.hnsw'
+            temp_path = f'{graph_path}.tmp'
+            self._index.save_index(temp_path)
+            os.replace(temp_path, graph_path)
+            save_npz(path, backend=self.backend, ids=np.array(list(self._labels), dtype=str),
+                     labels=np.array(list(self._labels.values()), dtype=np.int64),
+                     next_label=self._next_label, last_row_id=self.last_row_id, db_version=self.db_version)
+
+    @classmethod
+    def load(cls, path):
+        import hnswlib
+
+        with np.load(path) as data:
+            ids = data['ids'].tolist()
+            labels = data['labels'].tolist()
+            next_label = int(data['next_label'])
+            last_row_id = int(data['last_row_id'])
+            db_version = saved_db_version(data)
+        graph = hnswlib.Index(space='l2', dim=FACE_ENCODING_DIM)
+        graph.load_index(f'{path}.hnsw', max_elements=max(1024, next_label))
+        index = cls(graph.dim, index=graph)
+        index._labels = dict(zip(ids, labels))
+        index._ids = dict(zip(labels, ids))
+        index._next_label = next_label
+        index.last_row_id = last_row_id
+        index.db_version = db_version
+        return index
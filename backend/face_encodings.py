@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Yüz vektörlerinin veritabanı biçimi - 128 float32 = 512 byte BLOB (eski biçim: JSON metin)
+
+Eski JSON kayıtlarını dönüştürmek için (önce/sonra boyut ve yükleme süresi raporlanır):
+    python face_encodings.py migrate --database ppe_inspections.db
+"""
+import argparse
+import json
+import os
+import sqlite3
+import time
+
+import numpy as np
+
+from face_index import FACE_ENCODING_DIM
+
+# PRAGMA user_version: 0 = JSON metin, 1 = float32 BLOB
+FACE_ENCODING_SCHEMA_VERSION = 1
+# face_encoding sütunu olan tablolar (app.py: users, app_simple.py: users_db)
+FACE_ENCODING_TABLES = ('users_db', 'users')
+# Tablo başına değişiklik sayacı: yüz vektörü/sicil_no güncellenince veya yüzlü kayıt silinince artar.
+# Yeni kayıtlar last_row_id ile izlenir; kayıtlı indeksler sayacı saklar, uyuşmazsa yeniden kurulur.
+CHANGE_TABLE = '''
+    CREATE TABLE IF NOT EXISTS face_encoding_changes (
+        table_name TEXT PRIMARY KEY,
+        version INTEGER NOT NULL DEFAULT 0
+    )
+'''
+
+
+def encoding_to_blob(encoding):
+    """128 boyutlu vektör -> 512 byte (float32, little-endian)"""
+    return np.asarray(encoding, dtype='<f4').reshape(FACE_ENCODING_DIM).tobytes()
+
+
+def blob_to_encoding(value):
+    """BLOB'u kopyalamadan oku; eski JSON metin kayıtları da desteklenir"""
+    if isinstance(value, str):
+        return np.asarray(json.loads(value), dtype=np.float32)
+    return np.frombuffer(value, dtype='<f4')
+
+
+def decode_encodings(values):
+    """Satırlardaki vektörleri (N,128) matrise çevir - hepsi BLOB ise tek frombuffer"""
+    if not values:
+        return np.empty((0, FACE_ENCODING_DIM), dtype=np.float32)
+    if all(isinstance(value, bytes) for value in values):
+        return np.frombuffer(b''.join(values), dtype='<f4').reshape(-1, FACE_ENCODING_DIM)
+    return np.stack([blob_to_encoding(value) for value in values])
+
+
+def existing_tables(conn):
+    names = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    return [table for table in FACE_ENCODING_TABLES if table in names]
+
+
+def count_legacy_rows(conn):
+    return sum(conn.execute(f"SELECT COUNT(*) FROM {table} WHERE typeof(face_encoding) = 'text' "
+                            f"AND face_encoding != ''").fetchone()[0]
+               for table in existing_tables(conn))
+
+
+def change_triggers(table):
+    bump = f"UPDATE face_encoding_changes SET version = version + 1 WHERE table_name = '{table}';"
+    return (f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_face_encoding_update
+        AFTER UPDATE OF face_encoding, sicil_no ON {table}
+        WHEN OLD.face_encoding IS NOT NEW.face_encoding OR OLD.sicil_no IS NOT NEW.sicil_no
+        BEGIN {bump} END
+    ''', f'''
+        CREATE TRIGGER IF NOT EXISTS {table}_face_encoding_delete AFTER DELETE ON {table}
+        WHEN OLD.face_encoding IS NOT NULL
+        BEGIN {bump} END
+    ''')
+
+
+def ensure_change_tracking(conn):
+    """Değişiklik sayacı tablosu ve tetikleyicileri (init_db -> check_schema)"""
+    conn.execute(CHANGE_TABLE)
+    for table in existing_tables(conn):
+        conn.execute('INSERT OR IGNORE INTO face_encoding_changes (table_name) VALUES (?)', (table,))
+        for statement in change_triggers(table):
+            conn.execute(statement)
+    conn.commit()
+
+
+def encoding_version(conn, table):
+    """Tablonun değişiklik sayacı (tetikleyiciler kurulmamışsa 0)"""
+    try:
+        row = conn.execute('SELECT version FROM face_encoding_changes WHERE table_name = ?', (table,)).fetchone()
+    except sqlite3.OperationalError:
+        return 0
+    return row[0] if row else 0
+
+
+def check_schema(conn):
+    """
+    init_db'den çağrılır: değişiklik sayacını kur; JSON kaydı yoksa sürümü işaretle, varsa uyar.
+    Okuma her iki biçimi de desteklediği için uygulama dönüşüm yapılmadan da çalışır.
+    """
+    ensure_change_tracking(conn)
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version >= FACE_ENCODING_SCHEMA_VERSION:
+        return version
+    legacy = count_legacy_rows(conn)
+    if legacy:
+        print(f"⚠️ {legacy} yüz kaydı eski JSON biçiminde - dönüştürmek için: python face_encodings.py migrate")
+        return version
+    conn.execute(f'PRAGMA user_version = {FACE_ENCODING_SCHEMA_VERSION}')
+    conn.commit()
+    return FACE_ENCODING_SCHEMA_VERSION
+
+
+def measure_load(conn):
+    """Tüm yüzleri okuyup matrise çevirme süresi (uygulama açılışındaki yükleme)"""
+    start = time.perf_counter()
+    count = 0
+    for table in existing_tables(conn):
+        values = [row[0] for row in conn.execute(f"SELECT face_encoding FROM {table} "
+                                                 f"WHERE face_encoding IS NOT NULL AND face_encoding != ''")]
+        count += len(decode_encodings(values))
+    return count, time.perf_counter() - start
+
+
+def migrate(database):
+    """JSON metin kayıtlarını BLOB'a çevir, VACUUM ile dosyayı küçült, sürümü işaretle"""
+    conn = sqlite3.connect(database)
+    size_before = os.path.getsize(database)
+    count, load_before = measure_load(conn)
+
+    converted = 0
+    for table in existing_tables(conn):
+        rows = conn.execute(f"SELECT id, face_encoding FROM {table} WHERE typeof(face_encoding) = 'text' "
+                            f"AND face_encoding != ''").fetchall()
+        updates = [(encoding_to_blob(json.loads(value)), row_id) for row_id, value in rows]
+        conn.executemany(f'UPDATE {table} SET face_encoding = ? WHERE id = ?', updates)
+        converted += len(updates)
+    conn.execute(f'PRAGMA user_version = {FACE_ENCODING_SCHEMA_VERSION}')
+    conn.commit()
+    conn.execute('VACUUM')
+
+    _, load_after = measure_load(conn)
+    conn.close()
+    size_after = os.path.getsize(database)
+    return {
+        'faces': count,
+        'converted': converted,
+        'size_before': size_before,
+        'size_after': size_after,
+        'load_before': load_before,
+        'load_after': load_after
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('--database', default='ppe_inspections.db')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        raise SystemExit(f"❌ Veritabanı bulunamadı: {args.database}")
+    print(f"🔄 Yüz kayıtları dönüştürülüyor: {args.database}")
+    report = migrate(args.database)
+    print("=" * 50)
+    print(f"✅ Dönüştürülen kayıt: {report['converted']} ({report['faces']} yüz)")
+    print(f"💾 Veritabanı boyutu: {report['size_before'] / 1e6:.2f} MB -> {report['size_after'] / 1e6:.2f} MB")
+    print(f"⏱️ Yüz yükleme süresi: {report['load_before'] * 1000:.1f} ms -> {report['load_after'] * 1000:.1f} ms")
+    print("=" * 50)
+
+
+if __name__ == '__main__':
+    main()
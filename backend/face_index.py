@@ -0,0 +1,204 @@
+"""
+Bellek içi yüz indeksi - tüm kayıtlı yüzlere tek matris işlemiyle en yakın komşu araması
+
+Büyük kurulumlar için FACE_INDEX_BACKEND ile yaklaşık arama (face_ann.py) seçilebilir.
+"""
+import os
+import threading
+import uuid
+
+import numpy as np
+
+FACE_ENCODING_DIM = 128
+# face_recognition.compare_faces varsayılanı ile aynı
+FACE_RECOGNITION_TOLERANCE = float(os.environ.get('FACE_RECOGNITION_TOLERANCE', '0.6'))
+
+# exact: tam arama, ivfpq: NumPy IVF-PQ, hnsw: hnswlib, ann: hnswlib kuruluysa hnsw, değilse ivfpq
+FACE_INDEX_BACKENDS = ('exact', 'ivfpq', 'hnsw', 'ann')
+FACE_INDEX_BACKEND = os.environ.get('FACE_INDEX_BACKEND', 'exact').lower()
+# İndeks anlık görüntüsü (boş = diske kaydedilmez, her açılışta veritabanından kurulur)
+FACE_INDEX_PATH = os.environ.get('FACE_INDEX_PATH', '')
+
+
+def save_npz(path, **arrays):
+    """np.savez ile atomik yazma - aynı dosyayı okuyan diğer worker'lar yarım dosya görmez"""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    temp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+    try:
+        with open(temp_path, 'wb') as f:
+            np.savez(f, **arrays)
+        os.replace(temp_path, path)
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+
+class FaceIndex:
+    """(N,128) float32 matris + sicil_no listesi; kayıtta büyür, girişte tek seferde aranır"""
+
+    backend = 'exact'
+
+    def __init__(self, dim=FACE_ENCODING_DIM, capacity=1024):
+        self.dim = dim
+        self._matrix = np.empty((capacity, dim), dtype=np.float32)
+        self._norms = np.empty(capacity, dtype=np.float32)
+        self._ids = []
+        self._positions = {}
+        self._lock = threading.RLock()
+        # Veritabanından okunan en büyük satır id'si (artımlı yenileme için)
+        self.last_row_id = 0
+        # Kurulurken okunan değişiklik sayacı (face_encodings.encoding_version, -1 = bilinmiyor)
+        self.db_version = -1
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _grow(self):
+        capacity = max(1, len(self._matrix)) * 2
+        matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        norms = np.empty(capacity, dtype=np.float32)
+        matrix[:len(self._ids)] = self._matrix[:len(self._ids)]
+        norms[:len(self._ids)] = self._norms[:len(self._ids)]
+        self._matrix, self._norms = matrix, norms
+
+    def add(self, sicil_no, encoding, row_id=None):
+        """Yüz ekle; sicil_no zaten varsa encoding güncellenir"""
+        vector = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            position = self._positions.get(sicil_no)
+            if position is None:
+                if len(self._ids) == len(self._matrix):
+                    self._grow()
+                position = len(self._ids)
+                self._ids.append(sicil_no)
+                self._positions[sicil_no] = position
+            self._matrix[position] = vector
+            self._norms[position] = vector @ vector
+            if row_id is not None:
+                self.last_row_id = max(self.last_row_id, row_id)
+
+    def extend(self, sicil_nos, encodings):
+        """Toplu ekleme (anlık görüntüden yükleme); sicil_no'ların yeni olduğu varsayılır"""
+        vectors = np.asarray(encodings, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock:
+            while len(self._ids) + len(vectors) > len(self._matrix):
+                self._grow()
+            start = len(self._ids)
+            self._matrix[start:start + len(vectors)] = vectors
+            self._norms[start:start + len(vectors)] = np.einsum('ij,ij->i', vectors, vectors)
+            for offset, sicil_no in enumerate(sicil_nos):
+                self._positions[sicil_no] = start + offset
+            self._ids.extend(sicil_nos)
+
+    def add_batch(self, sicil_nos, encodings, last_row_id=None):
+        """Veritabanından toplu yükleme; zaten kayıtlı sicil_no'lar tek tek güncellenir"""
+        with self._lock:
+            new = [i for i, sicil_no in enumerate(sicil_nos) if sicil_no not in self._positions]
+            if len(new) != len(sicil_nos):
+                new_set = set(new)
+                for i, sicil_no in enumerate(sicil_nos):
+                    if i not in new_set:
+                        self.add(sicil_no, encodings[i])
+            if new:
+                self.extend([sicil_nos[i] for i in new], [encodings[i] for i in new])
+            if last_row_id is not None:
+                self.last_row_id = max(self.last_row_id, last_row_id)
+
+    def remove(self, sicil_no):
+        """Yüzü çıkar (son satır boşalan yere taşınır)"""
+        with self._lock:
+            position = self._positions.pop(sicil_no, None)
+            if position is None:
+                return False
+            last = len(self._ids) - 1
+            if position != last:
+                moved = self._ids[last]
+                self._matrix[position] = self._matrix[last]
+                self._norms[position] = self._norms[last]
+                self._ids[position] = moved
+                self._positions[moved] = position
+            self._ids.pop()
+            return True
+
+    def search(self, encoding, tolerance=FACE_RECOGNITION_TOLERANCE):
+        """En yakın yüz: (sicil_no, mesafe); tolerans dışındaysa sicil_no None"""
+        query = np.asarray(encoding, dtype=np.float32).reshape(self.dim)
+        with self._lock:
+            count = len(self._ids)
+            if count == 0:
+                return None, None
+            # |a-b|^2 = |a|^2 - 2ab + |b|^2 - kayıtlı normlar önceden hesaplı, tek matris-vektör çarpımı
+            squared = self._norms[:count] - 2.0 * (self._matrix[:count] @ query) + query @ query
+            best = int(np.argmin(squared))
+            distance = float(np.sqrt(max(squared[best], 0.0)))
+            sicil_no = self._ids[best]
+
+        if distance > tolerance:
+            return None, distance
+        return sicil_no, distance
+
+    def save(self, path):
+        with self._lock:
+            count = len(self._ids)
+            save_npz(path, backend=self.backend, ids=np.array(self._ids, dtype=str),
+                     vectors=self._matrix[:count], last_row_id=self.last_row_id, db_version=self.db_version)
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            vectors = data['vectors']
+            index = cls(vectors.shape[1], capacity=max(1024, len(vectors)))
+            index.extend(data['ids'].tolist(), vectors)
+            index.last_row_id = int(data['last_row_id'])
+            index.db_version = saved_db_version(data)
+        return index
+
+
+def saved_db_version(data):
+    """Kayıttaki değişiklik sayacı; sayaçtan önceki kayıtlarda -1 (yeniden kurulur)"""
+    return int(data['db_version']) if 'db_version' in data else -1
+
+
+def resolve_face_index_backend(backend=FACE_INDEX_BACKEND):
+    if backend not in FACE_INDEX_BACKENDS:
+        raise ValueError(f"Bilinmeyen yüz indeksi: {backend} (seçenekler: {', '.join(FACE_INDEX_BACKENDS)})")
+    if backend == 'ann':
+        from face_ann import hnswlib_available
+        return 'hnsw' if hnswlib_available() else 'ivfpq'
+    return backend
+
+
+def face_index_class(backend):
+    if backend == 'exact':
+        return FaceIndex
+    from face_ann import HnswFaceIndex, IvfPqFaceIndex
+    return {'ivfpq': IvfPqFaceIndex, 'hnsw': HnswFaceIndex}[backend]
+
+
+def create_face_index(backend=FACE_INDEX_BACKEND):
+    return face_index_class(resolve_face_index_backend(backend))()
+
+
+def load_face_index(path=FACE_INDEX_PATH, backend=FACE_INDEX_BACKEND, db_version=None):
+    """
+    Anlık görüntü varsa, aynı türdeyse ve db_version verildiğinde kayıttaki sayaçla aynıysa yükle,
+    yoksa boş indeks oluştur. Yüklenen indeks last_row_id'den sonraki kayıtlarla veritabanından tamamlanmalı.
+    """
+    backend = resolve_face_index_backend(backend)
+    if path and os.path.exists(path):
+        try:
+            with np.load(path) as data:
+                saved_backend = str(data['backend'])
+                saved_version = saved_db_version(data)
+            if saved_backend != backend:
+                print(f"⚠️ Yüz indeksi türü değişti ({saved_backend} -> {backend}), yeniden kurulacak")
+            elif db_version is not None and saved_version != db_version:
+                # Kayıtlı yüzler indeks kaydedildikten sonra güncellenmiş/silinmiş
+                print(f"⚠️ Yüz kayıtları değişmiş (sayaç {saved_version} -> {db_version}), yüz indeksi yeniden kurulacak")
+            else:
+                return face_index_class(backend).load(path)
+        except Exception as e:
+            print(f"⚠️ Yüz indeksi yüklenemedi ({path}): {e}")
+    return create_face_index(backend)
@@ -0,0 +1,66 @@
+"""
+Yüz tespit/encoding hattı - tespit küçültülmüş kopyada yapılır, kutular orijinal koordinatlara
+ölçeklenir ve encoding orijinal çözünürlükteki yüz kesitinden çıkarılır
+
+HOG tespitinin maliyeti piksel sayısıyla büyür; 2400px bir yüklemede 640px'e küçültmek tespiti
+~14 kat ucuzlatır, encoding ise aynı yüz piksellerinden hesaplandığı için değişmez.
+"""
+import os
+
+import cv2
+import numpy as np
+
+# Tespit öncesi uzun kenar (0 = küçültme yok)
+FACE_DETECTION_MAX_SIDE = int(os.environ.get('FACE_DETECTION_MAX_SIDE', '640'))
+# hog (CPU) veya cnn (dlib CUDA ile derlenmişse)
+FACE_DETECTION_MODEL = os.environ.get('FACE_DETECTION_MODEL', 'hog')
+FACE_DETECTION_UPSAMPLE = int(os.environ.get('FACE_DETECTION_UPSAMPLE', '1'))
+
+# Encoding kesitinde yüz kutusunun çevresine bırakılan pay (kutu boyuna oranla);
+# landmark'lar ve 150px yüz çipi kutunun biraz dışına taşar
+CROP_MARGIN = 0.5
+
+
+def detection_scale(shape, max_side=FACE_DETECTION_MAX_SIDE):
+    height, width = shape[:2]
+    if not max_side or max(height, width) <= max_side:
+        return 1.0
+    return max_side / max(height, width)
+
+
+def detect_faces(image_np, max_side=FACE_DETECTION_MAX_SIDE, model=FACE_DETECTION_MODEL,
+                 upsample=FACE_DETECTION_UPSAMPLE):
+    """Yüz kutuları (top, right, bottom, left) - orijinal görüntü koordinatlarında"""
+    import face_recognition
+
+    scale = detection_scale(image_np.shape, max_side)
+    if scale == 1.0:
+        return face_recognition.face_locations(image_np, number_of_times_to_upsample=upsample, model=model)
+
+    height, width = image_np.shape[:2]
+    small = cv2.resize(image_np, (round(width * scale), round(height * scale)), interpolation=cv2.INTER_AREA)
+    locations = face_recognition.face_locations(small, number_of_times_to_upsample=upsample, model=model)
+    return [(max(0, round(top / scale)), min(width, round(right / scale)),
+             min(height, round(bottom / scale)), max(0, round(left / scale)))
+            for top, right, bottom, left in locations]
+
+
+def largest_face(locations):
+    return max(locations, key=lambda box: (box[2] - box[0]) * (box[1] - box[3]))
+
+
+def encode_faces(image_np, locations, margin=CROP_MARGIN):
+    """Her yüz için 128 boyutlu encoding - yüzün çevresindeki kesitten, orijinal çözünürlükte"""
+    import face_recognition
+
+    height, width = image_np.shape[:2]
+    encodings = []
+    for top, right, bottom, left in locations:
+        pad_y = int((bottom - top) * margin)
+        pad_x = int((right - left) * margin)
+        y0, y1 = max(0, top - pad_y), min(height, bottom + pad_y)
+        x0, x1 = max(0, left - pad_x), min(width, right + pad_x)
+        # dlib bitişik bellek bekler
+        crop = np.ascontiguousarray(image_np[y0:y1, x0:x1])
+        encodings.extend(face_recognition.face_encodings(crop, [(top - y0, right - x0, bottom - y0, left - x0)]))
+    return encodings
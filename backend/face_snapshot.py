@@ -0,0 +1,255 @@
+#!/usr/bin/env python3
+"""
+Yüz vektörü anlık görüntüsü - tüm worker'ların salt okunur mmap ile paylaştığı .npy dosyaları
+
+<FACE_SNAPSHOT_DIR>/<tablo>/
+    CURRENT                          -> geçerli sürüm klasörünün adı (atomik olarak değiştirilir)
+    snapshot_<son id>_<rastgele>/
+        embeddings.npy               -> (N,128) float32, bitişik
+        norms.npy                    -> (N,) |v|^2, açılışta yeniden hesaplanmaz
+        ids.npy                      -> (N,) sicil_no
+        meta.json                    -> count, last_row_id, db_version (değişiklik sayacı)
+
+Açılış süresi kullanıcı sayısından bağımsızdır: dosyalar okunmaz, sadece eşlenir; sayfalar
+işletim sisteminin sayfa önbelleğinde tüm süreçler arasında ortaktır.
+
+Elle oluşturmak için:
+    python face_snapshot.py build --database ppe_inspections.db --table users_db
+"""
+import argparse
+import json
+import os
+import shutil
+import sqlite3
+import threading
+import uuid
+
+import numpy as np
+
+from face_encodings import decode_encodings, encoding_version
+from face_index import FACE_ENCODING_DIM, FACE_RECOGNITION_TOLERANCE, FaceIndex
+
+# Boş = kapalı; ayarlıysa yüz araması bu klasördeki paylaşımlı anlık görüntüden yapılır
+FACE_SNAPSHOT_DIR = os.environ.get('FACE_SNAPSHOT_DIR', '')
+# Kayıttan sonra anlık görüntünün yeniden oluşturulması için beklenen süre (ardışık kayıtlar birleşir)
+FACE_SNAPSHOT_DELAY = float(os.environ.get('FACE_SNAPSHOT_DELAY', '5'))
+
+CURRENT_FILE = 'CURRENT'
+# Eski sürümü eşlemiş worker'lar için bir önceki sürüm de tutulur
+KEEP_VERSIONS = 2
+READ_CHUNK = 10000
+
+
+def snapshot_directory(table, root=FACE_SNAPSHOT_DIR):
+    return os.path.join(root, table)
+
+
+def read_current(directory):
+    try:
+        with open(os.path.join(directory, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _publish(directory, version):
+    temp_path = os.path.join(directory, f'.{CURRENT_FILE}.{uuid.uuid4().hex[:8]}.tmp')
+    with open(temp_path, 'w') as f:
+        f.write(version)
+    os.replace(temp_path, os.path.join(directory, CURRENT_FILE))
+
+
+def _cleanup(directory):
+    versions = sorted((name for name in os.listdir(directory) if name.startswith('snapshot_')),
+                      key=lambda name: os.path.getmtime(os.path.join(directory, name)))
+    for name in versions[:-KEEP_VERSIONS]:
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def build_snapshot(database, table, directory):
+    """Tablodaki tüm yüzleri parça parça okuyup yeni sürüm olarak yayınla; (sürüm, sayı) döndür"""
+    os.makedirs(directory, exist_ok=True)
+    conn = sqlite3.connect(database)
+    try:
+        # Sayım ve okuma aynı okuma işleminde - arada eklenen kayıtlar anlık görüntüye karışmaz
+        conn.execute('BEGIN')
+        where = "face_encoding IS NOT NULL AND face_encoding != ''"
+        count, width = conn.execute(f'SELECT COUNT(*), MAX(LENGTH(sicil_no)) FROM {table} WHERE {where}').fetchone()
+        last_row_id = conn.execute(f'SELECT COALESCE(MAX(id), 0) FROM {table}').fetchone()[0]
+        db_version = encoding_version(conn, table)
+
+        version = f'snapshot_{last_row_id}_{uuid.uuid4().hex[:8]}'
+        temp_dir = os.path.join(directory, f'.{version}.tmp')
+        os.makedirs(temp_dir)
+        ids = np.empty(count, dtype=f'<U{max(width or 1, 1)}')
+        if count:
+            embeddings = np.lib.format.open_memmap(os.path.join(temp_dir, 'embeddings.npy'), mode='w+',
+                                                   dtype=np.float32, shape=(count, FACE_ENCODING_DIM))
+        else:
+            embeddings = np.empty((0, FACE_ENCODING_DIM), dtype=np.float32)
+
+        cursor = conn.execute(f'SELECT sicil_no, face_encoding FROM {table} WHERE {where} ORDER BY id')
+        offset = 0
+        while True:
+            rows = cursor.fetchmany(READ_CHUNK)
+            if not rows:
+                break
+            embeddings[offset:offset + len(rows)] = decode_encodings([row[1] for row in rows])
+            ids[offset:offset + len(rows)] = [row[0] for row in rows]
+            offset += len(rows)
+        conn.commit()
+    finally:
+        conn.close()
+
+    if count:
+        embeddings.flush()
+    else:
+        np.save(os.path.join(temp_dir, 'embeddings.npy'), embeddings)
+    np.save(os.path.join(temp_dir, 'norms.npy'), np.einsum('ij,ij->i', embeddings, embeddings))
+    np.save(os.path.join(temp_dir, 'ids.npy'), ids)
+    with open(os.path.join(temp_dir, 'meta.json'), 'w') as f:
+        json.dump({'count': count, 'last_row_id': last_row_id, 'db_version': db_version}, f)
+    del embeddings
+
+    os.replace(temp_dir, os.path.join(directory, version))
+    _publish(directory, version)
+    _cleanup(directory)
+    return version, count
+
+
+class MappedFaceIndex:
+    """
+    Anlık görüntü (salt okunur mmap) + sonrasında kaydolanlar için küçük bir FaceIndex.
+    reload() yeni yayınlanan sürüme geçer; fark kayıtları veritabanından yeniden okunmalı.
+    """
+
+    backend = 'mmap'
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.snapshot_version = None
+        self._embeddings = np.empty((0, FACE_ENCODING_DIM), dtype=np.float32)
+        self._norms = np.empty(0, dtype=np.float32)
+        self._ids = np.empty(0, dtype='<U1')
+        self._snapshot_row_id = 0
+        # Anlık görüntü kurulurken okunan değişiklik sayacı (face_encodings.encoding_version)
+        self.db_version = -1
+        self._delta = FaceIndex()
+        self._lock = threading.RLock()
+        self.reload()
+
+    @property
+    def last_row_id(self):
+        return max(self._snapshot_row_id, self._delta.last_row_id)
+
+    def __len__(self):
+        return len(self._ids) + len(self._delta)
+
+    def reload(self):
+        """CURRENT değiştiyse yeni sürümü eşle; geçildiyse True"""
+        version = read_current(self.directory)
+        if version is None or version == self.snapshot_version:
+            return False
+        path = os.path.join(self.directory, version)
+        with open(os.path.join(path, 'meta.json')) as f:
+            meta = json.load(f)
+        if meta['count']:
+            embeddings = np.load(os.path.join(path, 'embeddings.npy'), mmap_mode='r')
+            norms = np.load(os.path.join(path, 'norms.npy'), mmap_mode='r')
+            ids = np.load(os.path.join(path, 'ids.npy'), mmap_mode='r')
+        else:
+            embeddings, norms, ids = self._embeddings[:0], self._norms[:0], self._ids[:0]
+
+        with self._lock:
+            self._embeddings, self._norms, self._ids = embeddings, norms, ids
+            self._snapshot_row_id = meta['last_row_id']
+            self.db_version = meta.get('db_version', -1)
+            self.snapshot_version = version
+            # Yeni sürümden sonraki kayıtlar veritabanından tekrar eklenir
+            self._delta = FaceIndex()
+        return True
+
+    def add(self, sicil_no, encoding, row_id=None):
+        self._delta.add(sicil_no, encoding, row_id)
+
+    def add_batch(self, sicil_nos, encodings, last_row_id=None):
+        self._delta.add_batch(sicil_nos, encodings, last_row_id)
+
+    def remove(self, sicil_no):
+        # Anlık görüntü değiştirilemez; sadece sonradan eklenenler çıkarılabilir
+        return self._delta.remove(sicil_no)
+
+    def search(self, encoding, tolerance=FACE_RECOGNITION_TOLERANCE):
+        """En yakın yüz: (sicil_no, mesafe); tolerans dışındaysa sicil_no None"""
+        query = np.asarray(encoding, dtype=np.float32).reshape(FACE_ENCODING_DIM)
+        with self._lock:
+            embeddings, norms, ids, delta = self._embeddings, self._norms, self._ids, self._delta
+
+        sicil_no, distance = delta.search(query, tolerance=np.inf)
+        if len(ids):
+            squared = norms - 2.0 * (embeddings @ query) + query @ query
+            best = int(np.argmin(squared))
+            snapshot_distance = float(np.sqrt(max(squared[best], 0.0)))
+            if distance is None or snapshot_distance < distance:
+                sicil_no, distance = str(ids[best]), snapshot_distance
+
+        if distance is None:
+            return None, None
+        if distance > tolerance:
+            return None, distance
+        return sicil_no, distance
+
+
+class SnapshotBuilder:
+    """Bir tablonun anlık görüntüsünü oluşturur; schedule() ardışık kayıtları tek yeniden oluşturmada birleştirir"""
+
+    def __init__(self, database, table, directory=None, delay=FACE_SNAPSHOT_DELAY):
+        self.database = database
+        self.table = table
+        self.directory = directory or snapshot_directory(table)
+        self.delay = delay
+        self._build_lock = threading.Lock()
+        self._timer_lock = threading.Lock()
+        self._timer = None
+        self._timer_pid = None
+
+    def build(self):
+        with self._build_lock:
+            version, count = build_snapshot(self.database, self.table, self.directory)
+        print(f"📸 Yüz anlık görüntüsü yayınlandı: {version} ({count} yüz)")
+        return version
+
+    def schedule(self):
+        """delay saniye sonra arka planda yeniden oluştur (zaten planlıysa bir şey yapma)"""
+        with self._timer_lock:
+            # Fork'tan önce master'da planlanan zamanlayıcı worker'da çalışmaz, worker kendisininkini kurar
+            if self._timer is not None and self._timer_pid == os.getpid():
+                return
+            self._timer = threading.Timer(self.delay, self._run)
+            self._timer.daemon = True
+            self._timer.start()
+            self._timer_pid = os.getpid()
+
+    def _run(self):
+        # Oluşturma sırasında gelen kayıtlar yeni bir oluşturma planlayabilsin
+        with self._timer_lock:
+            self._timer = None
+        try:
+            self.build()
+        except Exception as e:
+            print(f"⚠️ Yüz anlık görüntüsü oluşturulamadı: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['build'])
+    parser.add_argument('--database', default='ppe_inspections.db')
+    parser.add_argument('--table', default='users_db', choices=['users_db', 'users'])
+    parser.add_argument('--dir', default=FACE_SNAPSHOT_DIR or 'face_snapshot')
+    args = parser.parse_args()
+
+    SnapshotBuilder(args.database, args.table, snapshot_directory(args.table, args.dir)).build()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,78 @@
+"""
+Hızlı görüntü decode - JPEG'i DCT ölçekleme (draft) ile doğrudan çıkarım boyutuna yakın açar
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+EXIF_ORIENTATION_TAG = 0x0112
+
+# EXIF orientation -> PIL transpose (ImageOps.exif_transpose ile aynı eşleme)
+ORIENTATION_TRANSPOSE = {
+    2: Image.Transpose.FLIP_LEFT_RIGHT,
+    3: Image.Transpose.ROTATE_180,
+    4: Image.Transpose.FLIP_TOP_BOTTOM,
+    5: Image.Transpose.TRANSPOSE,
+    6: Image.Transpose.ROTATE_270,
+    7: Image.Transpose.TRANSVERSE,
+    8: Image.Transpose.ROTATE_90
+}
+
+# PIL format adı -> dosya uzantısı (listede olmayanlarda format adı küçük harfle)
+FORMAT_EXTENSIONS = {
+    'JPEG': 'jpg',
+    'PNG': 'png',
+    'WEBP': 'webp',
+    'GIF': 'gif',
+    'BMP': 'bmp',
+    'TIFF': 'tif'
+}
+
+# Image.reduce() ile doğrudan küçültülebilen modlar
+REDUCE_MODES = ('RGB', 'RGBA', 'L', 'LA')
+
+
+def decode_image(data, target_size=None):
+    """
+    Yüklenen baytları RGB numpy dizisine çevir, (görüntü, (orijinal_genişlik, orijinal_yükseklik)) döndür.
+
+    target_size verilirse uzun kenar target_size'ın altına düşmeyecek şekilde küçük decode edilir
+    (model zaten imgsz'e küçültür). Kalite kontrolü Detector'da sabit ölçekte yapılır
+    (QUALITY_REFERENCE_SIZE), iyileştirme kararı decode boyutuna bağlı değildir.
+    """
+    image = Image.open(io.BytesIO(data))
+    original_size = image.size
+    # Orientation sadece metadata'dan okunur, transpose küçültülmüş görüntüye uygulanır
+    orientation = image.getexif().get(EXIF_ORIENTATION_TAG, 1)
+
+    if target_size:
+        width, height = original_size
+        longest = max(width, height)
+        if longest > target_size:
+            if image.format == 'JPEG':
+                # libjpeg 1/2, 1/4, 1/8 ölçekle decode eder - tam boyut hiç belleğe açılmaz
+                image.draft('RGB', (width * target_size // longest, height * target_size // longest))
+            else:
+                factor = longest // target_size
+                if factor >= 2:
+                    # reduce() P, 1, I;16 gibi modları desteklemez (ValueError), önce RGB'ye çevrilir
+                    if image.mode not in REDUCE_MODES:
+                        image = image.convert('RGB')
+                    image = image.reduce(factor)
+
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+
+    transpose = ORIENTATION_TRANSPOSE.get(orientation)
+    if transpose is not None:
+        image = image.transpose(transpose)
+
+    # Sonraki adımlar görüntüyü yerinde değiştirmediği için ek kopya alınmaz
+    return np.asarray(image), original_size
+
+
+def upload_extension(data):
+    """Yüklenen dosyanın uzantısı (sadece başlık okunur) - dosya olduğu gibi saklanırken kullanılır"""
+    fmt = Image.open(io.BytesIO(data)).format or 'bin'
+    return FORMAT_EXTENSIONS.get(fmt, fmt.lower())
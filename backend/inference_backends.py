@@ -0,0 +1,150 @@
+"""
+CPU çıkarım backend'leri - dışa aktarılmış YOLO modelini ONNX Runtime veya OpenVINO ile çalıştırır
+"""
+import ast
+import os
+from collections import namedtuple
+
+import cv2
+import numpy as np
+
+# Tek görüntü için tespitler: xyxy (N,4) float32, conf (N,) float32, cls (N,) int64
+Detections = namedtuple('Detections', ['xyxy', 'conf', 'cls'])
+
+# 0 = runtime kendi seçsin
+INFERENCE_THREADS = int(os.environ.get('INFERENCE_THREADS', '0'))
+# ONNX Runtime graph optimizasyonu: disable / basic / extended / all
+ONNX_GRAPH_OPTIMIZATION = os.environ.get('ONNX_GRAPH_OPTIMIZATION', 'all').lower()
+# OpenVINO performans ipucu: LATENCY / THROUGHPUT
+OPENVINO_PERFORMANCE_HINT = os.environ.get('OPENVINO_PERFORMANCE_HINT', 'LATENCY').upper()
+
+# ultralytics NMS varsayılanı ile aynı
+NMS_IOU = 0.7
+LETTERBOX_COLOR = 114
+
+
+def empty_detections():
+    return Detections(np.zeros((0, 4), dtype=np.float32), np.zeros(0, dtype=np.float32), np.zeros(0, dtype=np.int64))
+
+
+def from_ultralytics(result):
+    """ultralytics Results nesnesini backend'den bağımsız Detections'a çevir"""
+    boxes = result.boxes
+    if boxes is None or len(boxes) == 0:
+        return empty_detections()
+    return Detections(boxes.xyxy.cpu().numpy().astype(np.float32),
+                      boxes.conf.cpu().numpy().astype(np.float32),
+                      boxes.cls.cpu().numpy().astype(np.int64))
+
+
+def letterbox(image, imgsz):
+    """En-boy oranını koruyarak imgsz x imgsz kareye sığdır, (görüntü, ölçek, (pad_x, pad_y)) döndür"""
+    height, width = image.shape[:2]
+    scale = min(imgsz / height, imgsz / width)
+    new_w, new_h = int(round(width * scale)), int(round(height * scale))
+    if (new_w, new_h) != (width, height):
+        image = cv2.resize(image, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+    pad_x, pad_y = (imgsz - new_w) / 2, (imgsz - new_h) / 2
+    top, bottom = int(round(pad_y - 0.1)), int(round(pad_y + 0.1))
+    left, right = int(round(pad_x - 0.1)), int(round(pad_x + 0.1))
+    image = cv2.copyMakeBorder(image, top, bottom, left, right, cv2.BORDER_CONSTANT,
+                               value=(LETTERBOX_COLOR,) * 3)
+    return image, scale, (left, top)
+
+
+def preprocess(images, imgsz):
+    """Görüntüleri (B,3,imgsz,imgsz) float32 tensöre çevir"""
+    batch = np.empty((len(images), 3, imgsz, imgsz), dtype=np.float32)
+    meta = []
+    for i, image in enumerate(images):
+        boxed, scale, pad = letterbox(image, imgsz)
+        # ultralytics numpy girişleri BGR kabul edip kanalları ters çevirir - torch backend ile aynı sonuç için
+        batch[i] = boxed[..., ::-1].transpose(2, 0, 1)
+        meta.append((scale, pad, image.shape[:2]))
+    batch /= 255.0
+    return batch, meta
+
+
+def postprocess(output, meta, conf, max_det, agnostic=True):
+    """(B, 4+nc, N) ham YOLO çıktısını görüntü başına Detections listesine çevir"""
+    detections = []
+    for prediction, (scale, (pad_x, pad_y), (height, width)) in zip(output, meta):
+        prediction = prediction.T  # (N, 4+nc)
+        scores = prediction[:, 4:]
+        cls = scores.argmax(axis=1)
+        confs = scores[np.arange(len(cls)), cls]
+        keep = confs >= conf
+        if not keep.any():
+            detections.append(empty_detections())
+            continue
+
+        boxes, confs, cls = prediction[keep, :4], confs[keep], cls[keep]
+        # NMS (cx,cy,w,h -> x,y,w,h) - kişi modunda kişi ve yelek kutuları birbirini bastırmasın diye sınıf bazlı
+        xywh = boxes.copy()
+        xywh[:, :2] -= xywh[:, 2:] / 2
+        if agnostic:
+            indices = cv2.dnn.NMSBoxes(xywh.tolist(), confs.tolist(), conf, NMS_IOU, top_k=max_det)
+        else:
+            indices = cv2.dnn.NMSBoxesBatched(xywh.tolist(), confs.tolist(), cls.tolist(), conf, NMS_IOU, top_k=max_det)
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)[:max_det]
+
+        xyxy = np.empty((len(indices), 4), dtype=np.float32)
+        xyxy[:, :2] = xywh[indices, :2]
+        xyxy[:, 2:] = xywh[indices, :2] + xywh[indices, 2:]
+        # Letterbox'ı geri al
+        xyxy[:, [0, 2]] = ((xyxy[:, [0, 2]] - pad_x) / scale).clip(0, width)
+        xyxy[:, [1, 3]] = ((xyxy[:, [1, 3]] - pad_y) / scale).clip(0, height)
+        detections.append(Detections(xyxy, confs[indices].astype(np.float32), cls[indices].astype(np.int64)))
+    return detections
+
+
+class OnnxRuntimeModel:
+    """Dışa aktarılmış ONNX modelini onnxruntime ile çalıştırır"""
+
+    GRAPH_OPTIMIZATION_LEVELS = {
+        'disable': 'ORT_DISABLE_ALL',
+        'basic': 'ORT_ENABLE_BASIC',
+        'extended': 'ORT_ENABLE_EXTENDED',
+        'all': 'ORT_ENABLE_ALL'
+    }
+
+    def __init__(self, path, threads=INFERENCE_THREADS, graph_optimization=ONNX_GRAPH_OPTIMIZATION):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+            options.inter_op_num_threads = 1
+        options.graph_optimization_level = getattr(
+            ort.GraphOptimizationLevel, self.GRAPH_OPTIMIZATION_LEVELS[graph_optimization])
+        self.session = ort.InferenceSession(path, sess_options=options, providers=['CPUExecutionProvider'])
+        self.input_name = self.session.get_inputs()[0].name
+        # ultralytics sınıf isimlerini metadata'ya dict string olarak yazar
+        self.names = ast.literal_eval(self.session.get_modelmeta().custom_metadata_map['names'])
+
+    def predict(self, images, imgsz, conf, max_det, agnostic=True):
+        batch, meta = preprocess(images, imgsz)
+        output = self.session.run(None, {self.input_name: batch})[0]
+        return postprocess(output, meta, conf, max_det, agnostic)
+
+
+class OpenVinoModel:
+    """Dışa aktarılmış OpenVINO IR modelini CPU üzerinde çalıştırır"""
+
+    def __init__(self, path, threads=INFERENCE_THREADS, performance_hint=OPENVINO_PERFORMANCE_HINT):
+        import openvino as ov
+        import yaml
+
+        core = ov.Core()
+        xml_path = next(os.path.join(path, f) for f in os.listdir(path) if f.endswith('.xml'))
+        config = {'PERFORMANCE_HINT': performance_hint}
+        if threads:
+            config['INFERENCE_NUM_THREADS'] = threads
+        self.compiled = core.compile_model(core.read_model(xml_path), 'CPU', config)
+        with open(os.path.join(path, 'metadata.yaml')) as f:
+            self.names = yaml.safe_load(f)['names']
+
+    def predict(self, images, imgsz, conf, max_det, agnostic=True):
+        batch, meta = preprocess(images, imgsz)
+        output = self.compiled(batch)[self.compiled.output(0)]
+        return postprocess(output, meta, conf, max_det, agnostic)
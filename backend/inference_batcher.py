@@ -0,0 +1,142 @@
+"""
+Mikro-batch çıkarım kuyruğu - eşzamanlı /validate_image isteklerini tek bir YOLO çağrısında toplar
+"""
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+from inference_profiles import resolve_profile
+
+# true ise istekler batch kuyruğundan geçer
+INFERENCE_BATCHING = os.environ.get('INFERENCE_BATCHING', 'false').lower() == 'true'
+# Tek forward pass'te en fazla kaç görüntü işlenecek
+INFERENCE_MAX_BATCH_SIZE = int(os.environ.get('INFERENCE_MAX_BATCH_SIZE', '8'))
+# İlk istekten sonra batch'i doldurmak için en fazla kaç ms beklenecek
+INFERENCE_MAX_WAIT_MS = float(os.environ.get('INFERENCE_MAX_WAIT_MS', '25'))
+# Bir isteğin sonucunu en fazla kaç saniye bekleyeceği
+INFERENCE_RESULT_TIMEOUT = float(os.environ.get('INFERENCE_RESULT_TIMEOUT', '60'))
+
+
+class InferenceBatcher:
+    """Kuyruktaki görüntüleri batch'ler halinde DetectorPool üzerinden çalıştırır"""
+
+    def __init__(self, pool, max_batch_size=INFERENCE_MAX_BATCH_SIZE, max_wait_ms=INFERENCE_MAX_WAIT_MS,
+                 workers=None):
+        self.pool = pool
+        self.max_batch_size = max(1, int(max_batch_size))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        # Havuzdaki her Detector için bir toplayıcı thread yeterli
+        self.workers = workers or pool.size
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._threads = []
+        self._batches = 0
+        self._images = 0
+        self._busy_seconds = 0.0
+        self._max_batch_seen = 0
+        self._started_at = None
+
+    def start(self):
+        with self._lock:
+            if self._threads:
+                return self
+            self._started_at = time.time()
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._run, name=f'inference-batcher-{i}', daemon=True)
+                thread.start()
+                self._threads.append(thread)
+        return self
+
+    def submit(self, image, profile=None, per_person=False):
+        """Görüntüyü kuyruğa ekle, sonucu taşıyan Future döndür"""
+        if not self._threads:
+            self.start()
+        future = Future()
+        self._queue.put((image, (resolve_profile(profile), per_person), future))
+        return future
+
+    def validate_ppe(self, image, profile=None, per_person=False, timeout=INFERENCE_RESULT_TIMEOUT):
+        """Detector.validate_ppe ile aynı imza - batch kuyruğu üzerinden"""
+        return self.submit(image, profile, per_person).result(timeout=timeout)
+
+    def _collect(self):
+        """İlk isteği bekle, sonra max_wait süresince batch'i doldur"""
+        batch = [self._queue.get()]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # İptal edilmiş istekleri atla
+            batch = [item for item in batch if item[2].set_running_or_notify_cancel()]
+            if not batch:
+                continue
+
+            # Farklı profiller farklı imgsz/TTA/NMS kullanır, her grup ayrı forward pass
+            groups = {}
+            for image, key, future in batch:
+                groups.setdefault(key, []).append((image, future))
+
+            start = time.perf_counter()
+            try:
+                with self.pool.borrow() as detector:
+                    for (profile, per_person), items in groups.items():
+                        results = detector.validate_ppe_batch([image for image, _ in items], profile, per_person)
+                        for (_, future), result in zip(items, results):
+                            future.set_result(result)
+            except Exception as e:
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            elapsed = time.perf_counter() - start
+
+            with self._lock:
+                self._batches += 1
+                self._images += len(batch)
+                self._busy_seconds += elapsed
+                self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            print(f"📦 Batch çıkarım: {len(batch)} görüntü, {elapsed:.2f}s")
+
+    def stats(self):
+        """Batch sayısı, ortalama batch boyutu ve images/sec"""
+        with self._lock:
+            return {
+                'max_batch_size': self.max_batch_size,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'workers': self.workers,
+                'queued': self._queue.qsize(),
+                'batches': self._batches,
+                'images': self._images,
+                'avg_batch_size': round(self._images / self._batches, 2) if self._batches else None,
+                'max_batch_seen': self._max_batch_seen,
+                'images_per_sec': round(self._images / self._busy_seconds, 2) if self._busy_seconds else None
+            }
+
+
+_batcher = None
+_batcher_lock = threading.Lock()
+
+
+def get_inference_batcher(pool):
+    """INFERENCE_BATCHING açıksa süreç genelinde tek InferenceBatcher, değilse None"""
+    global _batcher
+    if not INFERENCE_BATCHING:
+        return None
+    if _batcher is None:
+        with _batcher_lock:
+            if _batcher is None:
+                _batcher = InferenceBatcher(pool)
+    return _batcher
@@ -0,0 +1,52 @@
+"""
+Çıkarım profilleri - çözünürlük, TTA, confidence tabanı ve maksimum tespit sayısı
+"""
+import os
+
+INFERENCE_PROFILES = {
+    # CPU'da en hızlı: küçük çözünürlük, TTA yok, düşük güvenli kutular elenir
+    'fast': {
+        'imgsz': 640,
+        'augment': False,
+        'conf': 0.05,
+        'max_det': 50
+    },
+    # TTA'sız ama yelek için büyük çözünürlük korunur
+    'balanced': {
+        'imgsz': 832,
+        'augment': False,
+        'conf': 0.02,
+        'max_det': 100
+    },
+    # Eski sabit ayarlar (TTA + imgsz=832 + conf=0.005)
+    'accurate': {
+        'imgsz': 832,
+        'augment': True,
+        'conf': 0.005,
+        'max_det': 300
+    }
+}
+
+# Deployment genelinde varsayılan profil
+DEFAULT_INFERENCE_PROFILE = os.environ.get('INFERENCE_PROFILE', 'accurate')
+
+
+def resolve_profile(name=None):
+    """Profil adını doğrula, boşsa varsayılanı döndür"""
+    name = (name or DEFAULT_INFERENCE_PROFILE).lower()
+    if name not in INFERENCE_PROFILES:
+        raise ValueError(f"Geçersiz profil: {name} (seçenekler: {', '.join(INFERENCE_PROFILES)})")
+    return name
+
+
+# image: görüntüde herhangi bir kask/yelek var mı, person: her kişi ayrı ayrı değerlendirilir
+PPE_MODES = ('image', 'person')
+DEFAULT_PPE_MODE = os.environ.get('PPE_MODE', 'image')
+
+
+def resolve_mode(name=None):
+    """Değerlendirme modunu doğrula, boşsa varsayılanı döndür"""
+    name = (name or DEFAULT_PPE_MODE).lower()
+    if name not in PPE_MODES:
+        raise ValueError(f"Geçersiz mod: {name} (seçenekler: {', '.join(PPE_MODES)})")
+    return name
@@ -0,0 +1,296 @@
+"""
+Kontrol kayıtlarının akışlı yedeklenmesi ve geri yüklenmesi - /api/backup ve /api/restore
+
+Yedek, tek bir okuma işleminin anlık görüntüsünden satır satır üretilir; tablo belleğe alınmaz,
+istemciye parça parça gönderilir. Biçimler:
+    json    -> {"export_date", "total_records", "data": [...]} (eski yedeklerle aynı yapı)
+    ndjson  -> her satırda bir kayıt
+    csv     -> başlık satırı + kayıtlar
+    parquet -> sütunlu, satır grupları halinde (pyarrow kuruluysa)
+?gzip=true ile çıktı gzip'lenir.
+
+Geri yükleme aynı biçimleri (gzip'li olanlar dahil) okur ve kayıtları tek işlemde, RESTORE_BATCH_SIZE'lık
+executemany'lerle yazar. mode=append kayıtları yeni id'lerle ekler, mode=replace tüm kayıtları silip
+yedekteki id'lerle yazar. Hatalı kayıtta hiçbir şey yazılmaz.
+"""
+import csv
+import gzip
+import importlib.util
+import io
+import json
+import zlib
+
+import db
+import inspection_stats
+from json_stream import StreamFormatError, iter_json_array, iter_ndjson
+
+# (mimetype, dosya uzantısı)
+BACKUP_FORMATS = {
+    'json': ('application/json', 'json'),
+    'ndjson': ('application/x-ndjson', 'ndjson'),
+    'csv': ('text/csv', 'csv'),
+    'parquet': ('application/vnd.apache.parquet', 'parquet')
+}
+RESTORE_MODES = ('append', 'replace')
+
+# Veritabanından bir seferde okunan / yazılan satır (parquet'te satır grubu boyutu)
+BACKUP_BATCH_SIZE = 5000
+RESTORE_BATCH_SIZE = 5000
+# Metin çıktısı en az bu boyutta parçalar halinde gönderilir
+BACKUP_CHUNK_BYTES = 64 * 1024
+
+INTEGER_COLUMNS = ('id', 'kask', 'yelek', 'gozluk', 'uygunluk')
+REQUIRED_COLUMNS = ('timestamp', 'kask', 'yelek', 'uygunluk')
+
+PYARROW_AVAILABLE = importlib.util.find_spec('pyarrow') is not None
+
+
+def parse_format(value, default='json'):
+    """?format= değeri; boşsa varsayılan, parquet için pyarrow gerekir"""
+    fmt = (value or default).lower()
+    if fmt not in BACKUP_FORMATS:
+        raise ValueError(f"Geçersiz format: {value} (seçenekler: {', '.join(BACKUP_FORMATS)})")
+    if fmt == 'parquet' and not PYARROW_AVAILABLE:
+        raise ValueError("Parquet için pyarrow kurulu olmalı (pip install pyarrow)")
+    return fmt
+
+
+def format_from_content_type(content_type):
+    """Geri yüklemede ?format= verilmediyse Content-Type'tan tahmin"""
+    content_type = (content_type or '').lower()
+    for fmt in ('ndjson', 'csv', 'parquet'):
+        if fmt in content_type:
+            return fmt
+    return 'json'
+
+
+def backup_filename(fmt, timestamp, compress=False):
+    return f"ppe_backup_{timestamp}.{BACKUP_FORMATS[fmt][1]}" + ('.gz' if compress else '')
+
+
+# --- Yedekleme ---
+
+def _buffered(pieces):
+    """Küçük metin parçalarını BACKUP_CHUNK_BYTES'lık UTF-8 parçalara birleştir"""
+    buffer = []
+    size = 0
+    for piece in pieces:
+        buffer.append(piece)
+        size += len(piece)
+        if size >= BACKUP_CHUNK_BYTES:
+            yield ''.join(buffer).encode('utf-8')
+            buffer = []
+            size = 0
+    if buffer:
+        yield ''.join(buffer).encode('utf-8')
+
+
+def _json_pieces(columns, batches, total, export_date):
+    yield json.dumps({'export_date': export_date, 'total_records': total}, ensure_ascii=False)[:-1]
+    yield ', "data": ['
+    separator = '\n'
+    for rows in batches:
+        for row in rows:
+            yield separator + json.dumps(dict(zip(columns, row)), ensure_ascii=False)
+            separator = ',\n'
+    yield '\n]}\n'
+
+
+def _ndjson_pieces(columns, batches, total, export_date):
+    for rows in batches:
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + '\n'
+
+
+def _csv_pieces(columns, batches, total, export_date):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for rows in batches:
+        writer.writerows(rows)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue()
+
+
+class _ByteSink:
+    """pyarrow'un yazdığı baytları toplayan, akışa aktarılabilen dosya nesnesi"""
+
+    def __init__(self):
+        self._parts = []
+        self._position = 0
+        self.closed = False
+
+    def write(self, data):
+        data = bytes(data)
+        self._parts.append(data)
+        self._position += len(data)
+        return len(data)
+
+    def tell(self):
+        return self._position
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def drain(self):
+        data = b''.join(self._parts)
+        self._parts = []
+        return data
+
+
+def _parquet_chunks(columns, batches):
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = pa.schema([(column, pa.int64() if column in INTEGER_COLUMNS else pa.string()) for column in columns])
+    sink = _ByteSink()
+    writer = pq.ParquetWriter(sink, schema)
+    try:
+        for rows in batches:
+            table = pa.Table.from_arrays([pa.array(values, type=field.type)
+                                          for values, field in zip(zip(*rows), schema)], schema=schema)
+            writer.write_table(table)
+            data = sink.drain()
+            if data:
+                yield data
+    finally:
+        writer.close()
+    yield sink.drain()
+
+
+TEXT_WRITERS = {
+    'json': _json_pieces,
+    'ndjson': _ndjson_pieces,
+    'csv': _csv_pieces
+}
+
+
+def _gzip(chunks):
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        data = compressor.compress(chunk)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def export(database, fmt, export_date, compress=False):
+    """
+    Yedek parçalarını üreten generator (Flask Response gövdesi). Bağlantı yanıt bitene ya da istemci
+    kopana kadar havuzdan ödünç alınır; tek okuma işlemi sayesinde sayım ve satırlar aynı anlık görüntüden.
+    """
+    with db.connection(database) as conn:
+        # WAL: okuma işlemi süresince yazmalar devam eder, yedek açıldığı anın görüntüsünü görür
+        conn.execute('BEGIN')
+        total = inspection_stats.summary(conn)['total']
+        batches = db.iter_inspections(conn, BACKUP_BATCH_SIZE)
+        if fmt == 'parquet':
+            chunks = _parquet_chunks(db.INSPECTION_COLUMNS, batches)
+        else:
+            chunks = _buffered(TEXT_WRITERS[fmt](db.INSPECTION_COLUMNS, batches, total, export_date))
+        yield from (_gzip(chunks) if compress else chunks)
+
+
+# --- Geri yükleme ---
+
+def open_upload(fileobj):
+    """Yüklenen dosya gzip'liyse açılmış halini döndür (ilk iki bayta bakılır)"""
+    magic = fileobj.read(2)
+    fileobj.seek(0)
+    if magic == b'\x1f\x8b':
+        return gzip.GzipFile(fileobj=fileobj, mode='rb')
+    return fileobj
+
+
+def _json_records(fileobj, fmt):
+    if fmt == 'ndjson':
+        records = iter_ndjson(fileobj)
+    else:
+        # Kendi yedeğimiz {"data": [...]} içinde, düz dizi de kabul edilir
+        records = iter_json_array(fileobj, envelope_key='data')
+    for record, error in records:
+        if error is not None:
+            raise StreamFormatError(error)
+        yield record
+
+
+def _csv_records(fileobj):
+    reader = csv.DictReader(io.TextIOWrapper(fileobj, encoding='utf-8', newline=''))
+    for record in reader:
+        # CSV'de boş hücre NULL demek (yedekte None boş yazılır)
+        yield {key: (value if value != '' else None) for key, value in record.items()}
+
+
+def _parquet_records(fileobj):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(fileobj).iter_batches(batch_size=RESTORE_BATCH_SIZE):
+        yield from batch.to_pylist()
+
+
+def _record_values(index, record, keep_ids):
+    """Kayıt -> restore_inspections satırı; hatalıysa ValueError"""
+    if not isinstance(record, dict):
+        raise ValueError(f"{index}. kayıt bir nesne olmalı")
+    columns = db.INSPECTION_COLUMNS if keep_ids else db.INSPECTION_COLUMNS[1:]
+    values = []
+    for column in columns:
+        value = record.get(column)
+        if value is None:
+            if column in REQUIRED_COLUMNS or (column == 'id' and keep_ids):
+                raise ValueError(f"{index}. kayıt: eksik alan {column}")
+            if column == 'gozluk':
+                value = 0
+        elif column in INTEGER_COLUMNS:
+            try:
+                value = int(value)
+            except (TypeError, ValueError):
+                raise ValueError(f"{index}. kayıt: geçersiz {column}: {value}")
+        else:
+            value = str(value)
+        values.append(value)
+    return values
+
+
+def restore(conn, fileobj, fmt, mode='append'):
+    """
+    Açık bir yazma işleminde yedeği yükle, yazılan kayıt sayısını döndür.
+    Hatalı kayıtta ValueError (çağıranın ROLLBACK'i o ana kadar yazılanları da geri alır).
+    """
+    if mode not in RESTORE_MODES:
+        raise ValueError(f"Geçersiz mode: {mode} (seçenekler: {', '.join(RESTORE_MODES)})")
+    if fmt == 'csv':
+        records = _csv_records(fileobj)
+    elif fmt == 'parquet':
+        records = _parquet_records(fileobj)
+    else:
+        records = _json_records(fileobj, fmt)
+
+    keep_ids = mode == 'replace'
+    if keep_ids:
+        inspection_stats.delete_all(conn)
+
+    count = 0
+    batch = []
+    with inspection_stats.bulk_insert(conn):
+        for index, record in enumerate(records):
+            batch.append(_record_values(index, record, keep_ids))
+            if len(batch) >= RESTORE_BATCH_SIZE:
+                db.restore_inspections(conn, batch, keep_ids)
+                count += len(batch)
+                batch = []
+        if batch:
+            db.restore_inspections(conn, batch, keep_ids)
+            count += len(batch)
+    return count
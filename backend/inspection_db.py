@@ -0,0 +1,256 @@
+#!/usr/bin/env python3
+"""
+Kontrol kayıtları şeması ve sorguları - çalışana bağlı kayıtlar ve keyset sayfalama
+
+inspections.sicil_no kontrolü yapılan çalışanı tutar (users_db / users tablolarındaki sicil_no).
+Sayfalama OFFSET yerine son görülen (timestamp, id) ikilisiyle yapılır: her sayfa indeksten
+doğrudan okunur, milyonlarca kayıtta da sayfa süresi sabit kalır.
+
+Liste parametreleri: ?before=<timestamp,id>&limit=&uygunluk=0|1&from=&to=&missing=kask|yelek
+
+Eski /api/veri-al kayıtlarını (isim dosya adında) çalışanlara bağlamak için:
+    python inspection_db.py migrate --database ppe_inspections.db
+"""
+import argparse
+import os
+import re
+import sqlite3
+from datetime import date, datetime, timedelta
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# (ad, tanım) - init_db her açılışta IF NOT EXISTS ile oluşturur
+INSPECTION_INDEXES = (
+    # Çalışan geçmişi: WHERE sicil_no = ? ORDER BY timestamp DESC, id DESC
+    ('idx_inspections_sicil_no_timestamp', 'inspections (sicil_no, timestamp)'),
+    # Liste/dashboard: ORDER BY timestamp DESC, id DESC ve tarih aralığı (id = rowid, indekste zaten var)
+    ('idx_inspections_timestamp', 'inspections (timestamp)'),
+    ('idx_inspections_uygunluk_timestamp', 'inspections (uygunluk, timestamp)'),
+    # Eksik ekipman filtresi - kısmi indeksler sadece eksik olan satırları tutar
+    ('idx_inspections_missing_kask', 'inspections (timestamp) WHERE kask = 0'),
+    ('idx_inspections_missing_yelek', 'inspections (timestamp) WHERE yelek = 0'),
+)
+
+# ?missing= değeri -> koşul; kısmi indeksin kullanılması için sabit olarak yazılır
+MISSING_ITEM_CONDITIONS = {
+    'kask': 'kask = 0',
+    'yelek': 'yelek = 0'
+}
+
+
+def index_names(conn):
+    return {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'index'")}
+
+
+def ensure_schema(conn):
+    """
+    init_db'den çağrılır: sicil_no sütunu ve indeksler yoksa ekler.
+    İndeks ilk kez oluşturulurken eski dış sistem kayıtları da çalışanlara bağlanır.
+    """
+    columns = {row[1] for row in conn.execute('PRAGMA table_info(inspections)')}
+    if 'sicil_no' not in columns:
+        conn.execute('ALTER TABLE inspections ADD COLUMN sicil_no TEXT')
+        print("✅ Kontrol kayıtlarına sicil_no sütunu eklendi")
+
+    existing = index_names(conn)
+    first_run = INSPECTION_INDEXES[0][0] not in existing
+    for name, definition in INSPECTION_INDEXES:
+        if name not in existing:
+            conn.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {definition}')
+            print(f"✅ İndeks oluşturuldu: {name}")
+    if first_run:
+        linked = backfill_sicil_no(conn)
+        if linked:
+            print(f"🔗 {linked} dış sistem kaydı çalışanlara bağlandı")
+    conn.commit()
+
+
+def backfill_sicil_no(conn):
+    """
+    /api/veri-al eskiden çalışanı sadece dosya adına yazıyordu (external_<isim>_<soyisim>.jpg);
+    bu kayıtları users_db'deki ad-soyad eşleşmesiyle sicil_no'ya bağla
+    """
+    tables = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+    if 'users_db' not in tables:
+        return 0
+    cursor = conn.execute('''
+        UPDATE inspections
+        SET sicil_no = (
+            SELECT u.sicil_no FROM users_db u
+            WHERE 'external_' || u.name || '_' || u.surname || '.jpg' = inspections.image_filename
+            ORDER BY u.id LIMIT 1
+        )
+        WHERE sicil_no IS NULL AND image_filename LIKE 'external\\_%' ESCAPE '\\'
+          AND image_filename IN (SELECT 'external_' || name || '_' || surname || '.jpg' FROM users_db)
+    ''')
+    return cursor.rowcount
+
+
+def page_limit(value, default=DEFAULT_PAGE_SIZE):
+    """?limit= değeri; boşsa varsayılan, üst sınır MAX_PAGE_SIZE"""
+    if value in (None, ''):
+        return default
+    try:
+        limit = int(value)
+    except ValueError:
+        raise ValueError(f"Geçersiz limit: {value}")
+    if limit < 1:
+        raise ValueError(f"Geçersiz limit: {value}")
+    return min(limit, MAX_PAGE_SIZE)
+
+
+def encode_cursor(timestamp, row_id):
+    return f'{timestamp},{row_id}'
+
+
+def decode_cursor(value):
+    """'<timestamp>,<id>' -> (timestamp, id); boşsa None"""
+    if not value:
+        return None
+    timestamp, _, row_id = value.rpartition(',')
+    if not timestamp:
+        raise ValueError(f"Geçersiz cursor: {value}")
+    try:
+        row_id = int(row_id)
+    except ValueError:
+        raise ValueError(f"Geçersiz cursor: {value}")
+    # Kodlanmadan gönderilen '+03:00' sorgu dizesinde boşluğa dönüşür
+    return timestamp.replace(' ', '+'), row_id
+
+
+def inspection_to_dict(row):
+    return {
+        'id': row[0],
+        'timestamp': row[1],
+        'kask': row[2],
+        'yelek': row[3],
+        'gozluk': row[4],
+        'uygunluk': row[5],
+        'image_filename': row[6],
+        'sicil_no': row[7]
+    }
+
+
+def fetch_page(conn, where, params, before, limit):
+    """
+    Yeniden eskiye bir sayfa: {'inspections': [...], 'next_cursor': ...}.
+    Bir fazla satır okunur; varsa sonraki sayfanın cursor'ı son döndürülen satırdır.
+    """
+    where = list(where)
+    params = list(params)
+    if before is not None:
+        where.append('(timestamp, id) < (?, ?)')
+        params.extend(before)
+    sql = ('SELECT id, timestamp, kask, yelek, gozluk, uygunluk, image_filename, sicil_no FROM inspections'
+           + (f' WHERE {" AND ".join(where)}' if where else '')
+           + ' ORDER BY timestamp DESC, id DESC LIMIT ?')
+    rows = conn.execute(sql, params + [limit + 1]).fetchall()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1][1], rows[-1][0])
+    return {
+        'inspections': [inspection_to_dict(row) for row in rows],
+        'next_cursor': next_cursor
+    }
+
+
+def date_bound_step(value):
+    """ISO zamanın verildiği hassasiyet (saat, dakika, saniye, kesir) - to bu aralığın tamamını kapsar"""
+    clock = re.split(r'[+Z-]', value[11:], maxsplit=1)[0]
+    if '.' in clock or ',' in clock:
+        return timedelta(microseconds=1)
+    return (timedelta(hours=1), timedelta(minutes=1), timedelta(seconds=1))[min(clock.count(':'), 2)]
+
+
+def parse_date_bound(value, end=False):
+    """
+    ?from=/?to= değeri (YYYY-MM-DD veya ISO zaman) -> karşılaştırılacak yerel zaman metni.
+    Kayıtlar yerel saatle ve farklı biçimlerde (mikrosaniye, '+03:00') tutulduğundan saat dilimi atılır;
+    to için verilen hassasiyetin sonrası döner (timestamp < ?): to=...T10:00 10:00 dakikasının tamamını,
+    sadece tarih verilen to o günün tamamını kapsar.
+    """
+    if 'T' in value:
+        # Kodlanmadan gönderilen '+03:00' sorgu dizesinde boşluğa dönüşür
+        value = value.replace(' ', '+')
+    try:
+        if len(value) == 10:
+            day = date.fromisoformat(value)
+            return (day + timedelta(days=1)).isoformat() if end else day.isoformat()
+        moment = datetime.fromisoformat(value).replace(tzinfo=None)
+    except ValueError:
+        raise ValueError(f"Geçersiz tarih: {value}")
+    if end:
+        moment += date_bound_step(value)
+    return moment.isoformat()
+
+
+def parse_filters(args):
+    """
+    Sorgu parametreleri -> (koşullar, parametreler):
+    ?uygunluk=0|1, ?from=, ?to= (YYYY-MM-DD veya ISO zaman), ?missing=kask|yelek
+    """
+    where = []
+    params = []
+
+    uygunluk = args.get('uygunluk')
+    if uygunluk not in (None, ''):
+        if uygunluk not in ('0', '1'):
+            raise ValueError(f"Geçersiz uygunluk: {uygunluk} (0 veya 1)")
+        where.append('uygunluk = ?')
+        params.append(int(uygunluk))
+
+    start = args.get('from')
+    if start:
+        where.append('timestamp >= ?')
+        params.append(parse_date_bound(start))
+    end = args.get('to')
+    if end:
+        # Verilen günün/dakikanın/saniyenin sonrasına kadar (hariç)
+        where.append('timestamp < ?')
+        params.append(parse_date_bound(end, end=True))
+
+    missing = args.get('missing')
+    if missing:
+        if missing not in MISSING_ITEM_CONDITIONS:
+            raise ValueError(f"Geçersiz eksik ekipman: {missing} (seçenekler: {', '.join(MISSING_ITEM_CONDITIONS)})")
+        where.append(MISSING_ITEM_CONDITIONS[missing])
+
+    return where, params
+
+
+def parse_query(args, default_limit=DEFAULT_PAGE_SIZE):
+    """/api/inspections parametreleri -> fetch_page argümanları (koşullar, parametreler, before, limit)"""
+    where, params = parse_filters(args)
+    return where, params, decode_cursor(args.get('before')), page_limit(args.get('limit'), default_limit)
+
+
+def user_inspections(conn, sicil_no, before=None, limit=DEFAULT_PAGE_SIZE):
+    """Bir çalışanın kontrol geçmişi - idx_inspections_sicil_no_timestamp üzerinden"""
+    return fetch_page(conn, ['sicil_no = ?'], [sicil_no], before, limit)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('--database', default='ppe_inspections.db')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        raise SystemExit(f"❌ Veritabanı bulunamadı: {args.database}")
+    conn = sqlite3.connect(args.database)
+    ensure_schema(conn)
+    linked = backfill_sicil_no(conn)
+    conn.commit()
+    unlinked = conn.execute('SELECT COUNT(*) FROM inspections WHERE sicil_no IS NULL').fetchone()[0]
+    conn.close()
+    print("=" * 50)
+    print(f"🔗 Çalışana bağlanan kayıt: {linked}")
+    print(f"❔ Çalışanı bilinmeyen kayıt: {unlinked}")
+    print("=" * 50)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,225 @@
+"""
+Grup commit'li kontrol kaydı yazıcısı - /validate_image, /api/check_in ve /api/veri-al kayıtları kuyruğa
+alınır, tek yazıcı thread bunları N kayıtta ya da T milisaniyede bir tek işlemde commit eder.
+
+Her commit'te WAL'a inspections, indeksler ve istatistik tablolarının değişen sayfaları yazılır;
+64 kaydı tek commit'te yazmak bu sayfaları bir kez yazar (SD kartta yazma miktarı ve süresi düşer).
+
+Dayanıklılık kayıt başınadır:
+- durable=False (varsayılan): kayıt kuyruğa alınır, istek hemen döner (en fazla T ms sonra diskte).
+  Süreç çökerse kuyruktaki kayıtlar kaybolur.
+- durable=True: istek, kaydın bulunduğu grup synchronous=FULL ile commit edilene kadar bekler;
+  dönüşte kayıt fsync edilmiştir. Grup beklenmeden yazılır; önceki commit sürerken gelen kayıtlar
+  aynı fsync'i paylaşır.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import db
+
+# Tek commit'te en fazla kaç kayıt
+INSPECTION_RECORDER_MAX_BATCH = int(os.environ.get('INSPECTION_RECORDER_MAX_BATCH', '64'))
+# İlk kayıttan sonra grubu doldurmak için en fazla kaç ms beklenecek (0 = beklemeden yaz)
+INSPECTION_RECORDER_MAX_WAIT_MS = float(os.environ.get('INSPECTION_RECORDER_MAX_WAIT_MS', '50'))
+# Kuyrukta bekleyebilecek en fazla kayıt; doluysa istek yer açılana kadar bekler
+INSPECTION_RECORDER_QUEUE_SIZE = int(os.environ.get('INSPECTION_RECORDER_QUEUE_SIZE', '4096'))
+# ?durable= verilmeyen istekler için varsayılan
+INSPECTION_RECORDER_DURABLE = os.environ.get('INSPECTION_RECORDER_DURABLE', 'false').lower() == 'true'
+# durable kaydın commit'ini en fazla kaç saniye bekleyeceği
+INSPECTION_RECORDER_TIMEOUT = float(os.environ.get('INSPECTION_RECORDER_TIMEOUT', '10'))
+
+_STOP = object()
+
+
+def parse_durable(value):
+    """?durable= değeri; boşsa INSPECTION_RECORDER_DURABLE"""
+    if value in (None, ''):
+        return INSPECTION_RECORDER_DURABLE
+    value = value.lower()
+    if value in ('1', 'true', 'yes'):
+        return True
+    if value in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Geçersiz durable: {value} (true veya false)")
+
+
+class InspectionRecorder:
+    """Sınırlı kuyruk + tek yazıcı thread ile kontrol kayıtlarını gruplar halinde commit eder"""
+
+    def __init__(self, database, max_batch=INSPECTION_RECORDER_MAX_BATCH,
+                 max_wait_ms=INSPECTION_RECORDER_MAX_WAIT_MS, max_queue=INSPECTION_RECORDER_QUEUE_SIZE):
+        self.database = database
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._closed = False
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._batches = 0
+        self._rows = 0
+        self._durable_commits = 0
+        self._failed = 0
+        self._max_batch_seen = 0
+        self._commit_seconds = 0.0
+        # Uygulama kapanırken kuyruktaki tüm kayıtlar yazılır
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Thread ilk kayıtta başlar; gunicorn --preload ile fork edilen worker kendi thread'ini açar
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._thread = threading.Thread(target=self._run, name='inspection-recorder', daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, timestamp, kask, yelek, uygunluk, image_filename, sicil_no=None, durable=False):
+        """Kaydı kuyruğa ekle; commit sonrası kaydın id'sini taşıyan Future döndür"""
+        if self._closed:
+            raise RuntimeError("Kontrol kaydı yazıcısı kapatıldı")
+        self._ensure_started()
+        future = Future()
+        self._queue.put(((timestamp, kask, yelek, uygunluk, image_filename, sicil_no), durable, future))
+        return future
+
+    def record(self, timestamp, kask, yelek, uygunluk, image_filename, sicil_no=None, durable=None):
+        """
+        db.insert_inspection ile aynı alanlar. durable ise commit'i bekler ve id döndürür,
+        değilse kuyruğa alıp None döndürür (durable=None -> INSPECTION_RECORDER_DURABLE)
+        """
+        if durable is None:
+            durable = INSPECTION_RECORDER_DURABLE
+        future = self.submit(timestamp, kask, yelek, uygunluk, image_filename, sicil_no, durable)
+        if durable:
+            return future.result(timeout=INSPECTION_RECORDER_TIMEOUT)
+        return None
+
+    def _collect(self):
+        """
+        İlk kaydı bekle, sonra max_wait süresince grubu doldur. Grupta commit'i bekleyen (durable)
+        kayıt varsa beklenmez, sadece kuyrukta biriken kayıtlar alınır; önceki fsync sürerken
+        gelen durable istekler böylece tek commit'i paylaşır.
+        """
+        batch = [self._queue.get()]
+        if batch[0] is _STOP:
+            return batch
+        durable = batch[0][1]
+        deadline = time.perf_counter() + self.max_wait
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.perf_counter()
+            try:
+                if durable or remaining <= 0:
+                    item = self._queue.get_nowait()
+                else:
+                    item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            batch.append(item)
+            if item is _STOP:
+                break
+            durable = durable or item[1]
+        return batch
+
+    def _commit(self, conn, rows, durable):
+        """Kayıtları tek işlemde yaz; durable ise bu commit synchronous=FULL ile fsync edilir"""
+        if durable:
+            conn.execute('PRAGMA synchronous = FULL')
+        try:
+            conn.execute('BEGIN IMMEDIATE')
+            try:
+                ids = [db.insert_inspection(conn, *row) for row in rows]
+                conn.commit()
+            except BaseException:
+                conn.rollback()
+                raise
+        finally:
+            if durable:
+                conn.execute(f'PRAGMA synchronous = {db.DB_SYNCHRONOUS}')
+        return ids
+
+    def _write(self, conn, batch):
+        rows = [row for row, _, _ in batch]
+        durable = any(item_durable for _, item_durable, _ in batch)
+        start = time.perf_counter()
+        try:
+            ids = self._commit(conn, rows, durable)
+        except Exception as e:
+            # Hatalı tek kayıt tüm grubu düşürmesin - kayıtlar tek tek yeniden denenir
+            print(f"⚠️ Grup commit başarısız ({len(batch)} kayıt), tek tek yazılıyor: {e}")
+            for row, item_durable, future in batch:
+                try:
+                    future.set_result(self._commit(conn, [row], item_durable)[0])
+                except Exception as row_error:
+                    with self._lock:
+                        self._failed += 1
+                    print(f"❌ Kontrol kaydı yazılamadı ({row[4]}): {row_error}")
+                    future.set_exception(row_error)
+            return
+        elapsed = time.perf_counter() - start
+
+        for (_, _, future), row_id in zip(batch, ids):
+            future.set_result(row_id)
+        with self._lock:
+            self._batches += 1
+            self._rows += len(batch)
+            self._durable_commits += int(durable)
+            self._max_batch_seen = max(self._max_batch_seen, len(batch))
+            self._commit_seconds += elapsed
+
+    def _run(self):
+        # Tek yazıcı: havuzdan değil, thread'e ait bağlantıdan yazılır
+        conn = db.open_connection(self.database)
+        try:
+            while True:
+                batch = self._collect()
+                stop = batch[-1] is _STOP
+                items = batch[:-1] if stop else batch
+                try:
+                    if items:
+                        self._write(conn, items)
+                finally:
+                    for _ in batch:
+                        self._queue.task_done()
+                if stop:
+                    return
+        finally:
+            conn.close()
+
+    def flush(self):
+        """Kuyruktaki tüm kayıtlar commit edilene kadar bekle"""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Yeni kayıt kabul etme, kuyruğu boşalt ve thread'i durdur"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._pid == os.getpid():
+            self._queue.put(_STOP)
+            self._thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'max_batch': self.max_batch,
+                'max_wait_ms': self.max_wait * 1000.0,
+                'durable_default': INSPECTION_RECORDER_DURABLE,
+                'queued': self._queue.qsize() if self._pid == os.getpid() else 0,
+                'queue_capacity': self.max_queue,
+                'batches': self._batches,
+                'rows': self._rows,
+                'durable_commits': self._durable_commits,
+                'failed': self._failed,
+                'avg_batch_size': round(self._rows / self._batches, 2) if self._batches else None,
+                'max_batch_seen': self._max_batch_seen,
+                'avg_commit_ms': round(self._commit_seconds / self._batches * 1000, 2) if self._batches else None
+            }
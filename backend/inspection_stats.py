@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+Kontrol istatistikleri - tetikleyicilerle güncel tutulan özet ve saatlik/günlük toplam tabloları
+
+inspection_stats         -> tek satır: toplam, uygun, kask, yelek
+inspection_stats_daily   -> gün başına (timestamp'in ilk 10 karakteri, YYYY-MM-DD)
+inspection_stats_hourly  -> saat başına (ilk 13 karakter, YYYY-MM-DDTHH)
+
+Sayaçlar inspections'a yapılan her INSERT/UPDATE/DELETE ile aynı işlemde değişir; hangi uygulama
+ya da araç yazarsa yazsın tutarlıdır. /api/stats ve grafikler tablo boyutundan bağımsız olarak
+tek satır / gün sayısı kadar satır okur.
+
+Tutarsızlık şüphesinde sayaçları kayıtlardan yeniden hesaplamak için:
+    python inspection_stats.py rebuild --database ppe_inspections.db
+"""
+import argparse
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+STATS_TABLES = ('''
+    CREATE TABLE IF NOT EXISTS inspection_stats (
+        id INTEGER PRIMARY KEY CHECK (id = 1),
+        total INTEGER NOT NULL DEFAULT 0,
+        compliant INTEGER NOT NULL DEFAULT 0,
+        kask INTEGER NOT NULL DEFAULT 0,
+        yelek INTEGER NOT NULL DEFAULT 0
+    )
+''', '''
+    CREATE TABLE IF NOT EXISTS inspection_stats_daily (
+        day TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        compliant INTEGER NOT NULL DEFAULT 0,
+        kask INTEGER NOT NULL DEFAULT 0,
+        yelek INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+''', '''
+    CREATE TABLE IF NOT EXISTS inspection_stats_hourly (
+        hour TEXT PRIMARY KEY,
+        total INTEGER NOT NULL DEFAULT 0,
+        compliant INTEGER NOT NULL DEFAULT 0,
+        kask INTEGER NOT NULL DEFAULT 0,
+        yelek INTEGER NOT NULL DEFAULT 0
+    ) WITHOUT ROWID
+''')
+
+# /api/stats/daily tek istekte en fazla bu kadar gün döndürür
+MAX_DAYS = 366
+
+# (tablo, anahtar sütunu, timestamp'ten alınan karakter sayısı)
+ROLLUPS = (
+    ('inspection_stats_daily', 'day', 10),
+    ('inspection_stats_hourly', 'hour', 13),
+)
+
+
+def _apply(row, sign):
+    """NEW/OLD satırını tüm sayaçlara ekleyen (sign=+1) ya da çıkaran (sign=-1) SQL"""
+    op = '+' if sign > 0 else '-'
+    values = f'{sign}, {sign} * ({row}.uygunluk != 0), {sign} * ({row}.kask != 0), {sign} * ({row}.yelek != 0)'
+    statements = [f'''
+        UPDATE inspection_stats SET
+            total = total {op} 1,
+            compliant = compliant {op} ({row}.uygunluk != 0),
+            kask = kask {op} ({row}.kask != 0),
+            yelek = yelek {op} ({row}.yelek != 0)
+        WHERE id = 1;''']
+    for table, key, length in ROLLUPS:
+        statements.append(f'''
+        INSERT INTO {table} ({key}, total, compliant, kask, yelek)
+        VALUES (substr({row}.timestamp, 1, {length}), {values})
+        ON CONFLICT ({key}) DO UPDATE SET
+            total = total + excluded.total,
+            compliant = compliant + excluded.compliant,
+            kask = kask + excluded.kask,
+            yelek = yelek + excluded.yelek;''')
+    return ''.join(statements)
+
+
+STATS_TRIGGERS = (f'''
+    CREATE TRIGGER IF NOT EXISTS inspection_stats_insert AFTER INSERT ON inspections
+    BEGIN{_apply('NEW', 1)}
+    END
+''', f'''
+    CREATE TRIGGER IF NOT EXISTS inspection_stats_delete AFTER DELETE ON inspections
+    BEGIN{_apply('OLD', -1)}
+    END
+''', f'''
+    CREATE TRIGGER IF NOT EXISTS inspection_stats_update
+    AFTER UPDATE OF timestamp, kask, yelek, uygunluk ON inspections
+    BEGIN{_apply('OLD', -1)}{_apply('NEW', 1)}
+    END
+''')
+
+
+def ensure_schema(conn):
+    """
+    init_db'den çağrılır: tablolar ve tetikleyiciler yoksa oluşturur, mevcut kayıtlardan doldurur.
+    Oluşturma ve doldurma tek yazma işleminde - arada başka süreçten gelen kayıt kaçmaz.
+    """
+    exists = conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'trigger' "
+                          "AND name = 'inspection_stats_insert'").fetchone()
+    if exists:
+        return
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        for statement in STATS_TABLES + STATS_TRIGGERS:
+            conn.execute(statement)
+        _recompute(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    print("✅ İstatistik tabloları hazır")
+
+
+def _recompute(conn):
+    conn.execute('DELETE FROM inspection_stats')
+    conn.execute('''
+        INSERT INTO inspection_stats (id, total, compliant, kask, yelek)
+        SELECT 1, COUNT(*), COALESCE(SUM(uygunluk != 0), 0), COALESCE(SUM(kask != 0), 0), COALESCE(SUM(yelek != 0), 0)
+        FROM inspections
+    ''')
+    for table, key, length in ROLLUPS:
+        conn.execute(f'DELETE FROM {table}')
+        conn.execute(f'''
+            INSERT INTO {table} ({key}, total, compliant, kask, yelek)
+            SELECT substr(timestamp, 1, {length}), COUNT(*), SUM(uygunluk != 0), SUM(kask != 0), SUM(yelek != 0)
+            FROM inspections GROUP BY 1
+        ''')
+
+
+def rebuild(conn):
+    """Sayaçları kayıtlardan yeniden hesapla (yazmalar bu sırada bekler)"""
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        _recompute(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+def delete_all(conn):
+    """
+    Açık bir yazma işleminin içinde tüm kayıtları sil ve sayaçları sıfırla. Satır başına çalışan silme
+    tetikleyicisi işlem içinde kaldırılıp geri eklenir; diğer bağlantılar tetikleyicisiz durumu hiç görmez.
+    """
+    conn.execute('DROP TRIGGER IF EXISTS inspection_stats_delete')
+    conn.execute('DELETE FROM inspections')
+    conn.execute(STATS_TRIGGERS[1])
+    _recompute(conn)
+
+
+def clear_inspections(conn):
+    """Tüm kayıtları sil ve sayaçları sıfırla (işlemi kendisi açar)"""
+    conn.commit()
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        delete_all(conn)
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+
+@contextmanager
+def bulk_insert(conn):
+    """
+    Toplu ekleme için, açık bir yazma işleminin içinde kullanılır. Satır başına çalışan ekleme
+    tetikleyicisi blok süresince kaldırılır, eklenen satırların sayaçları blok sonunda tek
+    GROUP BY ile eklenir. Hata olursa çağıranın ROLLBACK'i tetikleyiciyi de geri getirir.
+    """
+    # AUTOINCREMENT: yeni satırların id'si mevcut en büyük id'den büyüktür
+    last_id = conn.execute('SELECT COALESCE(MAX(id), 0) FROM inspections').fetchone()[0]
+    conn.execute('DROP TRIGGER IF EXISTS inspection_stats_insert')
+    yield
+    conn.execute(STATS_TRIGGERS[0])
+
+    total, compliant, kask, yelek = conn.execute('''
+        SELECT COUNT(*), COALESCE(SUM(uygunluk != 0), 0), COALESCE(SUM(kask != 0), 0), COALESCE(SUM(yelek != 0), 0)
+        FROM inspections WHERE id > ?
+    ''', (last_id,)).fetchone()
+    conn.execute('''
+        UPDATE inspection_stats SET total = total + ?, compliant = compliant + ?, kask = kask + ?, yelek = yelek + ?
+        WHERE id = 1
+    ''', (total, compliant, kask, yelek))
+    for table, key, length in ROLLUPS:
+        conn.execute(f'''
+            INSERT INTO {table} ({key}, total, compliant, kask, yelek)
+            SELECT substr(timestamp, 1, {length}), COUNT(*), SUM(uygunluk != 0), SUM(kask != 0), SUM(yelek != 0)
+            FROM inspections WHERE id > ? GROUP BY 1
+            ON CONFLICT ({key}) DO UPDATE SET
+                total = total + excluded.total,
+                compliant = compliant + excluded.compliant,
+                kask = kask + excluded.kask,
+                yelek = yelek + excluded.yelek
+        ''', (last_id,))
+
+
+def _counts(row):
+    total, compliant, kask, yelek = row
+    return {
+        'total': total,
+        'compliant': compliant,
+        'non_compliant': total - compliant,
+        'compliance_rate': round(compliant / total * 100, 1) if total > 0 else 0,
+        'kask': kask,
+        'yelek': yelek
+    }
+
+
+def summary(conn):
+    """/api/stats - tek satır okuma"""
+    row = conn.execute('SELECT total, compliant, kask, yelek FROM inspection_stats WHERE id = 1').fetchone()
+    return _counts(row or (0, 0, 0, 0))
+
+
+def daily(conn, start, end):
+    """[start, end] arasındaki günler (YYYY-MM-DD), kaydı olmayan günler sıfır olarak"""
+    current = date.fromisoformat(start)
+    last = date.fromisoformat(end)
+    if (last - current).days >= MAX_DAYS:
+        raise ValueError(f"Tarih aralığı en fazla {MAX_DAYS} gün olabilir")
+    rows = conn.execute('SELECT day, total, compliant, kask, yelek FROM inspection_stats_daily '
+                        'WHERE day BETWEEN ? AND ?', (start, end)).fetchall()
+    by_day = {row[0]: row[1:] for row in rows}
+    days = []
+    while current <= last:
+        key = current.isoformat()
+        days.append({'day': key, **_counts(by_day.get(key, (0, 0, 0, 0)))})
+        current += timedelta(days=1)
+    return days
+
+
+def hourly(conn, day):
+    """Bir günün 24 saati"""
+    rows = conn.execute('SELECT hour, total, compliant, kask, yelek FROM inspection_stats_hourly '
+                        'WHERE hour BETWEEN ? AND ?', (f'{day}T00', f'{day}T23')).fetchall()
+    by_hour = {int(row[0][11:13]): row[1:] for row in rows}
+    return [{'hour': hour, **_counts(by_hour.get(hour, (0, 0, 0, 0)))} for hour in range(24)]
+
+
+def parse_day(value, default):
+    """?from=/?to=/?date= değeri (YYYY-MM-DD); hatalıysa ValueError"""
+    if not value:
+        return default.isoformat()
+    try:
+        return date.fromisoformat(value).isoformat()
+    except ValueError:
+        raise ValueError(f"Geçersiz tarih: {value}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['rebuild'])
+    parser.add_argument('--database', default='ppe_inspections.db')
+    args = parser.parse_args()
+
+    if not os.path.exists(args.database):
+        raise SystemExit(f"❌ Veritabanı bulunamadı: {args.database}")
+    conn = sqlite3.connect(args.database)
+    ensure_schema(conn)
+    start = time.perf_counter()
+    rebuild(conn)
+    stats = summary(conn)
+    conn.close()
+    print(f"✅ İstatistikler yeniden hesaplandı ({time.perf_counter() - start:.2f}s)")
+    print(f"📊 Toplam: {stats['total']}, Uygun: {stats['compliant']}, Uygun Değil: {stats['non_compliant']}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+#!/usr/bin/env python3
+"""
+Kontrol görüntüsü deposu - çakışmasız isimler, YYYY/MM/DD klasörleri ve atomik yazma
+
+Eski düz klasördeki dosyaları taşımak için:
+    python inspection_store.py migrate --database ppe_inspections.db
+"""
+import argparse
+import os
+import re
+import sqlite3
+import uuid
+from datetime import datetime
+
+INSPECTION_STORE_ROOT = os.environ.get('INSPECTION_STORE_ROOT', os.path.join('backend', 'inspections'))
+
+# inspection_20251126_093540.jpg gibi eski düz isimlerden tarihi çıkarır
+LEGACY_NAME = re.compile(r'^inspection_(\d{4})(\d{2})(\d{2})_\d{6}(?:_[0-9a-f]+)?\.(jpg|jpeg|webp|png)$')
+
+
+class InspectionStore:
+    """Görüntüleri root/YYYY/MM/DD/ altında benzersiz isimlerle saklar"""
+
+    def __init__(self, root=INSPECTION_STORE_ROOT):
+        self.root = os.path.abspath(root)
+        os.makedirs(self.root, exist_ok=True)
+
+    def new_filename(self, extension, now=None):
+        """Veritabanına yazılacak göreli yol: YYYY/MM/DD/inspection_<zaman>_<id>.<uzantı>"""
+        now = now or datetime.now()
+        name = f"inspection_{now.strftime('%Y%m%d_%H%M%S')}_{uuid.uuid4().hex[:12]}.{extension}"
+        return '/'.join([now.strftime('%Y'), now.strftime('%m'), now.strftime('%d'), name])
+
+    def path_for(self, filename):
+        """Göreli yolu mutlak yola çevir, root dışına çıkan yolları reddet"""
+        path = os.path.abspath(os.path.join(self.root, *filename.split('/')))
+        if os.path.commonpath([path, self.root]) != self.root:
+            raise ValueError(f"Geçersiz dosya yolu: {filename}")
+        return path
+
+    def write_bytes(self, filename, data):
+        """Geçici dosyaya yaz, sonra rename - okuyucular yarım dosya görmez"""
+        path = self.path_for(filename)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+        temp_path = os.path.join(directory, f".{os.path.basename(path)}.{uuid.uuid4().hex[:8]}.tmp")
+        try:
+            with open(temp_path, 'wb') as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        except BaseException:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        return path
+
+    def resolve(self, filename):
+        """
+        /inspections/<filename> isteğini depodaki göreli yola çevir.
+        Eski düz isimler (taşınmış ya da taşınmamış) de bulunur.
+        """
+        if '/' in filename:
+            return filename
+        if os.path.exists(self.path_for(filename)):
+            return filename
+        shard = self.legacy_shard(filename)
+        return f"{shard}/{filename}" if shard else filename
+
+    @staticmethod
+    def legacy_shard(filename):
+        """Eski isimdeki tarihten YYYY/MM/DD, tarih yoksa None"""
+        match = LEGACY_NAME.match(filename)
+        if not match:
+            return None
+        return '/'.join(match.group(1, 2, 3))
+
+    def migrate(self, database=None):
+        """Root'taki düz dosyaları tarih klasörlerine taşı, veritabanındaki isimleri güncelle"""
+        moved = 0
+        renames = []
+        for name in sorted(os.listdir(self.root)):
+            source = os.path.join(self.root, name)
+            if not os.path.isfile(source) or name.startswith('.'):
+                continue
+            shard = self.legacy_shard(name)
+            if shard is None:
+                # İsimde tarih yoksa dosyanın değiştirilme zamanı kullanılır
+                shard = datetime.fromtimestamp(os.path.getmtime(source)).strftime('%Y/%m/%d')
+            relative = f"{shard}/{name}"
+            target = self.path_for(relative)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            os.replace(source, target)
+            renames.append((relative, name))
+            moved += 1
+
+        if database and renames:
+            conn = sqlite3.connect(database)
+            conn.executemany('UPDATE inspections SET image_filename = ? WHERE image_filename = ?', renames)
+            conn.commit()
+            conn.close()
+
+        return moved
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('command', choices=['migrate'])
+    parser.add_argument('--root', default=INSPECTION_STORE_ROOT)
+    parser.add_argument('--database', help='image_filename sütunu güncellenecek SQLite dosyası')
+    args = parser.parse_args()
+
+    store = InspectionStore(args.root)
+    print(f"🚚 Taşınıyor: {store.root}")
+    moved = store.migrate(args.database)
+    print(f"✅ {moved} dosya tarih klasörlerine taşındı")
+
+
+if __name__ == '__main__':
+    main()
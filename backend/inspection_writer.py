@@ -0,0 +1,177 @@
+"""
+Arka plan kontrol görüntüsü yazıcısı - JPEG/WebP encode ve disk yazımı istek thread'inin dışında yapılır.
+Zaten kodlanmış baytlar (yüklenen dosyanın kendisi) encode edilmeden olduğu gibi yazılır.
+"""
+import atexit
+import os
+import queue
+import threading
+import time
+
+import cv2
+
+# Encode/yazma yapan thread sayısı
+INSPECTION_WRITER_WORKERS = int(os.environ.get('INSPECTION_WRITER_WORKERS', '2'))
+# Kuyrukta bekleyebilecek en fazla görüntü (bellek sınırı)
+INSPECTION_WRITER_QUEUE_SIZE = int(os.environ.get('INSPECTION_WRITER_QUEUE_SIZE', '64'))
+# Kuyruk doluyken isteğin en fazla kaç saniye bekleyeceği, sonra görüntü düşürülür
+INSPECTION_WRITER_PUT_TIMEOUT = float(os.environ.get('INSPECTION_WRITER_PUT_TIMEOUT', '1'))
+# jpg veya webp
+INSPECTION_IMAGE_FORMAT = os.environ.get('INSPECTION_IMAGE_FORMAT', 'jpg').lower()
+INSPECTION_IMAGE_QUALITY = int(os.environ.get('INSPECTION_IMAGE_QUALITY', '90'))
+# 0 = küçültme yok, aksi halde uzun kenar bu değere indirilir
+INSPECTION_IMAGE_MAX_SIDE = int(os.environ.get('INSPECTION_IMAGE_MAX_SIDE', '0'))
+
+ENCODE_PARAMS = {
+    'jpg': cv2.IMWRITE_JPEG_QUALITY,
+    'webp': cv2.IMWRITE_WEBP_QUALITY
+}
+
+_STOP = object()
+
+
+class InspectionWriter:
+    """Sınırlı kuyruk + worker thread'ler ile kontrol görüntülerini diske yazar"""
+
+    def __init__(self, store, workers=INSPECTION_WRITER_WORKERS, max_queue=INSPECTION_WRITER_QUEUE_SIZE,
+                 put_timeout=INSPECTION_WRITER_PUT_TIMEOUT, fmt=INSPECTION_IMAGE_FORMAT,
+                 quality=INSPECTION_IMAGE_QUALITY, max_side=INSPECTION_IMAGE_MAX_SIDE):
+        if fmt not in ENCODE_PARAMS:
+            raise ValueError(f"Desteklenmeyen görüntü formatı: {fmt} (seçenekler: {', '.join(ENCODE_PARAMS)})")
+        self.store = store
+        self.extension = fmt
+        self.quality = quality
+        self.max_side = max_side
+        self.put_timeout = put_timeout
+        self.workers = max(1, workers)
+        self.max_queue = max_queue
+        self._lock = threading.Lock()
+        self._closed = False
+        self._pid = None
+        self._queue = None
+        self._threads = []
+        self._submitted = 0
+        self._written = 0
+        self._failed = 0
+        self._dropped = 0
+        self._blocked = 0
+        self._blocked_seconds = 0.0
+        self._high_water = 0
+        self._write_seconds = 0.0
+        # Uygulama kapanırken kuyruktaki tüm görüntüler yazılır
+        atexit.register(self.close)
+
+    def _ensure_started(self):
+        # Thread'ler ilk görüntüde başlar; gunicorn --preload ile fork edilen worker kendi thread'lerini açar
+        if self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._threads = [threading.Thread(target=self._run, name=f'inspection-writer-{i}', daemon=True)
+                                 for i in range(self.workers)]
+                for thread in self._threads:
+                    thread.start()
+                self._pid = os.getpid()
+
+    def submit(self, image, filename):
+        """
+        Görüntüyü (RGB dizi ya da kodlanmış bayt) yazma kuyruğuna ekle;
+        kuyruk put_timeout boyunca doluysa False döndür
+        """
+        if self._closed:
+            return False
+        self._ensure_started()
+        item = (image, filename)
+        try:
+            self._queue.put_nowait(item)
+        except queue.Full:
+            # Backpressure: istek kısa süre bekler, disk yetişemiyorsa görüntü düşürülür
+            start = time.perf_counter()
+            try:
+                self._queue.put(item, timeout=self.put_timeout)
+            except queue.Full:
+                with self._lock:
+                    self._dropped += 1
+                print(f"⚠️ Yazma kuyruğu dolu, görüntü kaydedilmedi: {filename}")
+                return False
+            finally:
+                with self._lock:
+                    self._blocked += 1
+                    self._blocked_seconds += time.perf_counter() - start
+
+        with self._lock:
+            self._submitted += 1
+            self._high_water = max(self._high_water, self._queue.qsize())
+        return True
+
+    def _encode(self, image_rgb):
+        image = cv2.cvtColor(image_rgb, cv2.COLOR_RGB2BGR)
+        height, width = image.shape[:2]
+        if self.max_side and max(height, width) > self.max_side:
+            scale = self.max_side / max(height, width)
+            image = cv2.resize(image, (int(width * scale), int(height * scale)), interpolation=cv2.INTER_AREA)
+        ok, buffer = cv2.imencode(f'.{self.extension}', image, [ENCODE_PARAMS[self.extension], self.quality])
+        if not ok:
+            raise RuntimeError("Görüntü encode edilemedi")
+        return buffer
+
+    def _write(self, image, filename):
+        if isinstance(image, bytes):
+            return self.store.write_bytes(filename, image)
+        return self.store.write_bytes(filename, self._encode(image).tobytes())
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is _STOP:
+                    return
+                start = time.perf_counter()
+                try:
+                    path = self._write(*item)
+                except Exception as e:
+                    with self._lock:
+                        self._failed += 1
+                    print(f"❌ Görüntü yazılamadı ({item[1]}): {e}")
+                    continue
+                with self._lock:
+                    self._written += 1
+                    self._write_seconds += time.perf_counter() - start
+                print(f"💾 Görüntü kaydedildi: {path}")
+            finally:
+                self._queue.task_done()
+
+    def flush(self):
+        """Kuyruktaki tüm görüntüler yazılana kadar bekle"""
+        if self._pid == os.getpid():
+            self._queue.join()
+
+    def close(self):
+        """Yeni görüntü kabul etme, kuyruğu boşalt ve thread'leri durdur"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._pid == os.getpid():
+            for _ in self._threads:
+                self._queue.put(_STOP)
+            for thread in self._threads:
+                thread.join()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'queued': self._queue.qsize() if self._pid == os.getpid() else 0,
+                'queue_capacity': self.max_queue,
+                'high_water': self._high_water,
+                'submitted': self._submitted,
+                'written': self._written,
+                'failed': self._failed,
+                'dropped': self._dropped,
+                'blocked_submits': self._blocked,
+                'blocked_seconds': round(self._blocked_seconds, 3),
+                'avg_write_ms': round(self._write_seconds / self._written * 1000, 1) if self._written else None,
+                'format': self.extension,
+                'quality': self.quality,
+                'max_side': self.max_side
+            }
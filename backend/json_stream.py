@@ -0,0 +1,153 @@
+"""
+Akışlı JSON okuma - gövdeyi belleğe tek parça almadan NDJSON satırlarını ya da JSON dizisinin
+elemanlarını tek tek döndürür (/api/veri-al/bulk, /api/restore)
+"""
+import codecs
+import json
+
+# Akıştan bir seferde okunan bayt
+READ_CHUNK_SIZE = 64 * 1024
+
+_decoder = json.JSONDecoder()
+
+
+class StreamFormatError(ValueError):
+    """Akışın yapısı bozuk (JSON dizisi yarıda kesildi, beklenmeyen karakter)"""
+
+
+def text_chunks(stream):
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            tail = decoder.decode(b'', final=True)
+            if tail:
+                yield tail
+            return
+        text = decoder.decode(chunk)
+        # Boş metin akışın sonu sayılır; yarım kalan çok baytlı karakter sonraki parçayla çözülür
+        if text:
+            yield text
+
+
+def iter_ndjson(stream):
+    """Satır satır (kayıt, None) ya da (None, hata); bozuk satır sadece o kaydı geçersiz kılar"""
+    buffer = b''
+    while True:
+        chunk = stream.read(READ_CHUNK_SIZE)
+        if chunk:
+            buffer += chunk
+            *lines, buffer = buffer.split(b'\n')
+        else:
+            lines, buffer = [buffer], b''
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                yield json.loads(line), None
+            except ValueError as e:
+                yield None, f"Geçersiz JSON: {e}"
+        if not chunk:
+            return
+
+
+class _Reader:
+    """Metin parçaları üzerinde JSON değerlerini sırayla çözen tampon"""
+
+    def __init__(self, stream):
+        self._chunks = text_chunks(stream)
+        self.buffer = ''
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self):
+        more = next(self._chunks, '')
+        self.eof = not more
+        self.buffer = self.buffer[self.pos:] + more
+        self.pos = 0
+
+    def peek(self):
+        """Boşlukları atla, sıradaki karakter; akış bittiyse None"""
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if self.eof:
+                return None
+            self._fill()
+
+    def take(self, expected):
+        char = self.peek()
+        if char is None:
+            raise StreamFormatError("JSON yarıda kesildi")
+        if char not in expected:
+            options = ' ya da '.join(f"'{c}'" for c in expected)
+            raise StreamFormatError(f"Geçersiz JSON: {options} bekleniyordu, '{char}' bulundu")
+        self.pos += 1
+        return char
+
+    def value(self):
+        if self.peek() is None:
+            raise StreamFormatError("JSON yarıda kesildi")
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except ValueError as e:
+                if self.eof:
+                    raise StreamFormatError(f"Geçersiz JSON: {e}")
+                self._fill()
+                continue
+            if end == len(self.buffer) and not self.eof:
+                # Değer parçanın sonunda bitiyor olabilir (sayı), devamını okuyup yeniden çöz
+                self._fill()
+                continue
+            self.pos = end
+            return value
+
+    def array(self):
+        self.take('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value(), None
+            if self.take(',]') == ']':
+                return
+
+
+def iter_json_array(stream, envelope_key=None):
+    """
+    JSON dizisinin elemanları tek tek: (kayıt, None). envelope_key verilirse {"...": ..., "<key>": [...]}
+    biçimindeki nesnenin o alanındaki dizi okunur (/api/backup JSON çıktısı). Yapı bozuksa StreamFormatError.
+    """
+    reader = _Reader(stream)
+    first = reader.peek()
+    if first is None:
+        raise StreamFormatError("Gövde boş")
+
+    if first == '{' and envelope_key:
+        reader.take('{')
+        while True:
+            if reader.peek() == '}':
+                raise StreamFormatError(f"'{envelope_key}' alanı bulunamadı")
+            key = reader.value()
+            reader.take(':')
+            if key == envelope_key:
+                break
+            reader.value()
+            if reader.take(',}') == '}':
+                raise StreamFormatError(f"'{envelope_key}' alanı bulunamadı")
+        yield from reader.array()
+        # Diziden sonra gelen alanlar
+        while reader.take(',}') == ',':
+            reader.value()
+            reader.take(':')
+            reader.value()
+    elif first == '[':
+        yield from reader.array()
+    else:
+        raise StreamFormatError("Gövde bir JSON dizisi ya da NDJSON olmalı")
+
+    if reader.peek() is not None:
+        raise StreamFormatError("JSON'dan sonra beklenmeyen veri")
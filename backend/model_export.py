@@ -0,0 +1,100 @@
+#!/usr/bin/env python3
+"""
+YOLO modelini dışa aktar (ONNX / OpenVINO / CoreML) - sonuç modelin yanına cache'lenir
+
+Kullanım:
+    python model_export.py --format onnx
+    python model_export.py --format openvino --imgsz 832
+    python model_export.py --format coreml --nms
+"""
+import argparse
+import hashlib
+import os
+
+MODELS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'models')
+DEFAULT_MODEL_PATH = os.path.join(MODELS_DIR, 'ppe.pt')
+
+# torch (PyTorch eager), onnx (ONNX Runtime) veya openvino
+DETECTOR_BACKEND = os.environ.get('DETECTOR_BACKEND', 'torch').lower()
+DETECTOR_BACKENDS = ('torch', 'onnx', 'openvino')
+
+# ultralytics'in format başına ürettiği dosya/klasör soneki
+EXPORT_SUFFIXES = {
+    'onnx': '.onnx',
+    'openvino': '_openvino_model',
+    'coreml': '.mlpackage'
+}
+
+
+_model_versions = {}
+
+
+def model_version(model_path=DEFAULT_MODEL_PATH, backend=DETECTOR_BACKEND):
+    """Aktif model sürümü: backend + ağırlık dosyası içeriğinin özeti (süreç başına bir kez hesaplanır)"""
+    try:
+        stat = os.stat(model_path)
+    except FileNotFoundError:
+        return f"{backend}-missing"
+    cache_key = (model_path, stat.st_mtime, stat.st_size)
+    if cache_key not in _model_versions:
+        digest = hashlib.sha1()
+        with open(model_path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 20), b''):
+                digest.update(chunk)
+        _model_versions[cache_key] = digest.hexdigest()[:12]
+    return f"{backend}-{_model_versions[cache_key]}"
+
+
+def exported_path(model_path, fmt):
+    """Dışa aktarılmış modelin model_path'in yanındaki yolu"""
+    if fmt not in EXPORT_SUFFIXES:
+        raise ValueError(f"Desteklenmeyen format: {fmt} (seçenekler: {', '.join(EXPORT_SUFFIXES)})")
+    return os.path.splitext(model_path)[0] + EXPORT_SUFFIXES[fmt]
+
+
+def is_export_fresh(model_path, fmt):
+    """Dışa aktarılmış model var ve .pt'den yeni mi"""
+    path = exported_path(model_path, fmt)
+    return os.path.exists(path) and os.path.getmtime(path) >= os.path.getmtime(model_path)
+
+
+def export_model(fmt, model_path=DEFAULT_MODEL_PATH, imgsz=832, nms=False, force=False):
+    """Modeli istenen formata çevir, güncel bir çıktı varsa tekrar çevirmeden yolunu döndür"""
+    if not os.path.exists(model_path):
+        raise FileNotFoundError(f"Model file not found at: {model_path}")
+
+    target = exported_path(model_path, fmt)
+    if not force and is_export_fresh(model_path, fmt):
+        print(f"♻️ Dışa aktarılmış model hazır: {target}")
+        return target
+
+    from ultralytics import YOLO
+
+    print(f"🤖 Model yükleniyor: {model_path}")
+    model = YOLO(model_path)
+
+    print(f"🔄 {fmt.upper()} formatına çevriliyor...")
+    if fmt == 'coreml':
+        model.export(format='coreml', nms=nms)
+    else:
+        # Dinamik giriş boyutu: batch ve farklı profil çözünürlükleri aynı dosyayla çalışır
+        model.export(format=fmt, imgsz=imgsz, dynamic=True, simplify=(fmt == 'onnx'))
+
+    print(f"✅ {fmt.upper()} modeli oluşturuldu: {target}")
+    return target
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--format', required=True, choices=sorted(EXPORT_SUFFIXES))
+    parser.add_argument('--model', default=DEFAULT_MODEL_PATH)
+    parser.add_argument('--imgsz', type=int, default=832)
+    parser.add_argument('--nms', action='store_true', help='NMS katmanını modele göm (CoreML için)')
+    parser.add_argument('--force', action='store_true', help='Güncel çıktı olsa bile tekrar çevir')
+    args = parser.parse_args()
+
+    export_model(args.format, args.model, imgsz=args.imgsz, nms=args.nms, force=args.force)
+
+
+if __name__ == '__main__':
+    main()
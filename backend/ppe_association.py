@@ -0,0 +1,57 @@
+"""
+Kişi bazlı KKE eşleştirme - kask/yelek kutularını IoU ve kapsama oranı ile kişi kutularına atar
+"""
+import numpy as np
+
+# Bir kutunun kişiye atanması için alanının en az bu kadarı kişi kutusunun içinde olmalı
+MIN_CONTAINMENT = 0.5
+
+
+def box_areas(boxes):
+    return (boxes[:, 2] - boxes[:, 0]).clip(0) * (boxes[:, 3] - boxes[:, 1]).clip(0)
+
+
+def intersection_areas(a, b):
+    """(N,4) ve (M,4) xyxy kutular için (N,M) kesişim alanları"""
+    top_left = np.maximum(a[:, None, :2], b[None, :, :2])
+    bottom_right = np.minimum(a[:, None, 2:], b[None, :, 2:])
+    wh = (bottom_right - top_left).clip(0)
+    return wh[..., 0] * wh[..., 1]
+
+
+def pairwise_iou(a, b):
+    """(N,M) IoU matrisi"""
+    inter = intersection_areas(a, b)
+    union = box_areas(a)[:, None] + box_areas(b)[None, :] - inter
+    return inter / np.maximum(union, 1e-9)
+
+
+def containment(persons, items):
+    """(N,M) - her eşyanın alanının kişi kutusu içinde kalan oranı"""
+    inter = intersection_areas(persons, items)
+    return inter / np.maximum(box_areas(items)[None, :], 1e-9)
+
+
+def assign_to_persons(person_boxes, item_boxes, min_containment=MIN_CONTAINMENT):
+    """Her eşya kutusu için sahibi olan kişinin indeksi, uygun kişi yoksa -1"""
+    if len(person_boxes) == 0 or len(item_boxes) == 0:
+        return np.full(len(item_boxes), -1, dtype=np.intp)
+
+    inside = containment(person_boxes, item_boxes)
+    # Kask kişi kutusuna göre küçük olduğundan IoU düşüktür; kapsama esas, IoU iç içe kişilerde ayırıcı
+    score = inside + pairwise_iou(person_boxes, item_boxes)
+    score[inside < min_containment] = -1.0
+    owner = score.argmax(axis=0)
+    owner[score[owner, np.arange(len(item_boxes))] < 0] = -1
+    return owner
+
+
+def format_persons(persons):
+    """Kişi sonuçlarını Flutter'ın beklediği Kask/Yelek anahtarlarına çevir"""
+    labels = {'helmet': 'Kask', 'vest': 'Yelek'}
+    return [{
+        'box': person['box'],
+        'confidence': person['confidence'],
+        'detected_items': {labels[item]: detected for item, detected in person['detected_items'].items()},
+        'missing_items': [labels[item] for item in person['missing_items']]
+    } for person in persons]
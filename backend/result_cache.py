@@ -0,0 +1,149 @@
+"""
+/validate_image sonuç cache'i - yüklenen dosyanın özeti + model sürümü + profil ile anahtarlanır
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+# Bellekte tutulacak en fazla sonuç sayısı (0 = cache kapalı)
+RESULT_CACHE_SIZE = int(os.environ.get('RESULT_CACHE_SIZE', '256'))
+# Boş değilse sonuçlar bu SQLite dosyasına da yazılır, yeniden başlatmada korunur
+RESULT_CACHE_PATH = os.environ.get('RESULT_CACHE_PATH', '')
+# Disk katmanında tutulacak en fazla sonuç sayısı
+RESULT_CACHE_DISK_SIZE = int(os.environ.get('RESULT_CACHE_DISK_SIZE', '10000'))
+
+
+def make_cache_key(data, model_version, profile, mode):
+    """Görüntü baytları ve çıkarım ayarlarından cache anahtarı üret"""
+    digest = hashlib.sha256(data).hexdigest()
+    return f"{digest}:{model_version}:{profile}:{mode}"
+
+
+class ResultCache:
+    """LRU bellek katmanı + opsiyonel SQLite disk katmanı"""
+
+    def __init__(self, max_entries=RESULT_CACHE_SIZE, disk_path=RESULT_CACHE_PATH,
+                 disk_max_entries=RESULT_CACHE_DISK_SIZE):
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._disk_hits = 0
+        self._misses = 0
+        self._evictions = 0
+        self._disk_puts = 0
+        self.disk_path = disk_path
+        self._disk = None
+        self._disk_pid = None
+        if disk_path:
+            self._open_disk()
+
+    def _open_disk(self):
+        self._disk = sqlite3.connect(self.disk_path, check_same_thread=False)
+        self._disk.execute('''
+            CREATE TABLE IF NOT EXISTS result_cache (
+                key TEXT PRIMARY KEY,
+                value TEXT NOT NULL,
+                created_at REAL NOT NULL
+            )
+        ''')
+        self._disk.execute('CREATE INDEX IF NOT EXISTS idx_result_cache_created ON result_cache(created_at)')
+        self._disk.commit()
+        self._disk_pid = os.getpid()
+
+    def _check_fork(self):
+        # SQLite bağlantısı fork'tan sonra kullanılamaz; gunicorn worker'ı kendi bağlantısını açar.
+        # Devralınan bağlantı kapatılmaz (db.py ile aynı), referansı tutulur ki çöp toplayıcı da kapatmasın
+        if self._disk is not None and self._disk_pid != os.getpid():
+            self._inherited_disk = self._disk
+            self._open_disk()
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0
+
+    def get(self, key):
+        """Önce bellek, sonra disk; bulunamazsa None"""
+        if not self.enabled:
+            return None
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                self._hits += 1
+                return self._entries[key]
+
+            self._check_fork()
+            if self._disk is not None:
+                row = self._disk.execute('SELECT value FROM result_cache WHERE key = ?', (key,)).fetchone()
+                if row:
+                    value = json.loads(row[0])
+                    self._remember(key, value)
+                    self._disk_hits += 1
+                    return value
+
+            self._misses += 1
+            return None
+
+    def put(self, key, value):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._remember(key, value)
+            self._check_fork()
+            if self._disk is not None:
+                # numpy skalerleri (kalite skorları) JSON'a float olarak yazılır
+                self._disk.execute('INSERT OR REPLACE INTO result_cache (key, value, created_at) VALUES (?, ?, ?)',
+                                   (key, json.dumps(value, default=float), time.time()))
+                self._disk_puts += 1
+                # Boyut sınırı her yazmada değil, 100 yazmada bir uygulanır
+                if self._disk_puts % 100 == 0:
+                    self._disk.execute('''
+                        DELETE FROM result_cache WHERE key IN (
+                            SELECT key FROM result_cache ORDER BY created_at DESC LIMIT -1 OFFSET ?
+                        )
+                    ''', (self.disk_max_entries,))
+                self._disk.commit()
+
+    def _remember(self, key, value):
+        self._entries[key] = value
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self._evictions += 1
+
+    def stats(self):
+        with self._lock:
+            lookups = self._hits + self._disk_hits + self._misses
+            stats = {
+                'enabled': self.enabled,
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self._hits,
+                'disk_hits': self._disk_hits,
+                'misses': self._misses,
+                'evictions': self._evictions,
+                'hit_rate': round((self._hits + self._disk_hits) / lookups * 100, 1) if lookups else 0
+            }
+            self._check_fork()
+            if self._disk is not None:
+                stats['disk_entries'] = self._disk.execute('SELECT COUNT(*) FROM result_cache').fetchone()[0]
+            return stats
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_result_cache():
+    """Süreç genelinde tek ResultCache örneği"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = ResultCache()
+    return _cache
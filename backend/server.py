@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""
+Production sunucusu - gunicorn; YOLO ağırlıkları master süreçte bir kez yüklenir, worker'lar fork ile paylaşır
+
+Kullanım:
+    python server.py app_simple              # mobil API (varsayılan port 5002)
+    python server.py app --workers 2         # dashboard API (varsayılan port 5001)
+    gunicorn -c server.py app_simple:app     # aynı ayarlar ve kancalar, gunicorn komutuyla (port 5002)
+
+Açılış sırası (SERVER_PRELOAD=true):
+1. Master uygulamayı import eder, torch backend'inde DETECTOR_POOL_SIZE kadar model master'da yüklenir.
+   Ağırlık tensörleri fork sonrası worker'larla copy-on-write paylaşılır; her worker ayrı kopya tutmaz.
+   Master'da torch tek thread'le çalışır ve forward pass yapılmaz: fork'tan önce açılan OpenMP thread
+   havuzu worker'da kullanılamaz, ilk çıkarımda kilitlenir.
+2. Her fork'tan önce master'ın veritabanı bağlantıları kapatılır ve mevcut nesneler gc.freeze() ile
+   dondurulur (gc taraması nesne başlıklarına yazıp paylaşılan sayfaları kopyalatmasın).
+3. Worker torch intra-op thread sayısını ayarlar (TORCH_THREADS, 0 = çekirdekler / (worker x havuz)),
+   sonra havuzdaki her model boş bir görüntüyle bir kez çalıştırılır; ilk istek ısınma maliyetini ödemez.
+
+ONNX Runtime / OpenVINO oturumları açılırken kendi thread havuzlarını kurduğundan bu backend'lerde modeller
+master'da değil, her worker'da fork'tan sonra yüklenir (INFERENCE_THREADS=0 ise worker başına aynı bölüşüm).
+"""
+import argparse
+import gc
+import importlib.util
+import os
+import sys
+
+# gunicorn -c ile başka klasörden çalıştırıldığında backend modülleri bulunabilsin
+BACKEND_DIR = os.path.dirname(os.path.abspath(__file__))
+if BACKEND_DIR not in sys.path:
+    sys.path.insert(0, BACKEND_DIR)
+
+import db
+import detector_pool
+from detector_pool import DETECTOR_POOL_SIZE, get_detector_pool
+from model_export import DETECTOR_BACKEND
+
+# Worker süreç sayısı (her biri modelin paylaşılan kopyasını kullanır)
+SERVER_WORKERS = int(os.environ.get('SERVER_WORKERS', '2'))
+# Worker başına istek thread'i; DETECTOR_POOL_SIZE'tan fazlası model için havuzda bekler
+SERVER_THREADS = int(os.environ.get('SERVER_THREADS', '4'))
+# Worker başına kabul edilen en fazla eşzamanlı bağlantı; fazlası çekirdek kuyruğunda bekler
+SERVER_MAX_CONNECTIONS = int(os.environ.get('SERVER_MAX_CONNECTIONS', '32'))
+# Çekirdek dinleme kuyruğu (accept bekleyen bağlantılar); doluysa yeni bağlantılar reddedilir
+SERVER_BACKLOG = int(os.environ.get('SERVER_BACKLOG', '64'))
+# Yanıt vermeyen worker kaç saniye sonra yeniden başlatılır (açılıştaki ısınma dahil)
+SERVER_TIMEOUT = int(os.environ.get('SERVER_TIMEOUT', '120'))
+# Worker bu kadar istekten sonra yenilenir (0 = hiç); fork hazır master'dan yapıldığı için ucuz
+SERVER_MAX_REQUESTS = int(os.environ.get('SERVER_MAX_REQUESTS', '0'))
+# true ise uygulama ve model master'da yüklenip worker'lara fork ile paylaştırılır
+SERVER_PRELOAD = os.environ.get('SERVER_PRELOAD', 'true').lower() == 'true'
+# Worker başına torch intra-op thread sayısı (0 = çekirdekler worker'lar ve havuzdaki modeller arasında bölünür)
+TORCH_THREADS = int(os.environ.get('TORCH_THREADS', '0'))
+
+HOST = os.environ.get('HOST', '0.0.0.0')
+APP_PORTS = {'app': 5001, 'app_simple': 5002}
+
+
+def app_module(argv):
+    """gunicorn komut satırındaki uygulama modülü (app_simple:app -> app_simple); bulunamazsa None"""
+    for arg in reversed(argv[1:]):
+        module = arg.partition(':')[0].rpartition('.')[2]
+        if ':' in arg and module in APP_PORTS:
+            return module
+    return None
+
+
+# --- gunicorn ayarları ---
+# PORT yoksa çalıştırılan uygulamanın portu (gunicorn -c server.py app_simple:app -> 5002)
+bind = f"{HOST}:{os.environ.get('PORT') or APP_PORTS[app_module(sys.argv) or 'app']}"
+workers = SERVER_WORKERS
+worker_class = 'gthread'
+threads = SERVER_THREADS
+worker_connections = SERVER_MAX_CONNECTIONS
+backlog = SERVER_BACKLOG
+timeout = SERVER_TIMEOUT
+max_requests = SERVER_MAX_REQUESTS
+max_requests_jitter = SERVER_MAX_REQUESTS // 10
+preload_app = SERVER_PRELOAD
+
+
+def uses_torch():
+    return DETECTOR_BACKEND == 'torch' and importlib.util.find_spec('torch') is not None
+
+
+def inference_threads(worker_count):
+    """Worker başına çıkarım thread'i"""
+    if TORCH_THREADS > 0:
+        return TORCH_THREADS
+    return max(1, (os.cpu_count() or 1) // (max(1, worker_count) * max(1, DETECTOR_POOL_SIZE)))
+
+
+if preload_app:
+    if uses_torch():
+        # Uygulama import'u (DETECTOR_PRELOAD) ve ağırlık yükleme/fuse master'da OpenMP havuzu açmasın
+        import torch
+        torch.set_num_threads(1)
+    else:
+        # Dışa aktarılmış modellerin oturumu master'da açılmasın, worker'lar kendisi yükler
+        # (uygulamalar DETECTOR_PRELOAD'u import sırasında detector_pool'dan okur)
+        detector_pool.DETECTOR_PRELOAD = False
+
+
+# --- gunicorn kancaları ---
+
+def when_ready(server):
+    """Master: soketler açıldı, worker'lar henüz fork edilmedi"""
+    if server.cfg.preload_app and uses_torch():
+        try:
+            pool = get_detector_pool().warm_up()
+            print(f"🧠 {pool.stats()['loaded']} model master'da yüklendi, worker'lar paylaşacak")
+        except Exception as e:
+            print(f"⚠️ Model master'da yüklenemedi, her worker kendisi yükleyecek: {e}")
+    gc.collect()
+
+
+def pre_fork(server, worker):
+    db.close_pools()
+    gc.freeze()
+
+
+def post_fork(server, worker):
+    count = inference_threads(server.num_workers)
+    if uses_torch():
+        import torch
+        torch.set_num_threads(count)
+    elif int(os.environ.get('INFERENCE_THREADS', '0')) <= 0:
+        # inference_backends worker'da model yüklenirken import edilir, değeri o zaman okur
+        os.environ['INFERENCE_THREADS'] = str(count)
+    print(f"👷 Worker {worker.pid}: {count} çıkarım thread'i")
+
+
+def post_worker_init(worker):
+    """Worker: uygulama yüklendi, istek kabul etmeden önce modeller ısıtılır"""
+    try:
+        get_detector_pool().warm_up(forward=True)
+    except Exception as e:
+        print(f"⚠️ Detector ısıtılamadı, ilk istekte tekrar denenecek: {e}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('app', nargs='?', default='app_simple', choices=sorted(APP_PORTS))
+    parser.add_argument('--bind', default=None, help='varsayılan: HOST:PORT (PORT yoksa uygulamanın portu)')
+    parser.add_argument('--workers', type=int, default=SERVER_WORKERS)
+    parser.add_argument('--threads', type=int, default=SERVER_THREADS)
+    args = parser.parse_args()
+
+    bind = args.bind or f"{HOST}:{os.environ.get('PORT') or APP_PORTS[args.app]}"
+    print(f"🚀 {args.app}: http://{bind} ({args.workers} worker x {args.threads} thread, "
+          f"backend {DETECTOR_BACKEND}, preload {'açık' if preload_app else 'kapalı'})")
+    # gunicorn'un kendi komut satırı; bu dosya ayar dosyası olarak yüklenir, komut satırı değerleri öncelikli
+    sys.argv = ['gunicorn', '--config', os.path.abspath(__file__), '--bind', bind,
+                '--workers', str(args.workers), '--threads', str(args.threads), f'{args.app}:app']
+    from gunicorn.app.wsgiapp import run
+    run()
+
+
+if __name__ == '__main__':
+    main()
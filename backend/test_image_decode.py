@@ -0,0 +1,57 @@
+"""
+image_decode.decode_image - JPEG dışı yüklemelerin küçültülmüş decode'u (P, 1, I;16 modları dahil)
+
+Kullanım:
+    python test_image_decode.py
+    python -m pytest test_image_decode.py
+"""
+import io
+
+import numpy as np
+from PIL import Image
+
+from image_decode import decode_image
+
+TARGET_SIZE = 832
+
+
+def encode(image, fmt):
+    buffer = io.BytesIO()
+    image.save(buffer, fmt)
+    return buffer.getvalue()
+
+
+def sample_images():
+    """(ad, baytlar) - 2000x1000, reduce() ile 2 kat küçülür"""
+    rng = np.random.default_rng(0)
+    rgb = Image.fromarray(rng.integers(0, 256, (1000, 2000, 3), dtype=np.uint8))
+    gray16 = Image.fromarray(rng.integers(0, 65536, (1000, 2000), dtype=np.uint16))
+    return [
+        ('palette png (P)', encode(rgb.convert('P'), 'PNG')),
+        ('1-bit png (1)', encode(rgb.convert('1'), 'PNG')),
+        ('16-bit tiff (I;16)', encode(gray16, 'TIFF')),
+        ('rgba png (RGBA)', encode(rgb.convert('RGBA'), 'PNG')),
+        ('gray png (L)', encode(rgb.convert('L'), 'PNG'))
+    ]
+
+
+def test_reduced_decode_modes():
+    for name, data in sample_images():
+        image, original_size = decode_image(data, TARGET_SIZE)
+        assert original_size == (2000, 1000), name
+        assert image.shape == (500, 1000, 3), (name, image.shape)
+        assert image.dtype == np.uint8, name
+
+
+def test_full_decode_modes():
+    for name, data in sample_images():
+        image, _ = decode_image(data)
+        assert image.shape == (1000, 2000, 3), (name, image.shape)
+
+
+if __name__ == '__main__':
+    for name, data in sample_images():
+        image, original_size = decode_image(data, TARGET_SIZE)
+        print(f"✅ {name}: {original_size[0]}x{original_size[1]} -> {image.shape[1]}x{image.shape[0]}")
+    test_full_decode_modes()
+    print("✅ Tam boyutlu decode")
@@ -1,117 +1,202 @@
 #!/usr/bin/env python3
 """
-Mevcut kullanıcıların fotoğraflarından face encoding oluşturur
+Mevcut kullanıcıların fotoğraflarından face encoding oluşturur (toplu, paralel)
+
+- Fotoğraflar süreç havuzunda işlenir; yüz tespiti küçültülmüş görüntüde yapılır,
+  encoding orijinal çözünürlükte bulunan yüz kutusundan çıkarılır
+- Veritabanına tek yazıcı (ana süreç) toplu olarak yazar
+- İşlenen kullanıcılar kontrol noktası dosyasına eklenir; yarıda kalan çalışma kaldığı yerden sürer
+
+Kullanım:
+    python update_face_encodings.py --workers 8 --max-side 640
+    python update_face_encodings.py --all            # tüm kullanıcıları yeniden kodla
 """
 
-import sqlite3
+import argparse
 import os
-import json
-from PIL import Image
+import sqlite3
+import time
+from multiprocessing import Pool
+
 import numpy as np
+from PIL import Image, ImageOps
+
+from face_encodings import encoding_to_blob, ensure_change_tracking
+from face_index import FACE_INDEX_PATH
+from face_pipeline import (FACE_DETECTION_MAX_SIDE, FACE_DETECTION_MODEL, FACE_DETECTION_UPSAMPLE, detect_faces,
+                           encode_faces, largest_face)
+from face_snapshot import FACE_SNAPSHOT_DIR, SnapshotBuilder
 
 DATABASE = 'ppe_inspections.db'
+PHOTOS_DIR = 'users'
+CHECKPOINT_FILE = '.update_face_encodings.checkpoint'
+
+
+def init_worker():
+    # dlib modelleri her worker süreçte bir kez yüklenir
+    import face_recognition  # noqa: F401
+
 
-def update_face_encodings():
+def encode_photo(task):
+    """(user_id, fotoğraf yolu, max_side, model, upsample) -> (user_id, BLOB ya da None, mesaj)"""
+    user_id, photo_path, max_side, model, upsample = task
+    if not os.path.exists(photo_path):
+        return user_id, None, f"Fotoğraf bulunamadı: {photo_path}"
+    try:
+        image_np = np.array(ImageOps.exif_transpose(Image.open(photo_path)).convert('RGB'))
+        locations = detect_faces(image_np, max_side, model, upsample)
+        if not locations:
+            return user_id, None, "Yüz bulunamadı"
+        # Birden fazla yüz varsa en büyüğü (fotoğrafın sahibi) kullanılır
+        encodings = encode_faces(image_np, [largest_face(locations)])
+        if not encodings:
+            return user_id, None, "Face encoding oluşturulamadı"
+        message = f"{len(locations)} yüz bulundu, en büyüğü kullanıldı" if len(locations) > 1 else None
+        return user_id, encoding_to_blob(encodings[0]), message
+    except Exception as e:
+        return user_id, None, f"Hata: {e}"
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {int(line) for line in f if line.strip()}
+
+
+def append_checkpoint(path, user_ids):
+    with open(path, 'a') as f:
+        f.write(''.join(f"{user_id}\n" for user_id in user_ids))
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def update_face_encodings(database=DATABASE, photos_dir=PHOTOS_DIR, workers=None, max_side=FACE_DETECTION_MAX_SIDE,
+                          model=FACE_DETECTION_MODEL, upsample=FACE_DETECTION_UPSAMPLE, batch_size=100,
+                          reencode_all=False, checkpoint=CHECKPOINT_FILE):
     """Mevcut kullanıcılar için face encoding oluştur"""
-    
     try:
-        import face_recognition
+        import face_recognition  # noqa: F401
         print("✅ face_recognition modülü yüklü")
     except ImportError:
         print("❌ face_recognition modülü yüklü değil!")
         print("Yüklemek için: pip install face_recognition")
         return
-    
-    conn = sqlite3.connect(DATABASE)
-    cursor = conn.cursor()
-    
-    # Face encoding'i olmayan kullanıcıları bul
-    cursor.execute('''
-        SELECT id, sicil_no, name, surname, photo_filename
-        FROM users_db
-        WHERE face_encoding IS NULL OR face_encoding = ''
-    ''')
-    
-    users = cursor.fetchall()
-    
-    if not users:
-        print("✅ Tüm kullanıcıların face encoding'i mevcut")
+
+    conn = sqlite3.connect(database)
+    # Güncellemeler değişiklik sayacını artırsın (kayıtlı yüz indeksleri açılışta yeniden kurulur)
+    ensure_change_tracking(conn)
+    where = "photo_filename IS NOT NULL AND photo_filename != ''"
+    if not reencode_all:
+        # Face encoding'i olmayan kullanıcılar
+        where += " AND (face_encoding IS NULL OR face_encoding = '')"
+    users = conn.execute(f'SELECT id, photo_filename FROM users_db WHERE {where} ORDER BY id').fetchall()
+    without_photo = conn.execute("SELECT COUNT(*) FROM users_db WHERE photo_filename IS NULL "
+                                 "OR photo_filename = ''").fetchone()[0]
+
+    done = load_checkpoint(checkpoint)
+    tasks = [(user_id, os.path.join(photos_dir, photo_filename), max_side, model, upsample)
+             for user_id, photo_filename in users if user_id not in done]
+    if without_photo:
+        print(f"⚠️ {without_photo} kullanıcının fotoğraf dosyası yok, atlanıyor")
+    if done:
+        print(f"⏩ Kontrol noktasından devam: {len(users) - len(tasks)} kullanıcı zaten işlenmiş")
+    if not tasks:
+        print("✅ İşlenecek kullanıcı yok")
         conn.close()
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
         return
-    
-    print(f"📋 {len(users)} kullanıcı için face encoding oluşturulacak...")
-    
+
+    workers = workers or os.cpu_count() or 1
+    print(f"📋 {len(tasks)} kullanıcı için face encoding oluşturulacak ({workers} süreç, max {max_side}px)")
+
     updated = 0
     failed = 0
-    
-    for user_id, sicil_no, name, surname, photo_filename in users:
-        print(f"\n🔄 İşleniyor: {name} {surname} ({sicil_no})")
-        
-        if not photo_filename:
-            print(f"  ⚠️ Fotoğraf dosyası yok")
-            failed += 1
-            continue
-        
-        photo_path = os.path.join('users', photo_filename)
-        
-        if not os.path.exists(photo_path):
-            print(f"  ⚠️ Fotoğraf bulunamadı: {photo_path}")
-            failed += 1
-            continue
-        
-        try:
-            # Fotoğrafı yükle
-            image = Image.open(photo_path)
-            image = image.convert('RGB')
-            image_np = np.array(image)
-            
-            # Yüz tespiti
-            face_locations = face_recognition.face_locations(image_np)
-            
-            if not face_locations:
-                print(f"  ❌ Yüz bulunamadı")
-                failed += 1
-                continue
-            
-            if len(face_locations) > 1:
-                print(f"  ⚠️ Birden fazla yüz tespit edildi, ilki kullanılacak")
-            
-            # Face encoding oluştur
-            face_encodings = face_recognition.face_encodings(image_np, face_locations)
-            
-            if not face_encodings:
-                print(f"  ❌ Face encoding oluşturulamadı")
-                failed += 1
-                continue
-            
-            face_encoding = face_encodings[0].tolist()
-            face_encoding_str = json.dumps(face_encoding)
-            
-            # Veritabanını güncelle
-            cursor.execute('''
-                UPDATE users_db
-                SET face_encoding = ?
-                WHERE id = ?
-            ''', (face_encoding_str, user_id))
-            
+    pending = []
+    processed = []
+    start = time.perf_counter()
+
+    def flush():
+        # Tek yazıcı: toplu UPDATE + tek commit, ardından kontrol noktası
+        if pending:
+            conn.executemany('UPDATE users_db SET face_encoding = ? WHERE id = ?', pending)
             conn.commit()
-            
-            print(f"  ✅ Face encoding oluşturuldu ve kaydedildi")
-            updated += 1
-            
-        except Exception as e:
-            print(f"  ❌ Hata: {e}")
-            failed += 1
-    
+        append_checkpoint(checkpoint, processed)
+        pending.clear()
+        processed.clear()
+
+    with Pool(workers, initializer=init_worker) as pool:
+        for user_id, blob, message in pool.imap_unordered(encode_photo, tasks, chunksize=4):
+            if blob is None:
+                failed += 1
+                print(f"  ❌ Kullanıcı {user_id}: {message}")
+            else:
+                updated += 1
+                pending.append((blob, user_id))
+                if message:
+                    print(f"  ⚠️ Kullanıcı {user_id}: {message}")
+            processed.append(user_id)
+
+            count = updated + failed
+            if len(processed) >= batch_size or count == len(tasks):
+                flush()
+                elapsed = time.perf_counter() - start
+                rate = count / elapsed
+                eta = (len(tasks) - count) / rate if rate else 0
+                print(f"📈 {count}/{len(tasks)} ({count / len(tasks) * 100:.1f}%) - "
+                      f"{rate:.1f} fotoğraf/s, kalan ~{eta:.0f}s")
     conn.close()
-    
-    print("\n" + "="*50)
+    # Tüm iş bitti - sonraki çalıştırma baştan başlar
+    os.remove(checkpoint)
+
+    # Eski satırlar güncellendiği için worker'ların yeni kayıt taraması bunları görmez - anlık görüntüyü yenile
+    if updated and FACE_SNAPSHOT_DIR:
+        SnapshotBuilder(database, 'users_db').build()
+    if updated and FACE_INDEX_PATH:
+        remove_face_index(FACE_INDEX_PATH)
+
+    elapsed = time.perf_counter() - start
+    print("\n" + "=" * 50)
     print(f"✅ Başarılı: {updated}")
     print(f"❌ Başarısız: {failed}")
-    print(f"📊 Toplam: {len(users)}")
-    print("="*50)
+    print(f"📊 Toplam: {len(tasks)} ({elapsed:.1f}s, {len(tasks) / elapsed:.1f} fotoğraf/s)")
+    print("=" * 50)
+    if updated and not FACE_SNAPSHOT_DIR:
+        # refresh_face_index sadece last_row_id'den sonraki satırları okur, güncellenenleri görmez
+        print("🔄 Çalışan uygulamalar eski yüz vektörlerini kullanıyor - yeniden başlatın")
+
+
+def remove_face_index(path):
+    """Kayıtlı yüz indeksini sil (hnsw grafiği dahil) - sonraki açılışta veritabanından kurulur"""
+    for name in (path, f'{path}.hnsw'):
+        if os.path.exists(name):
+            os.remove(name)
+            print(f"🗑️ Eski yüz indeksi silindi: {name}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--database', default=DATABASE)
+    parser.add_argument('--photos-dir', default=PHOTOS_DIR)
+    parser.add_argument('--workers', type=int, default=0, help='0 = CPU sayısı')
+    parser.add_argument('--max-side', type=int, default=FACE_DETECTION_MAX_SIDE,
+                        help='Tespit öncesi uzun kenar (0 = küçültme yok)')
+    parser.add_argument('--model', choices=['hog', 'cnn'], default=FACE_DETECTION_MODEL)
+    parser.add_argument('--upsample', type=int, default=FACE_DETECTION_UPSAMPLE)
+    parser.add_argument('--batch-size', type=int, default=100, help='Commit başına satır')
+    parser.add_argument('--all', action='store_true', help='Encoding\'i olanları da yeniden kodla')
+    parser.add_argument('--checkpoint', default=CHECKPOINT_FILE)
+    parser.add_argument('--restart', action='store_true', help='Kontrol noktasını silip baştan başla')
+    args = parser.parse_args()
+
+    if args.restart and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    update_face_encodings(args.database, args.photos_dir, args.workers, args.max_side, args.model, args.upsample,
+                          args.batch_size, args.all, args.checkpoint)
+
 
 if __name__ == '__main__':
     print("🚀 Face Encoding Güncelleme Scripti")
-    print("="*50)
-    update_face_encodings()
+    print("=" * 50)
+    main()
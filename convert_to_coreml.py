@@ -1,29 +1,31 @@
 """
 YOLOv8 modelini CoreML formatına çevir
+
+Diğer formatlar (ONNX, OpenVINO) için: python backend/model_export.py --format <format>
 """
-from ultralytics import YOLO
 import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), 'backend'))
+
+from model_export import export_model
+
 
 def convert_to_coreml():
     """
     backend/models/ppe_new.pt'yi CoreML'e çevir
     """
     model_path = 'backend/models/ppe_new.pt'
-    
+
     if not os.path.exists(model_path):
         model_path = 'backend/models/ppe.pt'
-    
+
     if not os.path.exists(model_path):
         print("❌ Model bulunamadı!")
         return
-    
-    print(f"🤖 Model yükleniyor: {model_path}")
-    model = YOLO(model_path)
-    
-    print("🔄 CoreML formatına çevriliyor...")
-    model.export(format='coreml', nms=True)
-    
-    print("✅ CoreML modeli oluşturuldu!")
+
+    export_model('coreml', model_path, nms=True, force=True)
+
     print("📁 Dosya: ppe_new.mlpackage veya ppe.mlpackage")
     print("\n📱 iOS'a eklemek için:")
     print("1. .mlpackage dosyasını Xcode'da ios/Runner/ klasörüne sürükle")